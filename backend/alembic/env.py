@@ -14,6 +14,18 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# Database objects managed by hand-written migrations and not mapped on the
+# models; autogenerate must not propose dropping them.
+UNMAPPED_OBJECTS = {
+    ("column", "embedding_vector"),
+    ("index", "idx_prompt_cache_embedding_hnsw"),
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and (type_, name) in UNMAPPED_OBJECTS)
+
+
 def run_migrations_offline() -> None:
     url = settings.DATABASE_URL
     context.configure(
@@ -21,12 +33,13 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
     with context.begin_transaction():
         context.run_migrations()
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
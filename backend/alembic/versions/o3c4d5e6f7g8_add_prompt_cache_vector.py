@@ -0,0 +1,87 @@
+"""Add pgvector embedding column and HNSW index to prompt_cache
+
+Revision ID: o3c4d5e6f7g8
+Revises: bae2b07d4b94
+Create Date: 2025-01-20
+
+Changes:
+- Enable the pgvector extension (skipped if it is not installed on the server)
+- Add 'embedding_vector' vector(768) column to prompt_cache, backfilled from
+  the JSONB prompt_embedding (Gemini text-embedding-004 vectors only)
+- Keep it in sync from prompt_embedding with a trigger, so writers need no changes
+- Add a partial HNSW cosine index over active, completed rows
+
+The column is not mapped on the PromptCache model (the app must keep working
+where pgvector is unavailable); SimilarityService queries it with raw SQL.
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'o3c4d5e6f7g8'
+down_revision = 'bae2b07d4b94'
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIMENSIONS = 768
+
+logger = logging.getLogger("alembic")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    available = bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+    ).scalar()
+    if not available:
+        logger.warning("pgvector extension not available; prompt_cache keeps in-process similarity search")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute(f"ALTER TABLE prompt_cache ADD COLUMN IF NOT EXISTS embedding_vector vector({EMBEDDING_DIMENSIONS})")
+
+    # Backfill from JSONB (pseudo-embeddings of other sizes stay NULL)
+    op.execute(f"""
+        UPDATE prompt_cache
+        SET embedding_vector = (prompt_embedding::text)::vector
+        WHERE jsonb_typeof(prompt_embedding) = 'array'
+          AND jsonb_array_length(prompt_embedding) = {EMBEDDING_DIMENSIONS}
+    """)
+
+    # Sync trigger: the JSONB column stays the source of truth
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION prompt_cache_sync_embedding_vector() RETURNS trigger AS $$
+        BEGIN
+            IF jsonb_typeof(NEW.prompt_embedding) = 'array'
+               AND jsonb_array_length(NEW.prompt_embedding) = {EMBEDDING_DIMENSIONS} THEN
+                NEW.embedding_vector := (NEW.prompt_embedding::text)::vector;
+            ELSE
+                NEW.embedding_vector := NULL;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_prompt_cache_embedding_vector
+        BEFORE INSERT OR UPDATE OF prompt_embedding ON prompt_cache
+        FOR EACH ROW EXECUTE FUNCTION prompt_cache_sync_embedding_vector()
+    """)
+
+    # Partial index: matches the WHERE clause of SimilarityService's ANN query
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_prompt_cache_embedding_hnsw
+        ON prompt_cache USING hnsw (embedding_vector vector_cosine_ops)
+        WHERE is_active AND status = 'completed' AND image_url IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_prompt_cache_embedding_hnsw")
+    op.execute("DROP TRIGGER IF EXISTS trg_prompt_cache_embedding_vector ON prompt_cache")
+    op.execute("DROP FUNCTION IF EXISTS prompt_cache_sync_embedding_vector()")
+    op.execute("ALTER TABLE prompt_cache DROP COLUMN IF EXISTS embedding_vector")
+
+    # Note: the vector extension is left installed (other database objects may use it)
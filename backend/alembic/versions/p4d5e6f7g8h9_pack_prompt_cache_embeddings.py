@@ -0,0 +1,122 @@
+"""Store prompt_cache embeddings as packed float32 bytea
+
+Revision ID: p4d5e6f7g8h9
+Revises: o3c4d5e6f7g8
+Create Date: 2025-01-27
+
+Changes:
+- Add 'embedding_blob' bytea column: 4-byte dtype tag + little-endian float32
+  values (about 1/4 the size of the JSONB float list)
+- Convert existing JSONB prompt_embedding values in batches
+- Drop the JSONB prompt_embedding column
+- Drop the JSONB -> embedding_vector sync trigger; SimilarityService now
+  writes embedding_vector itself when pgvector is available
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import json
+import struct
+
+# revision identifiers, used by Alembic.
+revision = 'p4d5e6f7g8h9'
+down_revision = 'o3c4d5e6f7g8'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+FLOAT32_TAG = b"f32\x00"
+
+
+def _pack(values) -> bytes:
+    return FLOAT32_TAG + struct.pack(f"<{len(values)}f", *values)
+
+
+def _unpack(blob: bytes) -> list:
+    tag, data = bytes(blob[:4]), bytes(blob[4:])
+    fmt, size = ("f", 4) if tag == FLOAT32_TAG else ("e", 2)
+    return list(struct.unpack(f"<{len(data) // size}{fmt}", data))
+
+
+def _convert(bind, select_sql: str, update_sql: str, convert) -> None:
+    """Convert one column to the other in keyset-paginated batches."""
+    last_id = None
+    while True:
+        rows = bind.execute(
+            sa.text(select_sql),
+            {"last_id": last_id, "batch": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+        updates = [{"id": row[0], "value": convert(row[1])} for row in rows]
+        bind.execute(sa.text(update_sql), updates)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    op.add_column('prompt_cache', sa.Column('embedding_blob', sa.LargeBinary(), nullable=True))
+
+    bind = op.get_bind()
+    _convert(
+        bind,
+        """
+        SELECT id, prompt_embedding FROM prompt_cache
+        WHERE jsonb_typeof(prompt_embedding) = 'array'
+          AND jsonb_array_length(prompt_embedding) > 0
+          AND (CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid))
+        ORDER BY id LIMIT :batch
+        """,
+        "UPDATE prompt_cache SET embedding_blob = :value WHERE id = :id",
+        lambda value: _pack(value if isinstance(value, list) else json.loads(value)),
+    )
+
+    op.execute("DROP TRIGGER IF EXISTS trg_prompt_cache_embedding_vector ON prompt_cache")
+    op.execute("DROP FUNCTION IF EXISTS prompt_cache_sync_embedding_vector()")
+    op.drop_column('prompt_cache', 'prompt_embedding')
+
+
+def downgrade() -> None:
+    op.add_column(
+        'prompt_cache',
+        sa.Column('prompt_embedding', postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    )
+
+    bind = op.get_bind()
+    _convert(
+        bind,
+        """
+        SELECT id, embedding_blob FROM prompt_cache
+        WHERE embedding_blob IS NOT NULL
+          AND (CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid))
+        ORDER BY id LIMIT :batch
+        """,
+        "UPDATE prompt_cache SET prompt_embedding = CAST(:value AS jsonb) WHERE id = :id",
+        lambda blob: json.dumps(_unpack(blob)),
+    )
+
+    op.drop_column('prompt_cache', 'embedding_blob')
+
+    # Restore the JSONB -> embedding_vector trigger from o3c4d5e6f7g8
+    has_vector = bind.execute(sa.text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'prompt_cache' AND column_name = 'embedding_vector'
+    """)).scalar()
+    if has_vector:
+        op.execute("""
+            CREATE OR REPLACE FUNCTION prompt_cache_sync_embedding_vector() RETURNS trigger AS $$
+            BEGIN
+                IF jsonb_typeof(NEW.prompt_embedding) = 'array'
+                   AND jsonb_array_length(NEW.prompt_embedding) = 768 THEN
+                    NEW.embedding_vector := (NEW.prompt_embedding::text)::vector;
+                ELSE
+                    NEW.embedding_vector := NULL;
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER trg_prompt_cache_embedding_vector
+            BEFORE INSERT OR UPDATE OF prompt_embedding ON prompt_cache
+            FOR EACH ROW EXECUTE FUNCTION prompt_cache_sync_embedding_vector()
+        """)
@@ -0,0 +1,36 @@
+"""Add search indexes to demo_videos
+
+Revision ID: q5e6f7g8h9i0
+Revises: p4d5e6f7g8h9
+Create Date: 2025-02-03
+
+Changes:
+- GIN index on keywords (array overlap / containment)
+- GIN full-text index on to_tsvector('simple', title + prompt)
+- B-tree indexes on popularity_score and (style, popularity_score) for the
+  popularity-ordered candidates of DemoMatchingService.search_demos
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'q5e6f7g8h9i0'
+down_revision = 'p4d5e6f7g8h9'
+branch_labels = None
+depends_on = None
+
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(title, '') || ' ' || prompt)"
+
+
+def upgrade() -> None:
+    op.create_index('idx_demo_video_keywords', 'demo_videos', ['keywords'], postgresql_using='gin')
+    op.create_index('idx_demo_video_search', 'demo_videos', [sa.text(SEARCH_DOCUMENT)], postgresql_using='gin')
+    op.create_index('idx_demo_video_popularity', 'demo_videos', ['popularity_score'])
+    op.create_index('idx_demo_video_style_popularity', 'demo_videos', ['style', 'popularity_score'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_demo_video_style_popularity', table_name='demo_videos')
+    op.drop_index('idx_demo_video_popularity', table_name='demo_videos')
+    op.drop_index('idx_demo_video_search', table_name='demo_videos')
+    op.drop_index('idx_demo_video_keywords', table_name='demo_videos')
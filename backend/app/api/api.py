@@ -1,21 +1,35 @@
-from fastapi import APIRouter
+from fastapi import FastAPI
 from app.api.v1 import auth, payments, demo, plans, promotions, credits, effects, generation, landing, quota, tools, admin, session, interior, workflow, subscriptions, prompts
 
-api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
-api_router.include_router(subscriptions.router, tags=["subscriptions"])
-api_router.include_router(demo.router, prefix="/demo", tags=["demo"])
-api_router.include_router(plans.router, prefix="/plans", tags=["plans"])
-api_router.include_router(promotions.router, prefix="/promotions", tags=["promotions"])
-api_router.include_router(credits.router, tags=["credits"])
-api_router.include_router(effects.router, tags=["effects"])
-api_router.include_router(generation.router, prefix="/generate", tags=["generation"])
-api_router.include_router(landing.router, prefix="/landing", tags=["landing"])
-api_router.include_router(quota.router, prefix="/quota", tags=["quota"])
-api_router.include_router(tools.router, prefix="/tools", tags=["tools"])
-api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
-api_router.include_router(session.router, prefix="/session", tags=["session"])
-api_router.include_router(interior.router, tags=["interior"])
-api_router.include_router(workflow.router, tags=["workflow"])
-api_router.include_router(prompts.router, prefix="/prompts", tags=["prompts"])
+# (router, prefix, tags) for every v1 router
+API_ROUTERS = [
+    (auth.router, "/auth", ["auth"]),
+    (payments.router, "/payments", ["payments"]),
+    (subscriptions.router, "", ["subscriptions"]),
+    (demo.router, "/demo", ["demo"]),
+    (plans.router, "/plans", ["plans"]),
+    (promotions.router, "/promotions", ["promotions"]),
+    (credits.router, "", ["credits"]),
+    (effects.router, "", ["effects"]),
+    (generation.router, "/generate", ["generation"]),
+    (landing.router, "/landing", ["landing"]),
+    (quota.router, "/quota", ["quota"]),
+    (tools.router, "/tools", ["tools"]),
+    (admin.router, "/admin", ["admin"]),
+    (session.router, "/session", ["session"]),
+    (interior.router, "", ["interior"]),
+    (workflow.router, "", ["workflow"]),
+    (prompts.router, "/prompts", ["prompts"]),
+]
+
+
+def include_api_routers(app: FastAPI, prefix: str = "") -> None:
+    """
+    Include every v1 router directly on the app.
+
+    FastAPI re-creates each route on include_router, so going through an
+    intermediate APIRouter would build all ~200 routes (and their
+    dependency and response models) twice at import time.
+    """
+    for router, router_prefix, tags in API_ROUTERS:
+        app.include_router(router, prefix=prefix + router_prefix, tags=tags)
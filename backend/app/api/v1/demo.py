@@ -31,9 +31,11 @@ from app.services.demo_service import get_demo_service, DEMO_TOPICS, DEMO_STYLES
 from app.services.prompt_matching import get_prompt_matching_service
 from app.services.moderation import get_moderation_service
 from app.services.block_cache import get_block_cache
+from app.services.gallery_index import GALLERY_CATEGORY_MAP, GalleryItem, matches_keywords
 from app.services.gemini_service import get_gemini_service
 from app.services.similarity import get_similarity_service
 from app.services.rescue_service import get_rescue_service
+from app.services.response_cache import TOOL_SHOWCASES, cached_json_response, get_version_keys
 from app.services.material import MaterialLibraryService, UserContentCollector, MATERIAL_REQUIREMENTS
 
 router = APIRouter()
@@ -384,6 +386,7 @@ async def use_preset(
 
 @router.get("/presets/{tool_type}")
 async def get_presets(
+    request: Request,
     tool_type: str,
     topic: Optional[str] = Query(None, description="Topic filter"),
     limit: int = Query(20, ge=1, le=50, description="Maximum number of presets"),
@@ -394,35 +397,46 @@ async def get_presets(
 
     Returns list of preset templates with thumbnails.
     Users can only select from these presets - no custom input allowed.
+    Served pre-serialized with an ETag, rebuilt when the preset catalog changes.
     """
     from app.services.material_lookup import get_material_lookup_service
+    from app.services.preset_catalog import get_preset_catalog
 
-    lookup_service = get_material_lookup_service(db)
-    presets = await lookup_service.get_presets_for_tool(tool_type, topic, limit)
+    async def build(session: AsyncSession) -> dict:
+        lookup_service = get_material_lookup_service(session)
+        presets = await lookup_service.get_presets_for_tool(tool_type, topic, limit)
 
-    return {
-        "success": True,
-        "tool_type": tool_type,
-        "topic": topic,
-        "presets": [
-            {
-                "id": str(p.id),
-                "prompt": p.prompt,
-                "prompt_zh": p.prompt_zh,
-                "input_image_url": p.input_image_url,
-                "input_video_url": p.input_video_url,
-                "result_image_url": p.result_image_url,
-                "result_video_url": p.result_video_url,
-                "result_watermarked_url": p.result_watermarked_url,
-                "thumbnail_url": p.result_thumbnail_url or p.result_watermarked_url or p.result_image_url,
-                "topic": p.topic,
-                "input_params": p.input_params or {},
-                "style_tags": p.tags or []
-            }
-            for p in presets
-        ],
-        "count": len(presets)
-    }
+        return {
+            "success": True,
+            "tool_type": tool_type,
+            "topic": topic,
+            "presets": [
+                {
+                    "id": str(p.id),
+                    "prompt": p.prompt,
+                    "prompt_zh": p.prompt_zh,
+                    "input_image_url": p.input_image_url,
+                    "input_video_url": p.input_video_url,
+                    "result_image_url": p.result_image_url,
+                    "result_video_url": p.result_video_url,
+                    "result_watermarked_url": p.result_watermarked_url,
+                    "thumbnail_url": p.result_thumbnail_url or p.result_watermarked_url or p.result_image_url,
+                    "topic": p.topic,
+                    "input_params": p.input_params or {},
+                    "style_tags": p.tags or []
+                }
+                for p in presets
+            ],
+            "count": len(presets)
+        }
+
+    catalog = await get_preset_catalog().get(db)
+    return await cached_json_response(
+        request, db,
+        key=("presets", tool_type, topic, limit),
+        version=catalog.generation if catalog is not None else None,
+        build=build,
+    )
 
 
 @router.get("/download/{preset_id}")
@@ -1131,6 +1145,7 @@ async def save_user_showcase(
     db.add(showcase)
     await db.commit()
     await db.refresh(showcase)
+    await get_version_keys().bump(TOOL_SHOWCASES)
 
     return {
         "success": True,
@@ -1141,53 +1156,63 @@ async def save_user_showcase(
 
 @router.get("/tool-categories")
 async def get_tool_categories(
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get all tool categories with their tools and showcase counts.
+    Served pre-serialized with an ETag, rebuilt when showcases change.
     """
     from sqlalchemy import func
 
-    # Get showcase counts by category and tool
-    result = await db.execute(
-        select(
-            ToolShowcase.tool_category,
-            ToolShowcase.tool_id,
-            ToolShowcase.tool_name,
-            ToolShowcase.tool_name_zh,
-            func.count(ToolShowcase.id).label("count")
-        )
-        .where(ToolShowcase.is_active == True)
-        .group_by(
-            ToolShowcase.tool_category,
-            ToolShowcase.tool_id,
-            ToolShowcase.tool_name,
-            ToolShowcase.tool_name_zh
+    async def build(session: AsyncSession) -> dict:
+        # Get showcase counts by category and tool
+        result = await session.execute(
+            select(
+                ToolShowcase.tool_category,
+                ToolShowcase.tool_id,
+                ToolShowcase.tool_name,
+                ToolShowcase.tool_name_zh,
+                func.count(ToolShowcase.id).label("count")
+            )
+            .where(ToolShowcase.is_active == True)
+            .group_by(
+                ToolShowcase.tool_category,
+                ToolShowcase.tool_id,
+                ToolShowcase.tool_name,
+                ToolShowcase.tool_name_zh
+            )
         )
-    )
-    rows = result.fetchall()
+        rows = result.fetchall()
+
+        # Organize by category
+        categories = {}
+        for row in rows:
+            cat = row[0]
+            if cat not in categories:
+                categories[cat] = {
+                    "category": cat,
+                    "category_name": cat.replace("_", " ").title(),
+                    "tools": []
+                }
+            categories[cat]["tools"].append({
+                "tool_id": row[1],
+                "tool_name": row[2],
+                "tool_name_zh": row[3],
+                "showcase_count": row[4]
+            })
 
-    # Organize by category
-    categories = {}
-    for row in rows:
-        cat = row[0]
-        if cat not in categories:
-            categories[cat] = {
-                "category": cat,
-                "category_name": cat.replace("_", " ").title(),
-                "tools": []
-            }
-        categories[cat]["tools"].append({
-            "tool_id": row[1],
-            "tool_name": row[2],
-            "tool_name_zh": row[3],
-            "showcase_count": row[4]
-        })
+        return {
+            "categories": list(categories.values()),
+            "total_categories": len(categories)
+        }
 
-    return {
-        "categories": list(categories.values()),
-        "total_categories": len(categories)
-    }
+    return await cached_json_response(
+        request, db,
+        key=("tool-categories",),
+        version=await get_version_keys().get(TOOL_SHOWCASES),
+        build=build,
+    )
 
 
 # =============================================================================
@@ -1704,30 +1729,35 @@ async def get_avatar_materials(
     Supported languages: 'en', 'zh-TW'
     """
     from app.models.material import Material, ToolType, MaterialStatus
-    from sqlalchemy import func
+    from app.services.material_sampler import get_material_sampler
 
     # Validate language
     if language not in ["en", "zh-TW"]:
         language = "en"
 
-    # Build query for avatar materials
-    query = select(Material).where(
+    conditions = [
         Material.tool_type == ToolType.AI_AVATAR,
         Material.language == language,
         Material.status == MaterialStatus.APPROVED,
         Material.is_active == True,
         Material.result_video_url.isnot(None)
-    )
+    ]
 
     # Filter by topic if specified
     if topic:
-        query = query.where(Material.topic == topic)
+        conditions.append(Material.topic == topic)
 
-    # Order by quality score and randomize
-    query = query.order_by(func.random()).limit(limit)
-
-    result = await db.execute(query)
-    materials = result.scalars().all()
+    # Random avatars from the sampler's id sets, loaded by primary key
+    materials = await get_material_sampler().draw(
+        db,
+        limit,
+        conditions,
+        tool_type=ToolType.AI_AVATAR,
+        topics=[topic] if topic else None,
+        where=lambda r: (
+            r.language == language and r.status == MaterialStatus.APPROVED and r.has_video
+        ),
+    )
 
     # Format response
     avatars = []
@@ -1906,6 +1936,11 @@ class BlockCacheStatsResponse(BaseModel):
     blocked_by_seed: int
     blocked_by_gemini: int
     blocked_by_manual: int
+    local_cache_hits: int = 0
+    local_cache_misses: int = 0
+    local_cache_size: int = 0
+    redis_cache_hits: int = 0
+    redis_cache_misses: int = 0
 
 
 @router.get("/block-cache/stats", response_model=BlockCacheStatsResponse)
@@ -2151,35 +2186,6 @@ async def promote_material_to_showcase(
 # INSPIRATION GALLERY - 24 Categories
 # =============================================================================
 
-# Map gallery categories to material topics
-GALLERY_CATEGORY_MAP = {
-    "video": ["short_video", "video"],
-    "recommended": ["product", "ecommerce", "brand"],
-    "portrait": ["portrait", "people", "human"],
-    "photography": ["photography", "realistic"],
-    "animation": ["animation", "cartoon", "animated"],
-    "poster": ["poster", "illustration", "design"],
-    "anime": ["anime", "manga", "2d"],
-    "ecommerceDesign": ["ecommerce", "product", "shopping"],
-    "chinese": ["chinese", "oriental", "asian"],
-    "female": ["female", "woman", "girl"],
-    "male": ["male", "man", "boy"],
-    "interior": ["interior", "room", "home"],
-    "architectureLandscape": ["architecture", "landscape", "building"],
-    "toys": ["toys", "figures", "collectibles"],
-    "art": ["art", "painting", "artistic"],
-    "productDesign": ["product", "industrial", "design"],
-    "gameCG": ["game", "cg", "gaming"],
-    "nature": ["nature", "natural", "landscape"],
-    "threeD": ["3d", "render", "dimensional"],
-    "logoUI": ["logo", "ui", "branding"],
-    "character": ["character", "ip", "mascot"],
-    "animals": ["animals", "pets", "wildlife"],
-    "fantasy": ["fantasy", "magical", "mythical"],
-    "scifi": ["scifi", "futuristic", "tech"]
-}
-
-
 @router.get("/inspirations")
 async def get_inspirations(
     category: str = Query("recommended", description="Gallery category"),
@@ -2199,61 +2205,46 @@ async def get_inspirations(
     - architectureLandscape, toys, art, productDesign, gameCG, nature
     - threeD, logoUI, character, animals, fantasy, scifi
     """
-    from sqlalchemy import func, or_
-    from app.models.material import Material, MaterialStatus
-
-    # Get topic keywords for this category
-    topic_keywords = GALLERY_CATEGORY_MAP.get(category, [category])
+    from sqlalchemy import or_
+    from app.models.material import Material
+    from app.services.material_sampler import get_material_sampler
 
-    # Build query to find materials matching any of the topic keywords
-    conditions = []
-    for keyword in topic_keywords:
-        conditions.append(Material.topic.ilike(f"%{keyword}%"))
-        conditions.append(Material.tags.contains([keyword]))
+    sampler = get_material_sampler()
 
-    # Query materials with images
-    result = await db.execute(
-        select(Material)
-        .where(
-            or_(*conditions) if conditions else True,
-            Material.is_active == True,
-            or_(
-                Material.result_image_url.isnot(None),
-                Material.input_image_url.isnot(None)
-            )
+    if category in GALLERY_CATEGORY_MAP:
+        # Precomputed membership: random members, already localized
+        gallery_items = await sampler.sample_gallery(db, category, limit)
+    else:
+        # Ad-hoc category: its name is the topic keyword
+        topic_keywords = [category]
+        materials = await sampler.draw(
+            db,
+            limit,
+            [
+                or_(
+                    Material.topic.ilike(f"%{category}%"),
+                    Material.tags.contains([category])
+                ),
+                Material.is_active == True,
+                or_(
+                    Material.result_image_url.isnot(None),
+                    Material.input_image_url.isnot(None)
+                )
+            ],
+            where=lambda r: r.has_image and matches_keywords(topic_keywords, r.topic, r.tags),
         )
-        .order_by(func.random())
-        .limit(limit)
-    )
-    materials = result.scalars().all()
+        # Same title / thumbnail / prompt resolution as the precomputed path
+        gallery_items = [GalleryItem(m, frozenset()) for m in materials]
 
-    # Format response based on language
+    # Format response
     items = []
-    for m in materials:
-        # Determine title based on language
-        if language.startswith("zh"):
-            title = m.title_zh or m.title_en or f"{category} #{len(items) + 1}"
-        elif language.startswith("ja"):
-            title = m.title_en or f"{category} #{len(items) + 1}"  # TODO: Add ja titles
-        elif language.startswith("ko"):
-            title = m.title_en or f"{category} #{len(items) + 1}"  # TODO: Add ko titles
-        elif language.startswith("es"):
-            title = m.title_en or f"{category} #{len(items) + 1}"  # TODO: Add es titles
-        else:
-            title = m.title_en or f"{category} #{len(items) + 1}"
-
-        # Get the prompt (prefer localized if available)
-        prompt = m.prompt or m.prompt_enhanced or ""
-
-        # Get best available image
-        thumb = m.result_image_url or m.input_image_url or m.result_thumbnail_url
-
-        if thumb:  # Only include items with images
+    for item in gallery_items:
+        if item.thumb:  # Only include items with images
             items.append({
-                "id": str(m.id),
-                "title": title,
-                "thumb": thumb,
-                "prompt": prompt,
+                "id": str(item.id),
+                "title": item.title(language) or f"{category} #{len(items) + 1}",
+                "thumb": item.thumb,
+                "prompt": item.prompt,
                 "category": category
             })
 
@@ -2399,21 +2390,21 @@ async def get_watch_demo(
     Get a random ad video for Watch Demo button.
     Returns a random material with video from the DB.
     """
-    from sqlalchemy import func
     from app.models.material import Material
+    from app.services.material_sampler import get_material_sampler
 
-    # Query random material with video
-    result = await db.execute(
-        select(Material)
-        .where(
+    # Random material with video, sampled in process and loaded by id
+    materials = await get_material_sampler().draw(
+        db,
+        1,
+        [
             Material.result_video_url.isnot(None),
             Material.is_active == True,
             Material.language == language if language else True
-        )
-        .order_by(func.random())
-        .limit(1)
+        ],
+        where=lambda r: r.has_video and (not language or r.language == language),
     )
-    material = result.scalar_one_or_none()
+    material = materials[0] if materials else None
 
     if material:
         return {
@@ -2445,8 +2436,8 @@ async def get_view_more_examples(
     Get 6 random short videos with AI Avatar for "View More Examples" modal.
     Each video is paired with an AI Avatar from the same topic.
     """
-    from sqlalchemy import func
     from app.models.material import Material, ToolType
+    from app.services.material_sampler import get_material_sampler
 
     # Determine avatar language
     avatar_lang = "zh-TW" if language.startswith("zh") else "en"
@@ -2461,18 +2452,19 @@ async def get_view_more_examples(
         topics_to_query = landing_topics
 
     # Get random product videos
-    videos_result = await db.execute(
-        select(Material)
-        .where(
+    videos = await get_material_sampler().draw(
+        db,
+        6,
+        [
             Material.tool_type == ToolType.SHORT_VIDEO,
             Material.result_video_url.isnot(None),
             Material.is_active == True,
             Material.topic.in_(topics_to_query)
-        )
-        .order_by(func.random())
-        .limit(6)
+        ],
+        tool_type=ToolType.SHORT_VIDEO,
+        topics=topics_to_query,
+        where=lambda r: r.has_video,
     )
-    videos = videos_result.scalars().all()
 
     # Get all avatars for the language
     avatars_result = await db.execute(
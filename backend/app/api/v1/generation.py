@@ -31,9 +31,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize provider router singleton
-provider_router = get_provider_router()
-
 
 # ============================================================================
 # Rescue-Enabled Generation Models
@@ -115,7 +112,7 @@ async def text_to_image_with_rescue(request: T2IRequest):
     Uses PiAPI (Wan) as primary with Pollo as backup.
     """
     try:
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.T2I,
             {
                 "prompt": request.prompt,
@@ -149,7 +146,7 @@ async def image_to_video_with_rescue(request: I2VRequest):
     Uses PiAPI (Wan I2V) as primary with Pollo as backup.
     """
     try:
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.I2V,
             {
                 "image_url": request.image_url,
@@ -184,7 +181,7 @@ async def interior_design_with_rescue(request: InteriorRequest):
     Uses PiAPI (Wan Doodle) as primary with Gemini as backup.
     """
     try:
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.INTERIOR,
             {
                 "image_url": request.image_url,
@@ -220,7 +217,7 @@ async def check_service_status():
     Returns status of PiAPI, Pollo, GoEnhance, A2E, and Gemini.
     """
     try:
-        status = await provider_router.check_service_status()
+        status = await get_provider_router().check_service_status()
 
         return ServiceStatusResponse(
             piapi=status.get("piapi", {"status": "unknown"}),
@@ -333,7 +330,7 @@ async def generate_pattern(
         }
         style_desc = style_prompts.get(request.style, "seamless pattern")
 
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.T2I,
             {
                 "prompt": f"{request.prompt}, {style_desc}, high quality, detailed",
@@ -375,7 +372,7 @@ async def transfer_pattern(
     Blends pattern with product while maintaining product shape
     """
     try:
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.T2I,
             {
                 "prompt": "Product with pattern overlay, seamless integration, professional product photography",
@@ -422,7 +419,7 @@ async def remove_background(
     """
     try:
         # Use provider router for background removal (GoEnhance)
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.BACKGROUND_REMOVAL,
             {"image_url": str(request.image_url)}
         )
@@ -475,7 +472,7 @@ async def generate_product_scene(
 
     try:
         full_prompt = f"Product photography, {scene_prompt}, professional quality"
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.T2I,
             {
                 "prompt": full_prompt,
@@ -554,7 +551,7 @@ async def image_to_video(
     Optional style transformation via GoEnhance.
     """
     try:
-        result = await provider_router.route(
+        result = await get_provider_router().route(
             TaskType.I2V,
             {
                 "image_url": str(request.image_url),
@@ -814,7 +811,7 @@ async def get_api_status():
     Check status of all AI providers (PiAPI, Pollo, GoEnhance, A2E, Gemini)
     """
     try:
-        status = await provider_router.get_all_status()
+        status = await get_provider_router().get_all_status()
         return status
     except Exception as e:
         logger.error(f"API status check failed: {e}")
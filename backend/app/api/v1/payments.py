@@ -35,9 +35,6 @@ ecpay_client = ECPayClient(
     payment_url=settings.ECPAY_PAYMENT_URL
 )
 
-# Initialize Paddle service
-paddle_service = get_paddle_service()
-
 
 # =============================================================================
 # ECPAY ENDPOINTS (Taiwan)
@@ -145,7 +142,7 @@ async def create_paddle_checkout(
         raise HTTPException(status_code=400, detail="Order already paid")
 
     # Create Paddle checkout
-    paddle_result = await paddle_service.create_checkout_session(
+    paddle_result = await get_paddle_service().create_checkout_session(
         user_id=current_user.id,
         user_email=current_user.email,
         plan_id=str(order.payment_data.get("plan_id", "")),
@@ -185,6 +182,7 @@ async def paddle_webhook(
     - subscription.canceled - Subscription cancelled
     """
     body = await request.body()
+    paddle_service = get_paddle_service()
 
     # Verify webhook signature (skip in mock mode)
     if not paddle_service.is_mock and not paddle_service.verify_webhook(body, paddle_signature or ""):
@@ -273,7 +271,7 @@ async def get_paddle_customer_portal(
     - Download invoices
     """
     # Get or create Paddle customer
-    customer_result = await paddle_service.get_or_create_customer(
+    customer_result = await get_paddle_service().get_or_create_customer(
         email=current_user.email,
         name=current_user.full_name
     )
@@ -282,7 +280,7 @@ async def get_paddle_customer_portal(
         raise HTTPException(status_code=500, detail=customer_result.get("error"))
 
     # Get portal URL
-    portal_result = await paddle_service.get_customer_portal_url(
+    portal_result = await get_paddle_service().get_customer_portal_url(
         customer_id=customer_result.get("customer_id")
     )
 
@@ -342,7 +340,7 @@ async def mock_complete_payment(
 
     Only works when Paddle is in mock mode (no API key configured).
     """
-    if not paddle_service.is_mock:
+    if not get_paddle_service().is_mock:
         raise HTTPException(
             status_code=400,
             detail="Mock payment only available in development mode"
@@ -13,19 +13,19 @@ IMPORTANT ACCESS RULES:
 - Subscribed users: Can use custom prompts and call APIs
 - Subscribed users: Can download original quality results
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from pydantic import BaseModel, Field
 from datetime import datetime
-import httpx
 
 from app.core.database import get_db
 from app.services.prompt_generator import (
     PromptGeneratorService,
     get_prompt_generator_service,
 )
+from app.services.response_cache import PROMPT_TEMPLATES, cached_json_response, get_version_keys
 from app.models.prompt_template import PromptGroup, PromptSubTopic
 
 router = APIRouter()
@@ -189,6 +189,7 @@ async def generate_prompt(
 
 @router.get("/defaults/{group}", response_model=List[PromptTemplateResponse])
 async def get_default_templates(
+    request: Request,
     group: str,
     limit: int = Query(5, ge=1, le=20),
     db: AsyncSession = Depends(get_db),
@@ -197,20 +198,28 @@ async def get_default_templates(
     Get default templates with cached results for demo/non-subscribed users.
 
     This endpoint is crucial for reducing API calls - demo users
-    can only use these pre-generated results.
+    can only use these pre-generated results. Served pre-serialized with
+    an ETag, rebuilt when templates change.
     """
     try:
         prompt_group = PromptGroup(group)
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid group: {group}")
 
-    service = get_prompt_generator_service(db)
-    templates = await service.get_default_templates_for_demo(
-        group=prompt_group,
-        limit=limit,
-    )
+    async def build(session: AsyncSession) -> list:
+        service = get_prompt_generator_service(session)
+        templates = await service.get_default_templates_for_demo(
+            group=prompt_group,
+            limit=limit,
+        )
+        return [PromptTemplateResponse(**t) for t in templates]
 
-    return [PromptTemplateResponse(**t) for t in templates]
+    return await cached_json_response(
+        request, db,
+        key=("prompt-defaults", prompt_group.value, limit),
+        version=await get_version_keys().get(PROMPT_TEMPLATES),
+        build=build,
+    )
 
 
 @router.get("/cached")
@@ -251,6 +260,7 @@ async def get_cached_result(
 
 @router.get("/templates/{group}", response_model=List[PromptTemplateResponse])
 async def get_templates_by_group(
+    request: Request,
     group: str,
     sub_topic: Optional[str] = None,
     language: str = "en",
@@ -260,6 +270,7 @@ async def get_templates_by_group(
 ):
     """
     Get templates filtered by group and optionally sub_topic.
+    Served pre-serialized with an ETag, rebuilt when templates change.
     """
     try:
         prompt_group = PromptGroup(group)
@@ -273,32 +284,44 @@ async def get_templates_by_group(
         except ValueError:
             pass
 
-    service = get_prompt_generator_service(db)
-    templates = await service.get_templates_by_group(
-        group=prompt_group,
-        sub_topic=sub_topic_enum,
-        language=language,
-        limit=limit,
-        include_premium=include_premium,
-    )
-
-    return [
-        PromptTemplateResponse(
-            id=str(t.id),
-            prompt=t.prompt,
-            prompt_zh=t.prompt_zh,
-            group=t.group.value,
-            sub_topic=t.sub_topic.value,
-            input_image_url=t.input_image_url,
-            result_image_url=t.result_image_url,
-            result_video_url=t.result_video_url,
-            result_thumbnail_url=t.result_thumbnail_url,
-            result_watermarked_url=t.result_watermarked_url,
-            title_en=t.title_en,
-            title_zh=t.title_zh,
+    async def build(session: AsyncSession) -> list:
+        service = get_prompt_generator_service(session)
+        templates = await service.get_templates_by_group(
+            group=prompt_group,
+            sub_topic=sub_topic_enum,
+            language=language,
+            limit=limit,
+            include_premium=include_premium,
         )
-        for t in templates
-    ]
+
+        return [
+            PromptTemplateResponse(
+                id=str(t.id),
+                prompt=t.prompt,
+                prompt_zh=t.prompt_zh,
+                group=t.group.value,
+                sub_topic=t.sub_topic.value,
+                input_image_url=t.input_image_url,
+                result_image_url=t.result_image_url,
+                result_video_url=t.result_video_url,
+                result_thumbnail_url=t.result_thumbnail_url,
+                result_watermarked_url=t.result_watermarked_url,
+                title_en=t.title_en,
+                title_zh=t.title_zh,
+            )
+            for t in templates
+        ]
+
+    return await cached_json_response(
+        request, db,
+        key=(
+            "prompt-templates", prompt_group.value,
+            sub_topic_enum.value if sub_topic_enum else None,
+            language, limit, include_premium,
+        ),
+        version=await get_version_keys().get(PROMPT_TEMPLATES),
+        build=build,
+    )
 
 
 @router.get("/similar")
@@ -68,6 +68,35 @@ class Settings(BaseSettings):
     # Material Generation
     AUTO_GENERATE_MATERIALS: bool = True  # Auto-generate showcase materials on startup
 
+    # Content Moderation (Block Cache)
+    BLOCK_CACHE_LOCAL_MATCHER: bool = True  # Match blocked words in-process instead of per n-gram Redis lookups
+    BLOCK_CACHE_LOCAL_SIZE: int = 1000  # Prompt verdicts kept in each worker's LRU
+    BLOCK_CACHE_LOCAL_TTL: int = 300  # Seconds a local verdict stays valid
+    BLOCK_CACHE_STATS_FLUSH_INTERVAL: float = 5.0  # Seconds between batched block:stats flushes
+    GEMINI_SINGLE_FLIGHT_DISTRIBUTED: bool = False  # Coalesce identical Gemini moderation calls across workers via Redis
+    GEMINI_MODERATION_BATCH_WINDOW_MS: int = 0  # Micro-batch window for Gemini moderation (0 = single calls; batching puts different users' prompts in one request, so an injected prompt can sway its neighbours' verdicts)
+    GEMINI_MODERATION_BATCH_SIZE: int = 16  # Max prompts per batched Gemini request
+    GEMINI_MODERATION_BATCH_TIMEOUT: float = 15.0  # Seconds before a batch falls back to single calls
+
+    # Prompt Similarity
+    SIMILARITY_USE_PGVECTOR: bool = True  # Search prompt_cache.embedding_vector in Postgres when the column exists
+    SIMILARITY_LOCAL_MATCH_THRESHOLD: float = 0.0  # Reuse a cached prompt on offline n-gram similarity alone (0 = off; n-gram scores are lexical, "cat" vs "dog" can pass 0.95)
+    SIMILARITY_LOCAL_PREFILTER: float = 0.0  # Skip the Gemini embedding when no cached prompt is this close locally (0 = off; also drops paraphrases)
+    EMBEDDING_CACHE_REDIS: bool = True  # Share cached Gemini embeddings across workers via Redis
+    EMBEDDING_CACHE_LOCAL_SIZE: int = 2000  # Embeddings kept in each worker's LRU
+    EMBEDDING_CACHE_LOCAL_TTL: int = 3600  # Seconds an embedding stays in the local LRU
+    EMBEDDING_CACHE_TTL: int = 604800  # Seconds an embedding stays in Redis (7 days)
+    EMBEDDING_STORAGE_DTYPE: str = "float32"  # prompt_cache embedding storage: float32 or float16
+
+    # Preset Catalog
+    PRESET_CATALOG_REFRESH_INTERVAL: float = 5.0  # Seconds between checks of the catalog version key
+    PRESET_CATALOG_MAX_AGE: int = 300  # Seconds before a catalog snapshot is reloaded regardless of version
+    RESPONSE_CACHE_CONTROL_MAX_AGE: int = 60  # Cache-Control max-age on pre-serialized listing responses
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000  # Pre-serialized listing bodies kept per worker
+
+    # Write-Behind Counters
+    COUNTER_FLUSH_INTERVAL: float = 5.0  # Seconds between batched usage/popularity counter writes
+
     # Email Configuration (for email verification)
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
@@ -0,0 +1,43 @@
+"""
+Deferred Imports
+Heavy third-party modules (numpy, httpx, PIL) are bound at module level
+through lazy_import() so that importing the app, the models or a service
+does not load them; the real import runs on first attribute access.
+
+Workers that never touch a code path never pay for its dependencies, and
+the import cost of the rest moves from boot to the first request that
+needs it.
+"""
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def is_loaded(name: str) -> bool:
+    """True if `name` has been imported and executed (not just bound lazily)."""
+    module = sys.modules.get(name)
+    # A pending lazy module is a ModuleType subclass until its first access
+    return module is not None and type(module) is ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Module object for `name` that is executed on first attribute access.
+
+    Already-imported modules are returned as is. Raises ModuleNotFoundError
+    immediately if the module is not installed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
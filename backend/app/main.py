@@ -1,12 +1,14 @@
 import asyncio
 import logging
-from contextlib import asynccontextmanager
+import time
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.core.config import get_settings
-from app.api.api import api_router
+from app.api.api import include_api_routers
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -21,10 +23,10 @@ STATIC_DIR.mkdir(parents=True, exist_ok=True)
 
 async def validate_materials_on_startup() -> dict:
     """
-    BLOCKING VALIDATION: Check if all required preset materials exist in Material DB.
+    Check if all required preset materials exist in Material DB.
 
-    PRESET-ONLY MODE requires all materials to be pre-generated before service starts.
-    If materials are missing, the service will NOT accept requests until they are ready.
+    PRESET-ONLY MODE requires all materials to be pre-generated. Counts come
+    from a single grouped query; missing materials are reported, not fatal.
 
     Returns:
         dict: Validation result with 'all_ready' flag and details
@@ -34,7 +36,7 @@ async def validate_materials_on_startup() -> dict:
         from app.core.database import AsyncSessionLocal
 
         logger.info("=" * 60)
-        logger.info("BLOCKING STARTUP: VALIDATING PRE-GENERATED MATERIALS")
+        logger.info("STARTUP: VALIDATING PRE-GENERATED MATERIALS")
         logger.info("=" * 60)
 
         generator = get_material_generator()
@@ -52,7 +54,7 @@ async def validate_materials_on_startup() -> dict:
         all_ready = len(missing) == 0
 
         if all_ready:
-            logger.info("ALL MATERIALS VALIDATED - Service ready to accept requests")
+            logger.info("ALL MATERIALS VALIDATED")
         else:
             logger.warning(f"MISSING MATERIALS: {missing}")
             logger.warning("Service will start but materials may be incomplete")
@@ -75,37 +77,100 @@ async def validate_materials_on_startup() -> dict:
         }
 
 
+async def run_startup_checks(app: FastAPI) -> None:
+    """
+    Validate materials and load the preset catalog in the background, then
+    set readiness. Workers accept traffic (liveness) while this runs;
+    /health/ready reports 503 until it finishes, and keeps reporting 503
+    with the errors if a check failed: "degraded" when one of the two
+    checks failed, "failed" when both did. Missing materials are only a
+    warning.
+    """
+    started = time.monotonic()
+    errors = {}
+
+    try:
+        validation_result = await validate_materials_on_startup()
+
+        # Store validation result in app state for health checks
+        app.state.materials_validated = validation_result.get('all_ready', False)
+        app.state.materials_status = validation_result
+
+        if 'error' in validation_result:
+            errors['materials'] = validation_result['error']
+        elif not validation_result.get('all_ready', False):
+            logger.warning("=" * 60)
+            logger.warning("WARNING: Some materials may be missing!")
+            logger.warning("Run 'python scripts/pregenerate_all.py' to generate materials")
+            logger.warning("=" * 60)
+    except Exception as e:
+        logger.error(f"Material validation failed: {e}")
+        errors['materials'] = str(e)
+
+    # Load the preset catalog snapshot before it is needed by lookups
+    try:
+        from app.core.database import AsyncSessionLocal
+        from app.services.preset_catalog import get_preset_catalog
+
+        async with AsyncSessionLocal() as session:
+            if await get_preset_catalog().get(session) is None:
+                errors['preset_catalog'] = "snapshot could not be loaded"
+    except Exception as e:
+        logger.error(f"Failed to preload preset catalog: {e}")
+        errors['preset_catalog'] = str(e)
+
+    if not errors:
+        app.state.readiness = "ready"
+    else:
+        app.state.readiness = "failed" if len(errors) == 2 else "degraded"
+    app.state.startup_errors = errors
+    app.state.startup_seconds = round(time.monotonic() - started, 3)
+    logger.info(f"Startup checks finished in {app.state.startup_seconds}s ({app.state.readiness})")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     FastAPI lifespan context manager for startup/shutdown events.
 
-    PRESET-ONLY MODE: Uses BLOCKING validation to ensure all materials
-    are ready before accepting requests.
+    PRESET-ONLY MODE: material validation and catalog preload run in the
+    background so workers start serving immediately; readiness flips when
+    they finish.
     """
     # Startup
     logger.info("VidGo AI Backend starting up...")
     logger.info("Mode: PRESET-ONLY (Material DB Lookup, No Runtime API Calls)")
 
-    # BLOCKING: Validate all pre-generated materials exist
-    # This ensures the service has all required materials before accepting requests
-    validation_result = await validate_materials_on_startup()
-
-    # Store validation result in app state for health checks
-    app.state.materials_validated = validation_result.get('all_ready', False)
-    app.state.materials_status = validation_result
-
-    if not validation_result.get('all_ready', False):
-        logger.warning("=" * 60)
-        logger.warning("WARNING: Some materials may be missing!")
-        logger.warning("Run 'python scripts/pregenerate_all.py' to generate materials")
-        logger.warning("=" * 60)
+    app.state.readiness = "starting"
+    app.state.startup_errors = {}
+    app.state.materials_validated = False
+    startup_task = asyncio.create_task(run_startup_checks(app))
 
     yield
 
     # Shutdown
     logger.info("VidGo AI Backend shutting down...")
 
+    if not startup_task.done():
+        startup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await startup_task
+
+    # Flush buffered block cache stats
+    from app.services.block_cache import get_block_cache
+    await get_block_cache().close()
+
+    # Flush buffered usage/popularity counters
+    from app.services.write_behind import get_write_behind_counters
+    await get_write_behind_counters().close()
+
+    from app.services.preset_catalog import get_preset_catalog
+    await get_preset_catalog().close()
+
+    from app.services.response_cache import get_response_cache, get_version_keys
+    await get_response_cache().close()
+    await get_version_keys().close()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -123,7 +188,7 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
+include_api_routers(app, prefix=settings.API_V1_STR)
 
 # Mount static files for generated images
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
@@ -131,13 +196,40 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint with material validation status."""
+    """Liveness plus readiness summary (always 200 while the process serves)."""
+    readiness = getattr(app.state, 'readiness', 'starting')
     materials_ready = getattr(app.state, 'materials_validated', False)
     return {
         "status": "ok",
         "mode": "preset-only",
-        "materials_ready": materials_ready
+        "ready": readiness == "ready",
+        "readiness": readiness,
+        "materials_ready": materials_ready,
+        "errors": getattr(app.state, 'startup_errors', {})
+    }
+
+
+@app.get("/health/live")
+def liveness_check():
+    """Liveness: the worker is up and handling requests."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: startup checks have finished and passed (503 otherwise)."""
+    from app.services.preset_catalog import get_preset_catalog
+
+    readiness = getattr(app.state, 'readiness', 'starting')
+    snapshot = get_preset_catalog().snapshot
+    body = {
+        "status": readiness,
+        "materials_ready": getattr(app.state, 'materials_validated', False),
+        "startup_seconds": getattr(app.state, 'startup_seconds', None),
+        "errors": getattr(app.state, 'startup_errors', {}),
+        "preset_catalog": snapshot.stats() if snapshot is not None else None,
     }
+    return JSONResponse(body, status_code=200 if readiness == "ready" else 503)
 
 
 @app.get("/materials/status")
@@ -2,10 +2,12 @@
 Demo Models for Smart Demo Engine
 Supports multi-language prompt matching with before/after image transformation
 """
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, Float, ForeignKey, Index, func
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, Float, ForeignKey, Index, LargeBinary, func, text
 from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.types import TypeDecorator
 import uuid
+from app.core.config import get_settings
 from app.core.database import Base
 
 
@@ -93,6 +95,12 @@ class ImageDemo(Base):
     )
 
 
+# Full-text document for DemoVideo search ('simple' config: lowercase, no
+# stemming, so words match like the Python scorer's tokens). Queries must
+# use the same expression for Postgres to pick the GIN index.
+DEMO_VIDEO_SEARCH_DOCUMENT = "to_tsvector('simple', coalesce({table}title, '') || ' ' || {table}prompt)"
+
+
 class DemoVideo(Base):
     """Pre-generated demo videos for Explore Categories feature"""
     __tablename__ = "demo_videos"
@@ -133,6 +141,10 @@ class DemoVideo(Base):
     # Indexes for fast queries
     __table_args__ = (
         Index('idx_demo_video_category', 'category_slug', 'is_active'),
+        Index('idx_demo_video_keywords', 'keywords', postgresql_using='gin'),
+        Index('idx_demo_video_search', text(DEMO_VIDEO_SEARCH_DOCUMENT.format(table="")), postgresql_using='gin'),
+        Index('idx_demo_video_popularity', 'popularity_score'),
+        Index('idx_demo_video_style_popularity', 'style', 'popularity_score'),
     )
 
 
@@ -150,6 +162,44 @@ class DemoView(Base):
     viewed_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class PackedEmbedding(TypeDecorator):
+    """
+    Embedding vector stored as bytea: a 4-byte dtype tag followed by the
+    little-endian values (float32, or float16 for half the size).
+
+    Values are loaded as read-only numpy.frombuffer views over the fetched
+    bytes (no per-float parsing or copying); lists and arrays are accepted
+    on write. Empty vectors are stored as NULL. numpy is imported on first
+    use so that importing the models does not load it.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    TAGS = {"float32": b"f32\x00", "float16": b"f16\x00"}
+    DTYPES = {b"f32\x00": "<f4", b"f16\x00": "<f2"}
+
+    def __init__(self, dtype: str = "float32"):
+        super().__init__()
+        if dtype not in self.TAGS:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.dtype = dtype
+
+    def process_bind_param(self, value, dialect):
+        if value is None or len(value) == 0:
+            return None
+        import numpy as np
+
+        tag = self.TAGS[self.dtype]
+        return tag + np.asarray(value, dtype=self.DTYPES[tag]).tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        import numpy as np
+
+        return np.frombuffer(value, dtype=self.DTYPES[bytes(value[:4])], offset=4)
+
+
 class PromptCache(Base):
     """
     Cache for user prompts and generated results.
@@ -164,8 +214,11 @@ class PromptCache(Base):
     prompt_enhanced = Column(Text, nullable=True)  # Gemini-enhanced prompt
     detected_language = Column(String(10), nullable=True)
 
-    # Embedding for similarity search (stored as JSON array of floats)
-    prompt_embedding = Column(JSONB, nullable=True)  # Vector embedding for similarity
+    # Embedding for similarity search (packed float32/float16 bytes, loaded as a
+    # NumPy array). Deferred: only the similarity index sync selects it.
+    prompt_embedding = deferred(
+        Column("embedding_blob", PackedEmbedding(get_settings().EMBEDDING_STORAGE_DTYPE), nullable=True)
+    )
 
     # Generated results
     image_url = Column(String(500), nullable=True)
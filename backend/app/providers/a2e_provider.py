@@ -6,14 +6,16 @@ Supports:
 - Multiple voices and languages
 - High quality avatar videos
 """
-import httpx
 import asyncio
 from typing import Dict, Any, List
 import logging
 import os
 
+from app.core.lazy import lazy_import
 from app.providers.base import BaseProvider
 
+httpx = lazy_import("httpx")
+
 logger = logging.getLogger(__name__)
 
 
@@ -6,15 +6,17 @@ Supports:
 - Interior design (emergency backup for PiAPI)
 - Image analysis
 """
-import httpx
 import asyncio
 from typing import Dict, Any
 import logging
 import os
 import base64
 
+from app.core.lazy import lazy_import
 from app.providers.base import BaseProvider
 
+httpx = lazy_import("httpx")
+
 logger = logging.getLogger(__name__)
 
 
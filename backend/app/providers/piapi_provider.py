@@ -8,14 +8,16 @@ Supported models (via PiAPI):
 
 API Documentation: https://piapi.ai/docs/wan-api
 """
-import httpx
 import asyncio
 from typing import Dict, Any, Optional
 import logging
 import os
 
+from app.core.lazy import lazy_import
 from app.providers.base import BaseProvider
 
+httpx = lazy_import("httpx")
+
 logger = logging.getLogger(__name__)
 
 
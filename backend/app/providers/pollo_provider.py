@@ -7,14 +7,16 @@ Supports:
 - Video effects
 - Camera control
 """
-import httpx
 import asyncio
 from typing import Dict, Any, Optional, List
 import logging
 import os
 
+from app.core.lazy import lazy_import
 from app.providers.base import BaseProvider
 
+httpx = lazy_import("httpx")
+
 logger = logging.getLogger(__name__)
 
 
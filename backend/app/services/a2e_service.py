@@ -16,8 +16,10 @@ import logging
 import uuid
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
-import httpx
 from app.core.config import get_settings
+from app.core.lazy import lazy_import
+
+httpx = lazy_import("httpx")
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -19,6 +19,8 @@ from sqlalchemy.orm import selectinload
 from app.models.user import User
 from app.models.billing import Plan, Subscription, Order, CreditTransaction, Generation
 from app.models.material import Material, MaterialStatus, ToolType
+from app.services.material_sampler import get_material_sampler
+from app.services.preset_catalog import get_preset_catalog
 from app.services.session_tracker import session_tracker
 
 logger = logging.getLogger(__name__)
@@ -424,6 +426,8 @@ class AdminDashboardService:
             return False, f"Invalid action: {action}"
 
         await self.db.commit()
+        get_material_sampler().add(material)
+        await get_preset_catalog().bump_version()
         return True, f"Material {action}d successfully"
 
     async def get_moderation_queue(
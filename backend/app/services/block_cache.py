@@ -5,29 +5,37 @@ Uses Gemini API to analyze unknown prompts and update cache.
 
 Flow:
 1. User submits prompt
-2. Check Redis block cache for known illegal words
+2. Match prompt against the in-process blocked-word automaton
+   (seed words + learned block:word:* entries, rebuilt on version change)
 3. If found in cache -> Block immediately
 4. If not in cache -> Use Gemini to analyze
 5. If Gemini says unsafe -> Add to block cache + Block
 6. If Gemini says safe -> Allow (optionally cache as safe)
 """
+import asyncio
 import hashlib
 import json
 import logging
 import re
-from typing import Optional, List, Dict, Any, Set
-from dataclasses import dataclass
+import time
+from typing import Optional, List, Dict, Any, Set, Iterable
+from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
 from enum import Enum
 
-import httpx
-
 try:
     import redis.asyncio as redis
 except ImportError:
     import aioredis as redis
 
 from app.core.config import get_settings
+from app.core.lazy import lazy_import
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.single_flight import SingleFlight, flight_key
+from app.services.local_cache import TTLCache
+from app.services.counter_buffer import RedisCounterBuffer
+
+httpx = lazy_import("httpx")
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -59,15 +67,40 @@ class BlockCacheResult:
             self.blocked_words = []
 
 
+def _encode_block_result(result: Optional[BlockCacheResult]) -> str:
+    """Serialize a (possibly missing) BlockCacheResult for cross-worker sharing"""
+    if result is None:
+        return "null"
+    data = asdict(result)
+    data["cached_at"] = result.cached_at.isoformat() if result.cached_at else None
+    return json.dumps(data)
+
+
+def _decode_block_result(raw: str) -> Optional[BlockCacheResult]:
+    """Inverse of _encode_block_result"""
+    data = json.loads(raw)
+    if data is None:
+        return None
+    if data.get("cached_at"):
+        data["cached_at"] = datetime.fromisoformat(data["cached_at"])
+    return BlockCacheResult(**data)
+
+
 class PromptBlockCache:
     """
     Redis-based cache for blocking illegal prompts.
 
     Redis Keys:
     - block:word:{word_hash} -> blocked word info (JSON)
+    - block:words:version -> blocked-word set version (INCR on every change)
+    - block:hits -> per-word hit counters (Hash, flushed in batches)
+    - block:seed:version -> content hash of the loaded seed words
     - block:prompt:{prompt_hash} -> prompt analysis result (JSON)
-    - block:stats -> statistics counter
+    - block:stats -> statistics counter (flushed in batches)
     - safe:prompt:{prompt_hash} -> known safe prompts (for optimization)
+    - block:invalidate -> pub/sub channel to drop local verdict caches
+
+    Prompt verdicts are also kept in an in-process LRU in front of Redis.
     """
 
     # Cache TTL settings
@@ -75,6 +108,19 @@ class PromptBlockCache:
     SAFE_PROMPT_TTL = 60 * 60 * 24 * 7    # 7 days for safe prompts
     ANALYSIS_TTL = 60 * 60 * 24           # 24 hours for analysis results
 
+    # Redis keys and channels
+    WORDS_VERSION_KEY = "block:words:version"
+    WORD_HITS_KEY = "block:hits"
+    SEED_VERSION_KEY = "block:seed:version"
+    SEED_LOCK_KEY = "block:seed:lock"
+    INVALIDATION_CHANNEL = "block:invalidate"
+
+    # Timing settings
+    SEED_LOCK_TTL = 30                    # Seconds one worker holds the seed lock
+    INVALIDATION_RETRY_DELAY = 5.0        # Seconds before resubscribing
+    MATCHER_REFRESH_INTERVAL = 5.0        # Seconds between version checks
+    MATCHER_MAX_AGE = 60 * 60             # Rebuild hourly to drop expired words
+
     # Pre-seeded blocked words in multiple languages
     # Supported: English (en), Traditional Chinese (zh-TW), Japanese (ja), Korean (ko), Spanish (es)
     SEED_BLOCKED_WORDS = {
@@ -190,12 +236,54 @@ class PromptBlockCache:
         ],
     }
 
+    # Ordinary words that contain CJK seed words (CJK keywords match as
+    # substrings, so e.g. ロリ would otherwise match inside カロリー)
+    SEED_ALLOWED_WORDS = [
+        # Japanese (日本語)
+        "カロリー", "グローバル", "グローブ", "グロー", "女性的", "男性的",
+        "理性的", "感性的", "裸足", "裸眼",
+        # Traditional Chinese (繁體中文)
+        "赤裸裸",
+    ]
+
     def __init__(self, redis_url: Optional[str] = None, gemini_api_key: Optional[str] = None):
         self.redis_url = redis_url or settings.REDIS_URL
         self.gemini_api_key = gemini_api_key or getattr(settings, 'GEMINI_API_KEY', '')
         self.gemini_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
         self._redis: Optional[redis.Redis] = None
         self._initialized = False
+        self._seed_retry_at = 0.0
+
+        # In-process blocked-word automaton
+        self.use_local_matcher = getattr(settings, 'BLOCK_CACHE_LOCAL_MATCHER', True)
+        self._matcher: Optional[KeywordMatcher] = None
+        self._matcher_version: Optional[str] = None
+        self._matcher_built_at = 0.0
+        self._matcher_checked_at = 0.0
+        self._matcher_lock = asyncio.Lock()
+
+        # block:stats / block:hits increments, flushed as one pipeline
+        self._counters = RedisCounterBuffer(
+            self._get_redis,
+            flush_interval=getattr(settings, 'BLOCK_CACHE_STATS_FLUSH_INTERVAL', 5.0),
+        )
+
+        # Tier 1 verdict cache (tier 2 is Redis)
+        self._verdict_cache = TTLCache(
+            maxsize=getattr(settings, 'BLOCK_CACHE_LOCAL_SIZE', 1000),
+            ttl=getattr(settings, 'BLOCK_CACHE_LOCAL_TTL', 300),
+        )
+        self._redis_verdict_hits = 0
+        self._redis_verdict_misses = 0
+        self._invalidation_task: Optional[asyncio.Task] = None
+
+        # Coalesces concurrent Gemini analyses of the same prompt
+        self._gemini_flight = SingleFlight(
+            "block_analysis",
+            distributed=getattr(settings, 'GEMINI_SINGLE_FLIGHT_DISTRIBUTED', False),
+            encode=_encode_block_result,
+            decode=_decode_block_result,
+        )
 
     async def _get_redis(self) -> redis.Redis:
         """Get or create Redis connection"""
@@ -208,25 +296,102 @@ class PromptBlockCache:
         return self._redis
 
     async def initialize(self) -> None:
-        """Initialize cache with seed blocked words"""
-        if self._initialized:
+        """
+        Initialize cache with seed blocked words.
+
+        Seeds are bulk-loaded in a single MULTI/EXEC pipeline, guarded by a
+        content hash of SEED_BLOCKED_WORDS stored in block:seed:version.
+        Processes that find the current seed version already loaded skip
+        seeding entirely, so stats are only counted once per seed list.
+        While another worker holds the seed lock, the check is repeated at
+        most once per SEED_LOCK_TTL.
+        """
+        if self._initialized or time.monotonic() < self._seed_retry_at:
             return
 
         try:
             r = await self._get_redis()
-
-            # Seed blocked words into cache
-            for reason, words in self.SEED_BLOCKED_WORDS.items():
-                for word in words:
-                    await self._cache_blocked_word(word, reason.value, "seed")
-
+            self._start_invalidation_listener()
+            seed_words = self._seed_word_reasons()
+            seed_version = self._seed_version(seed_words)
+
+            if await r.get(self.SEED_VERSION_KEY) == seed_version:
+                self._initialized = True
+                return
+
+            # Only one worker loads a given seed version
+            if not await r.set(self.SEED_LOCK_KEY, seed_version, nx=True, ex=self.SEED_LOCK_TTL):
+                logger.debug("Block cache seeding in progress in another worker")
+                self._seed_retry_at = time.monotonic() + self.SEED_LOCK_TTL
+                return
+
+            async with r.pipeline(transaction=True) as pipe:
+                for word, reason in seed_words.items():
+                    pipe.set(
+                        f"block:word:{self._hash_text(word)}",
+                        json.dumps(self._word_entry(word, reason, "seed")),
+                        ex=self.BLOCKED_WORD_TTL
+                    )
+                pipe.hincrby("block:stats", "total_blocked_words", len(seed_words))
+                pipe.hincrby("block:stats", "blocked_by_seed", len(seed_words))
+                # Expire together with the seeded words so they are reloaded
+                pipe.set(self.SEED_VERSION_KEY, seed_version, ex=self.BLOCKED_WORD_TTL)
+                pipe.incr(self.WORDS_VERSION_KEY)
+                pipe.delete(self.SEED_LOCK_KEY)
+                await pipe.execute()
+
+            self._matcher_checked_at = 0.0
             self._initialized = True
-            logger.info(f"Block cache initialized with {sum(len(w) for w in self.SEED_BLOCKED_WORDS.values())} seed words")
+            logger.info(f"Block cache initialized with {len(seed_words)} seed words (version {seed_version})")
 
         except Exception as e:
             logger.error(f"Failed to initialize block cache: {e}")
             # Don't raise - continue without cache
 
+    def _start_invalidation_listener(self) -> None:
+        """Subscribe (once per event loop) to cache invalidations from other workers"""
+        if self._invalidation_task is None or self._invalidation_task.done():
+            self._invalidation_task = asyncio.ensure_future(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        """Drop local caches whenever any worker changes the blocked-word set"""
+        while True:
+            try:
+                r = await self._get_redis()
+                pubsub = r.pubsub()
+                await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self._invalidate_local(message.get("data"))
+                finally:
+                    await pubsub.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Block cache invalidation listener error: {e}")
+            await asyncio.sleep(self.INVALIDATION_RETRY_DELAY)
+
+    def _invalidate_local(self, reason: Optional[str] = None) -> None:
+        """Drop local verdicts and force a matcher version check"""
+        self._verdict_cache.clear()
+        self._matcher_checked_at = 0.0
+        logger.debug(f"Local block cache invalidated ({reason})")
+
+    async def _publish_invalidation(self, reason: str) -> None:
+        """Invalidate local caches in this and every other worker"""
+        self._invalidate_local(reason)
+        try:
+            r = await self._get_redis()
+            await r.publish(self.INVALIDATION_CHANNEL, reason)
+        except Exception as e:
+            logger.error(f"Failed to publish block cache invalidation: {e}")
+
+    def _seed_version(self, seed_words: Dict[str, str]) -> str:
+        """Content hash of the seed word list"""
+        payload = json.dumps(sorted(seed_words.items()), ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
     def _hash_text(self, text: str) -> str:
         """Create hash for text (for cache keys)"""
         normalized = text.lower().strip()
@@ -259,6 +424,15 @@ class PromptBlockCache:
 
         return words
 
+    def _word_entry(self, word: str, reason: str, source: str) -> Dict[str, Any]:
+        """Build the JSON entry stored under block:word:{word_hash}"""
+        return {
+            "word": word.lower(),
+            "reason": reason,
+            "source": source,
+            "cached_at": datetime.now(timezone.utc).isoformat(),
+        }
+
     async def _cache_blocked_word(
         self,
         word: str,
@@ -271,23 +445,108 @@ class PromptBlockCache:
             word_hash = self._hash_text(word)
             key = f"block:word:{word_hash}"
 
-            data = {
-                "word": word.lower(),
-                "reason": reason,
-                "source": source,
-                "cached_at": datetime.now(timezone.utc).isoformat(),
-                "hit_count": 0
-            }
+            data = self._word_entry(word, reason, source)
 
             await r.set(key, json.dumps(data), ex=self.BLOCKED_WORD_TTL)
+            await self._bump_words_version(r)
 
             # Update stats
-            await r.hincrby("block:stats", "total_blocked_words", 1)
-            await r.hincrby("block:stats", f"blocked_by_{source}", 1)
+            self._counters.incr("block:stats", "total_blocked_words")
+            self._counters.incr("block:stats", f"blocked_by_{source}")
 
         except Exception as e:
             logger.error(f"Failed to cache blocked word: {e}")
 
+    async def _bump_words_version(self, r: redis.Redis) -> None:
+        """Mark the blocked-word set as changed so every process rebuilds its matcher"""
+        await r.incr(self.WORDS_VERSION_KEY)
+        self._matcher_checked_at = 0.0
+
+    def _seed_word_reasons(self) -> Dict[str, str]:
+        """Map of seed word -> reason"""
+        return {
+            word: reason.value
+            for reason, words in self.SEED_BLOCKED_WORDS.items()
+            for word in words
+        }
+
+    async def _load_learned_words(self, r: redis.Redis) -> Dict[str, str]:
+        """Load all block:word:* entries as word -> reason"""
+        learned: Dict[str, str] = {}
+        batch: List[str] = []
+
+        async def flush() -> None:
+            for data in await r.mget(batch):
+                if data:
+                    entry = json.loads(data)
+                    learned[entry["word"]] = entry.get("reason", BlockReason.CUSTOM.value)
+            batch.clear()
+
+        async for key in r.scan_iter("block:word:*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await flush()
+        if batch:
+            await flush()
+
+        return learned
+
+    async def _get_matcher(self) -> KeywordMatcher:
+        """
+        Get the in-process blocked-word matcher.
+
+        The Redis version key is polled at most every MATCHER_REFRESH_INTERVAL
+        seconds; the automaton is rebuilt only when the version changes. If Redis
+        is unavailable, the matcher is built from seed words alone.
+        """
+        now = time.monotonic()
+        if self._matcher is not None and now - self._matcher_checked_at < self.MATCHER_REFRESH_INTERVAL:
+            return self._matcher
+
+        async with self._matcher_lock:
+            now = time.monotonic()
+            if self._matcher is not None and now - self._matcher_checked_at < self.MATCHER_REFRESH_INTERVAL:
+                return self._matcher
+            self._matcher_checked_at = now
+
+            words = self._seed_word_reasons()
+            version = None
+            try:
+                r = await self._get_redis()
+                version = await r.get(self.WORDS_VERSION_KEY)
+                stale = (
+                    self._matcher is None
+                    or version != self._matcher_version
+                    or now - self._matcher_built_at > self.MATCHER_MAX_AGE
+                )
+                if not stale:
+                    return self._matcher
+                words.update(await self._load_learned_words(r))
+            except Exception as e:
+                logger.error(f"Failed to load blocked words for matcher: {e}")
+                if self._matcher is not None:
+                    return self._matcher
+
+            self._matcher = KeywordMatcher(words, allowed=self.SEED_ALLOWED_WORDS)
+            self._matcher_version = version
+            self._matcher_built_at = now
+            logger.info(f"Built blocked-word matcher with {len(self._matcher)} words (version {version})")
+            return self._matcher
+
+    async def _match_blocked_words(self, normalized: str) -> Dict[str, str]:
+        """Find blocked words in a normalized prompt in a single pass (word -> reason)"""
+        matcher = await self._get_matcher()
+        matches = matcher.find_keywords(normalized)
+        if matches:
+            self._record_word_hits(list(matches))
+        return matches
+
+    def _record_word_hits(self, words: List[str]) -> None:
+        """Bump per-word hit counters and the cache_hits stat (flushed in batches)"""
+        for word in words:
+            self._counters.incr(self.WORD_HITS_KEY, word)
+        self._counters.incr("block:stats", "cache_hits", len(words))
+
     async def _cache_prompt_result(
         self,
         prompt: str,
@@ -315,54 +574,68 @@ class PromptBlockCache:
                 "cached_at": datetime.now(timezone.utc).isoformat()
             }
 
+            self._verdict_cache.set(prompt_hash, data)
             await r.set(key, json.dumps(data), ex=ttl)
 
         except Exception as e:
             logger.error(f"Failed to cache prompt result: {e}")
 
-    async def _check_word_in_cache(self, word: str) -> Optional[Dict[str, Any]]:
-        """Check if a word is in the block cache"""
+    async def _check_words_in_cache(self, words: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Check many candidate words against the block cache.
+
+        All block:word:* keys are resolved with a single MGET, and hits are
+        recorded with one pipelined batch of HINCRBYs.
+
+        Returns:
+            Dict of candidate word -> cached blocked word info
+        """
+        words = list(words)
+        if not words:
+            return {}
+
         try:
             r = await self._get_redis()
-            word_hash = self._hash_text(word)
-            key = f"block:word:{word_hash}"
+            keys = [f"block:word:{self._hash_text(word)}" for word in words]
+            values = await r.mget(keys)
 
-            data = await r.get(key)
-            if data:
-                result = json.loads(data)
-                # Update hit count
-                await r.hincrby("block:stats", "cache_hits", 1)
-                result["hit_count"] = result.get("hit_count", 0) + 1
-                await r.set(key, json.dumps(result), ex=self.BLOCKED_WORD_TTL)
-                return result
-
-            return None
+            found = {
+                word: json.loads(data)
+                for word, data in zip(words, values)
+                if data
+            }
+            if found:
+                self._record_word_hits([entry["word"] for entry in found.values()])
+            return found
 
         except Exception as e:
-            logger.error(f"Failed to check word in cache: {e}")
-            return None
+            logger.error(f"Failed to check words in cache: {e}")
+            return {}
 
     async def _check_prompt_in_cache(self, prompt: str) -> Optional[Dict[str, Any]]:
-        """Check if a prompt result is cached"""
-        try:
-            r = await self._get_redis()
-            prompt_hash = self._hash_text(prompt)
+        """Check if a prompt result is cached (local LRU first, then Redis)"""
+        prompt_hash = self._hash_text(prompt)
 
-            # Check blocked prompts first
-            blocked_key = f"block:prompt:{prompt_hash}"
-            data = await r.get(blocked_key)
-            if data:
-                await r.hincrby("block:stats", "prompt_cache_hits", 1)
-                return json.loads(data)
+        cached = self._verdict_cache.get(prompt_hash)
+        if cached is not None:
+            self._counters.incr("block:stats", "prompt_cache_hits")
+            return cached
 
-            # Check safe prompts
-            safe_key = f"safe:prompt:{prompt_hash}"
-            data = await r.get(safe_key)
-            if data:
-                await r.hincrby("block:stats", "prompt_cache_hits", 1)
-                return json.loads(data)
+        try:
+            r = await self._get_redis()
 
-            return None
+            # Blocked prompts take precedence over safe prompts
+            blocked, safe = await r.mget([f"block:prompt:{prompt_hash}", f"safe:prompt:{prompt_hash}"])
+            data = blocked or safe
+            if not data:
+                self._redis_verdict_misses += 1
+                return None
+
+            self._redis_verdict_hits += 1
+            self._counters.incr("block:stats", "prompt_cache_hits")
+            result = json.loads(data)
+            self._verdict_cache.set(prompt_hash, result)
+            return result
 
         except Exception as e:
             logger.error(f"Failed to check prompt in cache: {e}")
@@ -401,13 +674,16 @@ class PromptBlockCache:
             )
 
         # Step 2: Check individual words
-        words = self._extract_words(prompt)
         blocked_words = []
         block_reasons = []
 
-        for word in words:
-            cached_word = await self._check_word_in_cache(word)
-            if cached_word:
+        if self.use_local_matcher:
+            for word, reason in (await self._match_blocked_words(normalized)).items():
+                blocked_words.append(word)
+                block_reasons.append(reason)
+        else:
+            cached_words = await self._check_words_in_cache(self._extract_words(prompt))
+            for cached_word in cached_words.values():
                 blocked_words.append(cached_word["word"])
                 block_reasons.append(cached_word["reason"])
 
@@ -456,7 +732,18 @@ class PromptBlockCache:
         return result
 
     async def _analyze_with_gemini(self, prompt: str) -> Optional[BlockCacheResult]:
-        """Use Gemini API to analyze prompt for safety"""
+        """
+        Use Gemini API to analyze prompt for safety.
+
+        Concurrent analyses of the same normalized prompt share one request.
+        """
+        return await self._gemini_flight.do(
+            flight_key(prompt),
+            lambda: self._request_gemini_analysis(prompt)
+        )
+
+    async def _request_gemini_analysis(self, prompt: str) -> Optional[BlockCacheResult]:
+        """Send a single analysis request to the Gemini API"""
         if not self.gemini_api_key:
             logger.warning("Gemini API key not configured")
             return None
@@ -584,6 +871,7 @@ Only output the JSON, no other text."""
         """
         try:
             await self._cache_blocked_word(word, reason, source)
+            await self._publish_invalidation("add")
             logger.info(f"Added blocked word: {word} (reason: {reason})")
             return True
         except Exception as e:
@@ -599,6 +887,9 @@ Only output the JSON, no other text."""
 
             deleted = await r.delete(key)
             if deleted:
+                await r.hdel(self.WORD_HITS_KEY, word.lower())
+                await self._bump_words_version(r)
+                await self._publish_invalidation("remove")
                 logger.info(f"Removed blocked word: {word}")
                 return True
             return False
@@ -612,6 +903,9 @@ Only output the JSON, no other text."""
         try:
             r = await self._get_redis()
             stats = await r.hgetall("block:stats")
+            # Include increments not yet flushed by this worker
+            for field, delta in self._counters.pending("block:stats").items():
+                stats[field] = int(stats.get(field, 0)) + delta
 
             # Count total blocked words
             blocked_keys = []
@@ -625,6 +919,12 @@ Only output the JSON, no other text."""
                 "blocked_by_seed": int(stats.get("blocked_by_seed", 0)),
                 "blocked_by_gemini": int(stats.get("blocked_by_gemini", 0)),
                 "blocked_by_manual": int(stats.get("blocked_by_manual", 0)),
+                # Per-process verdict cache tiers
+                "local_cache_hits": self._verdict_cache.hits,
+                "local_cache_misses": self._verdict_cache.misses,
+                "local_cache_size": len(self._verdict_cache),
+                "redis_cache_hits": self._redis_verdict_hits,
+                "redis_cache_misses": self._redis_verdict_misses,
             }
 
         except Exception as e:
@@ -648,6 +948,10 @@ Only output the JSON, no other text."""
                 count += 1
 
             self._initialized = False
+            self._seed_retry_at = 0.0
+            self._matcher = None
+            self._matcher_version = None
+            await self._publish_invalidation("clear")
             logger.warning(f"Cleared {count} cache entries")
             return count
 
@@ -656,7 +960,11 @@ Only output the JSON, no other text."""
             return 0
 
     async def close(self) -> None:
-        """Close Redis connection"""
+        """Flush pending stats and close Redis connection"""
+        await self._counters.close()
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            self._invalidation_task = None
         if self._redis:
             await self._redis.close()
             self._redis = None
@@ -0,0 +1,96 @@
+"""
+Redis Counter Buffer
+Accumulates hash-field counter increments in memory and writes them to Redis
+as one pipelined batch of HINCRBYs every few seconds (and on shutdown),
+instead of one round trip per event.
+
+Readers that need exact numbers merge the not-yet-flushed deltas returned
+by pending() into what they read from Redis.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    import aioredis as redis
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCounterBuffer:
+    """
+    Per-process aggregator for Redis HINCRBY counters.
+
+    Args:
+        redis_getter: Coroutine returning the Redis client to flush into
+        flush_interval: Seconds between background flushes
+    """
+
+    def __init__(
+        self,
+        redis_getter: Callable[[], Awaitable[redis.Redis]],
+        flush_interval: float = 5.0,
+    ):
+        self._redis_getter = redis_getter
+        self.flush_interval = flush_interval
+        self._deltas: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def incr(self, key: str, field: str, amount: int = 1) -> None:
+        """Record an increment; it reaches Redis on the next flush."""
+        self._deltas[(key, field)] += amount
+        self._ensure_flusher()
+
+    def pending(self, key: str) -> Dict[str, int]:
+        """Not-yet-flushed deltas for one hash key (field -> delta)."""
+        return {field: delta for (k, field), delta in self._deltas.items() if k == key}
+
+    def _ensure_flusher(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # No running loop (sync caller): deltas wait for an explicit flush
+            self._flush_task = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write all pending deltas to Redis in one pipeline.
+
+        On failure the deltas are kept and retried on the next flush.
+
+        Returns:
+            Number of counters written
+        """
+        if not self._deltas:
+            return 0
+
+        deltas, self._deltas = self._deltas, defaultdict(int)
+        try:
+            r = await self._redis_getter()
+            async with r.pipeline(transaction=False) as pipe:
+                for (key, field), amount in deltas.items():
+                    pipe.hincrby(key, field, amount)
+                await pipe.execute()
+            return len(deltas)
+        except Exception as e:
+            logger.error(f"Failed to flush counters to Redis: {e}")
+            for counter, amount in deltas.items():
+                self._deltas[counter] += amount
+            return 0
+
+    async def close(self) -> None:
+        """Stop the background flusher and write what is left."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
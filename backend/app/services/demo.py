@@ -4,16 +4,31 @@ Matches user prompts to pre-generated demo videos
 """
 import re
 import logging
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, func, or_, and_, case, literal_column
 from sqlalchemy.orm import selectinload
 
-from app.models.demo import DemoVideo, DemoCategory, DemoView
+from app.models.demo import DEMO_VIDEO_SEARCH_DOCUMENT, DemoVideo, DemoCategory, DemoView
 from app.schemas.demo import DemoSearchResult, DemoVideoResponse
+from app.services.write_behind import get_write_behind_counters
 
 logger = logging.getLogger(__name__)
 
+# Rows ranked in SQL per candidate query; only these are re-scored in Python
+SEARCH_CANDIDATE_LIMIT = 50
+
+# Same expression as the idx_demo_video_search GIN index
+SEARCH_DOCUMENT = literal_column(DEMO_VIDEO_SEARCH_DOCUMENT.format(table="demo_videos."))
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+
+def _tsquery_any(terms: List[str]) -> str:
+    """to_tsquery text matching any of the terms, each quoted as a literal lexeme."""
+    return " | ".join(
+        "'" + term.replace("\\", "\\\\").replace("'", "''") + "'" for term in terms
+    )
+
 
 # Common keywords for different video styles/categories
 STYLE_KEYWORDS = {
@@ -157,6 +172,67 @@ class DemoMatchingService:
 
         return min(score, 1.0), reasons
 
+    def _candidate_queries(
+        self,
+        query_keywords: List[str],
+        detected_category: Optional[str],
+        search_category: Optional[str],
+        search_style: Optional[str],
+        limit: int = SEARCH_CANDIDATE_LIMIT
+    ) -> List[Any]:
+        """
+        Build the SQL candidate queries for search_demos.
+
+        1. Text matches: keywords overlap or full-text match on title/prompt
+           for any query or category word, ordered by ts_rank on the indexed
+           document plus a keyword-array hit and the bonus parts of
+           calculate_match_score (search_demos re-scores the candidates).
+        2. Most popular rows of the searched style (every row of that style
+           gets the style bonus), or without a style the rows with
+           popularity_score > 100, the only ones whose bonuses exceed 0.1.
+        """
+        candidate_limit = max(SEARCH_CANDIDATE_LIMIT, limit)
+        query = select(DemoVideo).where(DemoVideo.is_active == True)
+        if search_category:
+            query = query.join(DemoCategory).where(DemoCategory.slug == search_category)
+        if search_style:
+            query = query.where(DemoVideo.style == search_style)
+
+        bonus = (
+            case((DemoVideo.popularity_score > 100, 0.05), else_=0.0)
+            + case((DemoVideo.popularity_score > 500, 0.05), else_=0.0)
+            + case((DemoVideo.quality_score > 0.8, 0.05), else_=0.0)
+            + case((DemoVideo.is_featured == True, 0.05), else_=0.0)
+        )
+        queries = []
+
+        category_terms = self.category_keywords.get(detected_category, []) if detected_category else []
+        terms = list(dict.fromkeys([*query_keywords, *category_terms]))
+        if terms:
+            tsquery = func.to_tsquery(SEARCH_CONFIG, _tsquery_any(terms))
+            # Per-row work stays on the matched rows: no unnesting of words
+            rank = bonus + func.ts_rank(SEARCH_DOCUMENT, tsquery)
+            if query_keywords:
+                rank = rank + case((DemoVideo.keywords.overlap(query_keywords), 0.2), else_=0.0)
+
+            queries.append(
+                query.where(
+                    or_(
+                        DemoVideo.keywords.overlap(terms),
+                        SEARCH_DOCUMENT.op("@@")(tsquery)
+                    )
+                )
+                .order_by(rank.desc(), DemoVideo.popularity_score.desc())
+                .limit(candidate_limit)
+            )
+
+        if not search_style:
+            query = query.where(DemoVideo.popularity_score > 100)
+        queries.append(
+            query.order_by(DemoVideo.popularity_score.desc()).limit(candidate_limit)
+        )
+        return queries
+
     async def search_demos(
         self,
         db: AsyncSession,
@@ -185,27 +261,20 @@ class DemoMatchingService:
         search_style = style or detected_style
         search_category = category_slug
 
-        # Build query
-        query = select(DemoVideo).where(DemoVideo.is_active == True)
-
-        # Add category filter if specified
-        if search_category:
-            query = query.join(DemoCategory).where(DemoCategory.slug == search_category)
-
-        # Add style filter if specified
-        if search_style:
-            query = query.where(DemoVideo.style == search_style)
-
-        # Load with category relationship
-        query = query.options(selectinload(DemoVideo.category))
-
-        # Execute query
-        result = await db.execute(query)
-        demos = result.scalars().all()
-
-        # Calculate scores and rank
+        # Candidates: rows sharing a word with the query (GIN indexes), ranked
+        # by the SQL mirror of calculate_match_score, plus the most popular
+        # rows, which can pass the threshold on style and bonuses alone
+        candidates = {}
+        for query in self._candidate_queries(
+            query_keywords, detected_category, search_category, search_style, limit
+        ):
+            result = await db.execute(query.options(selectinload(DemoVideo.category)))
+            for demo in result.scalars().all():
+                candidates.setdefault(demo.id, demo)
+
+        # Calculate exact scores and rank
         scored_demos = []
-        for demo in demos:
+        for demo in candidates.values():
             score, reasons = self.calculate_match_score(
                 demo, query_keywords, search_style, detected_category
             )
@@ -299,12 +368,8 @@ class DemoMatchingService:
         )
         db.add(view)
 
-        # Update popularity score
-        await db.execute(
-            DemoVideo.__table__.update()
-            .where(DemoVideo.id == UUID(demo_id))
-            .values(popularity_score=DemoVideo.popularity_score + 1)
-        )
+        # Update popularity score (buffered, written in batches)
+        get_write_behind_counters().incr(DemoVideo, UUID(demo_id), popularity_score=1)
 
         await db.commit()
 
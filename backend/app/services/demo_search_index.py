@@ -0,0 +1,190 @@
+"""
+In-Memory Demo Search Index
+Inverted index over active ImageDemo rows so prompt matching only scores
+demos that can actually match, instead of loading and scoring every row:
+
+- keyword -> posting set of demo ids
+- category facet -> demo ids
+- style facet -> demo ids
+
+A demo shares no keyword, category or style with the query scores 0, so
+the union of the matching postings is the complete candidate set. The
+best `limit` candidates are picked with a heap instead of a full sort.
+Ids are also kept in a dense list for O(1) random picks.
+"""
+import heapq
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class DemoEntry:
+    """Fields of an ImageDemo needed for scoring"""
+    id: Hashable
+    keywords: Tuple[str, ...]
+    category: Optional[str]
+    style: Optional[str]
+    popularity: int = 0
+
+
+class DemoSearchIndex:
+    """Keyword posting lists plus category/style facets over demo entries."""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, DemoEntry] = {}
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._categories: Dict[str, Set[Hashable]] = {}
+        self._styles: Dict[str, Set[Hashable]] = {}
+        self._order: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, demo_id: Hashable) -> bool:
+        return demo_id in self._entries
+
+    def get(self, demo_id: Hashable) -> Optional[DemoEntry]:
+        return self._entries.get(demo_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._postings.clear()
+        self._categories.clear()
+        self._styles.clear()
+        self._order.clear()
+        self._positions.clear()
+
+    @staticmethod
+    def _discard(mapping: Dict[str, Set[Hashable]], key: Optional[str], demo_id: Hashable) -> None:
+        ids = mapping.get(key)
+        if ids is not None:
+            ids.discard(demo_id)
+            if not ids:
+                del mapping[key]
+
+    def add(
+        self,
+        demo_id: Hashable,
+        keywords: Optional[Iterable[str]],
+        category: Optional[str],
+        style: Optional[str],
+        popularity: Optional[int] = 0,
+    ) -> None:
+        """Add or replace a demo."""
+        self.remove(demo_id)
+        entry = DemoEntry(
+            id=demo_id,
+            keywords=tuple(keywords or ()),
+            category=category,
+            style=style,
+            popularity=popularity or 0,
+        )
+        self._entries[demo_id] = entry
+        self._positions[demo_id] = len(self._order)
+        self._order.append(demo_id)
+        for keyword in {kw.lower() for kw in entry.keywords}:
+            self._postings.setdefault(keyword, set()).add(demo_id)
+        if category:
+            self._categories.setdefault(category, set()).add(demo_id)
+        if style:
+            self._styles.setdefault(style, set()).add(demo_id)
+
+    def remove(self, demo_id: Hashable) -> bool:
+        """Remove a demo; returns False if it was not indexed."""
+        entry = self._entries.pop(demo_id, None)
+        if entry is None:
+            return False
+        position = self._positions.pop(demo_id)
+        last = self._order.pop()
+        if position < len(self._order):
+            self._order[position] = last
+            self._positions[last] = position
+        for keyword in {kw.lower() for kw in entry.keywords}:
+            self._discard(self._postings, keyword, demo_id)
+        self._discard(self._categories, entry.category, demo_id)
+        self._discard(self._styles, entry.style, demo_id)
+        return True
+
+    def candidates(
+        self,
+        keywords: Iterable[str],
+        category: Optional[str] = None,
+        style: Optional[str] = None,
+    ) -> Set[Hashable]:
+        """Ids of demos sharing at least one keyword, the category or the style."""
+        ids: Set[Hashable] = set()
+        for keyword in {kw.lower() for kw in keywords}:
+            ids |= self._postings.get(keyword, set())
+        if category:
+            ids |= self._categories.get(category, set())
+        if style:
+            ids |= self._styles.get(style, set())
+        return ids
+
+    def search(
+        self,
+        keywords: Iterable[str],
+        category: Optional[str],
+        style: Optional[str],
+        score: Callable[[DemoEntry], float],
+        limit: int = 10,
+        min_score: float = 0.0,
+    ) -> List[Tuple[float, DemoEntry]]:
+        """
+        Score candidate demos and return the best ones.
+
+        Args:
+            score: Scoring function for one entry
+            limit: Maximum results
+            min_score: Minimum score; at or below 0 every demo is a candidate
+
+        Returns:
+            (score, entry) pairs, best first (ties broken by popularity)
+        """
+        if min_score <= 0:
+            ids: Iterable[Hashable] = self._entries.keys()
+        else:
+            ids = self.candidates(keywords, category, style)
+
+        scored = []
+        for demo_id in ids:
+            entry = self._entries[demo_id]
+            value = score(entry)
+            if value >= min_score:
+                scored.append((value, entry))
+
+        return heapq.nlargest(limit, scored, key=lambda item: (item[0], item[1].popularity))
+
+    def sample(
+        self,
+        category: Optional[str] = None,
+        style: Optional[str] = None,
+        rng: Optional[random.Random] = None,
+    ) -> Optional[DemoEntry]:
+        """
+        A uniformly random demo, optionally in a category and/or style.
+
+        Draws random positions and rejects non-matching entries; when the
+        filter matches few demos, picks from the smaller facet instead.
+        """
+        rng = rng or random
+        if not self._order:
+            return None
+
+        def matches(entry: DemoEntry) -> bool:
+            return (not category or entry.category == category) and (not style or entry.style == style)
+
+        for _ in range(16):
+            entry = self._entries[self._order[rng.randrange(len(self._order))]]
+            if matches(entry):
+                return entry
+
+        facets = [ids for ids in (
+            self._categories.get(category, set()) if category else None,
+            self._styles.get(style, set()) if style else None,
+        ) if ids is not None]
+        pool = min(facets, key=len) if facets else self._entries.keys()
+        matching = [demo_id for demo_id in pool if matches(self._entries[demo_id])]
+        return self._entries[rng.choice(matching)] if matching else None
@@ -20,13 +20,14 @@ import random
 from typing import Optional, List, Dict, Any, Tuple
 from uuid import uuid4
 from datetime import datetime, timedelta
-from sqlalchemy import select, func, and_, update
+from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.demo import ImageDemo, DemoCategory, DemoVideo, PromptCache
 from app.services.pollo_ai import get_pollo_client, POLLO_MODELS
 from app.services.prompt_matching import get_prompt_matching_service, PromptAnalysis
 from app.services.watermark import get_watermark_service
+from app.services.write_behind import get_write_behind_counters
 from app.providers import ProviderRouter, TaskType
 
 logger = logging.getLogger(__name__)
@@ -333,6 +334,7 @@ class DemoService:
 
         db.add(demo)
         await db.commit()
+        self.matcher.index_demo(demo)
 
         logger.info(f"Demo pipeline complete! Saved as: {demo.id}")
 
@@ -594,13 +596,8 @@ class DemoService:
         )
 
     async def _increment_popularity(self, db: AsyncSession, demo_id) -> None:
-        """Increment demo popularity score"""
-        await db.execute(
-            update(ImageDemo)
-            .where(ImageDemo.id == demo_id)
-            .values(popularity_score=ImageDemo.popularity_score + 1)
-        )
-        await db.commit()
+        """Increment demo popularity score (buffered, written in batches)"""
+        get_write_behind_counters().incr(ImageDemo, demo_id, popularity_score=1)
 
     async def get_random_demo_for_display(
         self,
@@ -725,6 +722,7 @@ class DemoService:
             demo.is_active = False
 
         await db.commit()
+        self.matcher.unindex_demos(demo.id for demo in expired)
         logger.info(f"Cleaned up {count} expired demos")
 
         return count
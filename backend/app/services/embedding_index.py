@@ -0,0 +1,156 @@
+"""
+In-Memory Embedding Index
+Keeps L2-normalized float32 embeddings in a contiguous NumPy matrix so a
+nearest-neighbour query is one matrix-vector product plus a top-k
+selection, instead of a Python loop over decoded JSON vectors.
+
+Vectors are partitioned by dimension: Gemini embeddings and the offline
+fallback vectors have different sizes and are never compared with each
+other (cosine similarity between them is treated as 0, as before).
+"""
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def normalize_vector(vector: Sequence[float]) -> Optional["np.ndarray"]:
+    """Return the L2-normalized float32 copy of a vector, or None if it is empty or zero."""
+    array = np.asarray(vector, dtype=np.float32).ravel()
+    if array.size == 0:
+        return None
+    norm = float(np.linalg.norm(array))
+    if norm == 0.0 or not np.isfinite(norm):
+        return None
+    return array / norm
+
+
+class _Partition:
+    """Growable matrix of unit vectors of one dimension."""
+
+    __slots__ = ("dim", "matrix", "ids", "positions")
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.dim = dim
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids: List[Hashable] = []
+        self.positions: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, key: Hashable, vector: "np.ndarray") -> None:
+        row = self.positions.get(key)
+        if row is None:
+            row = len(self.ids)
+            if row == self.matrix.shape[0]:
+                # Amortized O(1) appends: double the capacity when full
+                grown = np.zeros((row * 2, self.dim), dtype=np.float32)
+                grown[:row] = self.matrix[:row]
+                self.matrix = grown
+            self.ids.append(key)
+            self.positions[key] = row
+        self.matrix[row] = vector
+
+    def remove(self, key: Hashable) -> bool:
+        row = self.positions.pop(key, None)
+        if row is None:
+            return False
+        # Swap the last row into the hole to keep the matrix dense
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved
+            self.positions[moved] = row
+        self.ids.pop()
+        return True
+
+    def search(self, query: "np.ndarray", k: int) -> List[Tuple[Hashable, float]]:
+        n = len(self.ids)
+        if n == 0:
+            return []
+        scores = self.matrix[:n] @ query
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(scores, n - k)[n - k:]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+
+class EmbeddingIndex:
+    """
+    Exact cosine-similarity index over in-memory embeddings.
+
+    Not thread-safe; intended for use from a single asyncio event loop.
+    """
+
+    def __init__(self):
+        self._partitions: Dict[int, _Partition] = {}
+        self._dims: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._dims)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._dims
+
+    def clear(self) -> None:
+        self._partitions.clear()
+        self._dims.clear()
+
+    def add(self, key: Hashable, embedding: Sequence[float]) -> bool:
+        """
+        Insert or replace the embedding stored under key.
+
+        Returns:
+            False if the embedding is empty or zero (and was not indexed)
+        """
+        vector = normalize_vector(embedding)
+        if vector is None:
+            self.remove(key)
+            return False
+
+        dim = vector.shape[0]
+        previous = self._dims.get(key)
+        if previous is not None and previous != dim:
+            self._partitions[previous].remove(key)
+
+        partition = self._partitions.get(dim)
+        if partition is None:
+            partition = self._partitions[dim] = _Partition(dim)
+        partition.upsert(key, vector)
+        self._dims[key] = dim
+        return True
+
+    def add_many(self, items: Iterable[Tuple[Hashable, Sequence[float]]]) -> int:
+        """Insert several (key, embedding) pairs; returns how many were indexed."""
+        return sum(1 for key, embedding in items if self.add(key, embedding))
+
+    def remove(self, key: Hashable) -> bool:
+        dim = self._dims.pop(key, None)
+        if dim is None:
+            return False
+        return self._partitions[dim].remove(key)
+
+    def search(self, embedding: Sequence[float], k: int = 1) -> List[Tuple[Hashable, float]]:
+        """
+        Find the k most similar embeddings of the same dimension.
+
+        Returns:
+            List of (key, cosine similarity), most similar first
+        """
+        query = normalize_vector(embedding)
+        if query is None or k <= 0:
+            return []
+        partition = self._partitions.get(query.shape[0])
+        if partition is None:
+            return []
+        return partition.search(query, k)
+
+    def memory_bytes(self) -> int:
+        """Bytes allocated for the embedding matrices."""
+        return sum(partition.matrix.nbytes for partition in self._partitions.values())
@@ -0,0 +1,146 @@
+"""
+Inspiration Gallery Index
+Precomputed gallery category -> material membership for /demo/inspirations.
+
+A material belongs to a category when one of the category's keywords is
+part of its topic (case-insensitive) or one of its tags, and it has an
+image to show. Membership is computed once when the material is added,
+not per request with leading-wildcard ILIKE predicates that cannot use an
+index. Each member keeps the few fields the gallery renders, with titles
+already resolved per language, so a page is served without a query.
+
+The index lives inside MaterialSampler and follows the same add / remove
+and sync as its id sets.
+"""
+import random
+import uuid
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Map gallery categories to material topics
+GALLERY_CATEGORY_MAP = {
+    "video": ["short_video", "video"],
+    "recommended": ["product", "ecommerce", "brand"],
+    "portrait": ["portrait", "people", "human"],
+    "photography": ["photography", "realistic"],
+    "animation": ["animation", "cartoon", "animated"],
+    "poster": ["poster", "illustration", "design"],
+    "anime": ["anime", "manga", "2d"],
+    "ecommerceDesign": ["ecommerce", "product", "shopping"],
+    "chinese": ["chinese", "oriental", "asian"],
+    "female": ["female", "woman", "girl"],
+    "male": ["male", "man", "boy"],
+    "interior": ["interior", "room", "home"],
+    "architectureLandscape": ["architecture", "landscape", "building"],
+    "toys": ["toys", "figures", "collectibles"],
+    "art": ["art", "painting", "artistic"],
+    "productDesign": ["product", "industrial", "design"],
+    "gameCG": ["game", "cg", "gaming"],
+    "nature": ["nature", "natural", "landscape"],
+    "threeD": ["3d", "render", "dimensional"],
+    "logoUI": ["logo", "ui", "branding"],
+    "character": ["character", "ip", "mascot"],
+    "animals": ["animals", "pets", "wildlife"],
+    "fantasy": ["fantasy", "magical", "mythical"],
+    "scifi": ["scifi", "futuristic", "tech"]
+}
+
+# Title language per gallery language prefix (others use English)
+TITLE_LANGUAGES = ("zh", "ja")
+
+
+def matches_keywords(keywords, topic: Optional[str], tags) -> bool:
+    """Same rule as the former ILIKE '%kw%' on topic OR tags @> [kw] filter."""
+    topic = (topic or "").lower()
+    return any(keyword.lower() in topic or keyword in tags for keyword in keywords)
+
+
+def gallery_categories(topic: Optional[str], tags) -> FrozenSet[str]:
+    """Gallery categories a material with this topic and tags belongs to."""
+    return frozenset(
+        category for category, keywords in GALLERY_CATEGORY_MAP.items()
+        if matches_keywords(keywords, topic, tags)
+    )
+
+
+class GalleryItem:
+    """What the gallery renders for one material"""
+
+    __slots__ = ("id", "titles", "thumb", "prompt", "categories")
+
+    def __init__(self, material, categories: FrozenSet[str]):
+        self.id = material.id
+        self.titles: Dict[str, Optional[str]] = {"en": material.title_en}
+        self.titles["zh"] = material.title_zh or material.title_en
+        self.titles["ja"] = material.title_ja or material.title_en
+        self.thumb = material.result_image_url or material.input_image_url or material.result_thumbnail_url
+        self.prompt = material.prompt or material.prompt_enhanced or ""
+        self.categories = categories
+
+    def title(self, language: str) -> Optional[str]:
+        """Title for a language code, falling back to English."""
+        for prefix in TITLE_LANGUAGES:
+            if language.startswith(prefix):
+                return self.titles[prefix]
+        return self.titles["en"]
+
+
+class GalleryIndex:
+    """Category -> member ids, with O(1) add / remove and O(k) samples."""
+
+    def __init__(self):
+        self._items: Dict[uuid.UUID, GalleryItem] = {}
+        self._members: Dict[str, Tuple[List[uuid.UUID], Dict[uuid.UUID, int]]] = {
+            category: ([], {}) for category in GALLERY_CATEGORY_MAP
+        }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, material_id: uuid.UUID) -> bool:
+        return material_id in self._items
+
+    def count(self, category: str) -> int:
+        members = self._members.get(category)
+        return len(members[0]) if members else 0
+
+    def add(self, material, has_image: bool) -> None:
+        """Add or replace a material (row or ORM object)."""
+        self.remove(material.id)
+        if not has_image:
+            return
+        categories = gallery_categories(material.topic, material.tags or ())
+        if not categories:
+            return
+        item = GalleryItem(material, categories)
+        self._items[item.id] = item
+        for category in categories:
+            ids, positions = self._members[category]
+            positions[item.id] = len(ids)
+            ids.append(item.id)
+
+    def remove(self, material_id: uuid.UUID) -> None:
+        item = self._items.pop(material_id, None)
+        if item is None:
+            return
+        for category in item.categories:
+            ids, positions = self._members[category]
+            position = positions.pop(material_id)
+            last = ids.pop()
+            if position < len(ids):
+                ids[position] = last
+                positions[last] = position
+
+    def clear(self) -> None:
+        self._items.clear()
+        for ids, positions in self._members.values():
+            ids.clear()
+            positions.clear()
+
+    def sample(self, category: str, k: int, rng: Optional[random.Random] = None) -> List[GalleryItem]:
+        """Up to k distinct random members of a category."""
+        members = self._members.get(category)
+        if members is None or k <= 0:
+            return []
+        ids = members[0]
+        chosen = (rng or random).sample(ids, min(k, len(ids)))
+        return [self._items[key] for key in chosen]
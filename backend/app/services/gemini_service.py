@@ -5,12 +5,15 @@ Uses Google's Gemini API for LLM capabilities.
 """
 import asyncio
 import logging
-import hashlib
 from typing import Optional, Dict, Any, List, Tuple
-import httpx
 import json
 
 from app.core.config import get_settings
+from app.core.lazy import lazy_import
+from app.services.embedding_cache import EmbeddingCache
+from app.services.local_embedding import LOCAL_EMBEDDING_DIMENSIONS, get_local_embedder
+
+httpx = lazy_import("httpx")
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -41,9 +44,19 @@ class GeminiService:
     """
 
     BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    EMBEDDING_MODEL = "models/text-embedding-004"
+    # batchEmbedContents accepts at most 100 requests per call
+    EMBEDDING_BATCH_SIZE = 100
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or getattr(settings, 'GEMINI_API_KEY', '')
+        self._embedding_cache = EmbeddingCache(
+            redis_url=settings.REDIS_URL if settings.EMBEDDING_CACHE_REDIS else "",
+            model=self.EMBEDDING_MODEL.split("/")[-1],
+            local_size=settings.EMBEDDING_CACHE_LOCAL_SIZE,
+            local_ttl=settings.EMBEDDING_CACHE_LOCAL_TTL,
+            ttl=settings.EMBEDDING_CACHE_TTL,
+        )
 
     def _get_headers(self) -> Dict[str, str]:
         return {"Content-Type": "application/json"}
@@ -733,6 +746,9 @@ Respond in JSON format:
         """
         Generate text embedding for similarity matching.
 
+        Embeddings are cached by content hash (in-process LRU + Redis), so
+        repeated texts are only sent to Gemini once.
+
         Args:
             text: Text to embed
 
@@ -740,21 +756,30 @@ Respond in JSON format:
             Dict with embedding vector
         """
         if not self.api_key:
-            # Return hash-based pseudo-embedding if no API key
+            # Return offline n-gram embedding if no API key
+            return {
+                "success": True,
+                "embedding": self._generate_local_embedding(text),
+                "dimensions": LOCAL_EMBEDDING_DIMENSIONS
+            }
+
+        cached = (await self._embedding_cache.get_many([text])).get(text)
+        if cached:
             return {
                 "success": True,
-                "embedding": self._generate_pseudo_embedding(text),
-                "dimensions": 256
+                "embedding": cached,
+                "dimensions": len(cached),
+                "cached": True
             }
 
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
-                    f"{self.BASE_URL}/models/text-embedding-004:embedContent",
+                    f"{self.BASE_URL}/{self.EMBEDDING_MODEL}:embedContent",
                     params={"key": self.api_key},
                     headers=self._get_headers(),
                     json={
-                        "model": "models/text-embedding-004",
+                        "model": self.EMBEDDING_MODEL,
                         "content": {
                             "parts": [{"text": text}]
                         }
@@ -764,6 +789,7 @@ Respond in JSON format:
                 if response.status_code == 200:
                     data = response.json()
                     embedding = data.get("embedding", {}).get("values", [])
+                    await self._embedding_cache.set_many({text: embedding})
                     return {
                         "success": True,
                         "embedding": embedding,
@@ -773,7 +799,7 @@ Respond in JSON format:
                     logger.error(f"Gemini embedding error: {response.status_code}")
                     return {
                         "success": False,
-                        "embedding": self._generate_pseudo_embedding(text),
+                        "embedding": self._generate_local_embedding(text),
                         "error": f"API error: {response.status_code}"
                     }
 
@@ -781,29 +807,112 @@ Respond in JSON format:
             logger.error(f"Gemini embedding error: {e}")
             return {
                 "success": False,
-                "embedding": self._generate_pseudo_embedding(text),
+                "embedding": self._generate_local_embedding(text),
                 "error": str(e)
             }
 
-    def _generate_pseudo_embedding(self, text: str, dimensions: int = 256) -> List[float]:
+    async def get_embeddings(self, texts: List[str]) -> List[Dict[str, Any]]:
         """
-        Generate a pseudo-embedding based on text hash.
-        Used as fallback when API is unavailable.
+        Generate text embeddings for many texts.
+
+        Duplicate texts are embedded once, cached embeddings are reused, and
+        the rest are sent with batchEmbedContents, EMBEDDING_BATCH_SIZE texts
+        per request.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One dict per input text, in order (same shape as get_embedding)
         """
-        # Create a deterministic hash
-        text_hash = hashlib.sha256(text.lower().encode()).hexdigest()
+        if not self.api_key:
+            return [
+                {
+                    "success": True,
+                    "embedding": self._generate_local_embedding(text),
+                    "dimensions": LOCAL_EMBEDDING_DIMENSIONS
+                }
+                for text in texts
+            ]
+
+        unique = list(dict.fromkeys(texts))
+        results: Dict[str, Dict[str, Any]] = {
+            text: {
+                "success": True,
+                "embedding": embedding,
+                "dimensions": len(embedding),
+                "cached": True
+            }
+            for text, embedding in (await self._embedding_cache.get_many(unique)).items()
+        }
 
-        # Convert hash to list of floats
-        embedding = []
-        for i in range(0, min(len(text_hash), dimensions * 2), 2):
-            val = int(text_hash[i:i+2], 16) / 255.0 - 0.5
-            embedding.append(val)
+        missing = [text for text in unique if text not in results]
+        if missing:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                for start in range(0, len(missing), self.EMBEDDING_BATCH_SIZE):
+                    chunk = missing[start:start + self.EMBEDDING_BATCH_SIZE]
+                    results.update(await self._request_embedding_batch(client, chunk))
 
-        # Pad to desired dimensions
-        while len(embedding) < dimensions:
-            embedding.append(0.0)
+        return [dict(results[text]) for text in texts]
 
-        return embedding[:dimensions]
+    async def _request_embedding_batch(
+        self,
+        client: "httpx.AsyncClient",
+        texts: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Embed up to EMBEDDING_BATCH_SIZE texts in one batchEmbedContents call."""
+        error = None
+        try:
+            response = await client.post(
+                f"{self.BASE_URL}/{self.EMBEDDING_MODEL}:batchEmbedContents",
+                params={"key": self.api_key},
+                headers=self._get_headers(),
+                json={
+                    "requests": [
+                        {
+                            "model": self.EMBEDDING_MODEL,
+                            "content": {"parts": [{"text": text}]}
+                        }
+                        for text in texts
+                    ]
+                }
+            )
+
+            if response.status_code == 200:
+                embeddings = [item.get("values", []) for item in response.json().get("embeddings", [])]
+                if len(embeddings) == len(texts):
+                    await self._embedding_cache.set_many(dict(zip(texts, embeddings)))
+                    return {
+                        text: {
+                            "success": True,
+                            "embedding": embedding,
+                            "dimensions": len(embedding)
+                        }
+                        for text, embedding in zip(texts, embeddings)
+                    }
+                error = f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+            else:
+                error = f"API error: {response.status_code}"
+        except Exception as e:
+            error = str(e)
+
+        logger.error(f"Gemini batch embedding error: {error}")
+        return {
+            text: {
+                "success": False,
+                "embedding": self._generate_local_embedding(text),
+                "error": error
+            }
+            for text in texts
+        }
+
+    def _generate_local_embedding(self, text: str) -> List[float]:
+        """
+        Generate an offline embedding (hashed character n-grams).
+        Used as fallback when API is unavailable; unlike a hash of the whole
+        text, similar prompts still get similar vectors.
+        """
+        return get_local_embedder().embed_list(text)
 
     # =========================================================================
     # Combined Processing
@@ -0,0 +1,134 @@
+"""
+Incremental Table Sync
+Keeps an in-process index in step with a table that has created_at /
+updated_at columns, without reading the whole table on every request:
+
+- a full load of the rows the index serves on first use and every
+  `max_age` seconds;
+- in between, at most every `interval` seconds, only rows created or
+  updated since the newest timestamp seen (the watermark), re-reading
+  `overlap` further back to cover rows committed out of order.
+
+Rows deactivated since the last sync come back through the incremental
+query like any other change, so the apply callback both adds and drops.
+Used by the similarity, demo search, template and material indexes.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Defaults: incremental sync interval, full rebuild age, and how far back
+# each sync re-reads to cover rows committed out of order
+SYNC_INTERVAL = 30.0
+SYNC_MAX_AGE = 3600
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class IncrementalSync:
+    """
+    Watermark-based refresh of one in-process index.
+
+    Args:
+        name: Index name for log messages
+        model: Mapped class with created_at and updated_at columns
+        query: select() of the columns apply() reads
+        full_filter: Condition on the rows loaded by a full rebuild
+        apply: Adds, refreshes or drops the index entry for one row
+        clear: Empties the index before a full rebuild
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: Any,
+        query: Any,
+        full_filter: Any,
+        apply: Callable[[Any], None],
+        clear: Callable[[], None],
+        interval: float = SYNC_INTERVAL,
+        max_age: float = SYNC_MAX_AGE,
+        overlap: timedelta = SYNC_OVERLAP,
+    ):
+        self.name = name
+        self._model = model
+        self._query = query.add_columns(model.created_at, model.updated_at)
+        self._full_filter = full_filter
+        self._apply = apply
+        self._clear = clear
+        self.interval = interval
+        self.max_age = max_age
+        self.overlap = overlap
+        self._lock = asyncio.Lock()
+        self.built_at: Optional[float] = None
+        self.synced_at = 0.0
+        self.failed_at: Optional[float] = None
+        self.watermark: Optional[datetime] = None
+
+    def _due(self, now: float) -> Optional[bool]:
+        """True for a full rebuild, False for an incremental sync, None if not due."""
+        # After a failed sync (full rebuilds included) wait out the interval
+        if self.failed_at is not None and now - self.failed_at < self.interval:
+            return None
+        if self.built_at is None or now - self.built_at > self.max_age:
+            return True
+        if now - self.synced_at < self.interval:
+            return None
+        return False
+
+    async def sync(self, db: AsyncSession) -> bool:
+        """
+        Bring the index up to date if a sync is due.
+
+        Query errors (full rebuilds included) are logged and retried on the
+        next interval; the current index keeps serving meanwhile.
+
+        Returns:
+            True if the index was rebuilt from scratch
+        """
+        if self._due(time.monotonic()) is None:
+            return False
+
+        async with self._lock:
+            now = time.monotonic()
+            full = self._due(now)
+            if full is None:
+                return False
+
+            query = self._query
+            if full:
+                query = query.where(self._full_filter)
+            elif self.watermark is not None:
+                since = self.watermark - self.overlap
+                query = query.where(
+                    or_(self._model.created_at >= since, self._model.updated_at >= since)
+                )
+
+            try:
+                rows = (await db.execute(query)).all()
+            except Exception as e:
+                logger.error(f"Failed to sync {self.name}: {e}")
+                self.synced_at = self.failed_at = now
+                return False
+
+            if full:
+                self._clear()
+            watermark = None if full else self.watermark
+            for row in rows:
+                self._apply(row)
+                for changed_at in (row.created_at, row.updated_at):
+                    if changed_at is not None and (watermark is None or changed_at > watermark):
+                        watermark = changed_at
+
+            self.watermark = watermark
+            self.synced_at = now
+            self.failed_at = None
+            if full:
+                self.built_at = now
+            return full
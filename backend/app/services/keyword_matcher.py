@@ -0,0 +1,242 @@
+"""
+Multi-pattern Keyword Matcher
+Aho-Corasick automaton for matching many keywords in a single pass.
+
+Used by the moderation path to find blocked words without tokenizing the
+prompt into n-grams. Latin-script keywords only match on word boundaries
+("kill" does not match "skill"); keywords containing CJK characters match
+as plain substrings, since Chinese and Japanese are written without spaces
+and Korean attaches particles directly to words.
+
+Substring matching also finds keywords inside longer, harmless words
+("ロリ" in "カロリー"). Such words are passed as `allowed`: a keyword
+occurrence that lies entirely inside an allowed word is not reported.
+
+Both keywords and text are expected to be normalized by the caller
+(lowercased, whitespace collapsed).
+
+Uses the pyahocorasick C extension when installed; otherwise falls back to
+a pure-Python automaton with identical results.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Hangul, kana, CJK ideographs and halfwidth katakana (regex class body)
+CJK_RANGES = (
+    r"\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u3400-\u4dbf"
+    r"\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff66-\uff9f"
+)
+_CJK_RE = re.compile(f"[{CJK_RANGES}]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_keyword(text: str) -> str:
+    """Lowercase and collapse whitespace (same normalization as prompts)."""
+    return _WHITESPACE_RE.sub(" ", text.lower().strip())
+
+
+def is_cjk(ch: str) -> bool:
+    """Check if a character belongs to a CJK script."""
+    return _CJK_RE.match(ch) is not None
+
+
+def contains_cjk(text: str) -> bool:
+    """Check if text contains any CJK character."""
+    return _CJK_RE.search(text) is not None
+
+
+def _is_word_char(ch: str) -> bool:
+    """Latin-style word character (CJK characters never form a boundary)."""
+    return (ch.isalnum() or ch == "_") and not is_cjk(ch)
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """A single keyword occurrence in the matched text"""
+    keyword: str
+    start: int
+    end: int
+    payload: Any = None
+
+
+class KeywordMatcher:
+    """
+    Compiled Aho-Corasick automaton over a fixed keyword set.
+
+    The automaton is immutable once built; rebuild a new instance when the
+    keyword set changes and swap the reference.
+
+    Args:
+        keywords: Iterable of keywords, or mapping of keyword -> payload
+            (e.g. block reason). Later duplicates override earlier ones.
+        word_boundaries: Require word boundaries around non-CJK keywords.
+        allowed: Harmless words that contain keywords; keyword occurrences
+            inside them are suppressed.
+    """
+
+    def __init__(
+        self,
+        keywords: Union[Mapping[str, Any], Iterable[str]],
+        word_boundaries: bool = True,
+        allowed: Iterable[str] = (),
+    ):
+        if not isinstance(keywords, Mapping):
+            keywords = {keyword: None for keyword in keywords}
+
+        self.word_boundaries = word_boundaries
+        self._keywords: List[str] = []
+        self._payloads: List[Any] = []
+        self._boundary: List[bool] = []
+
+        # Pure-Python automaton (state 0 is the root), unused with pyahocorasick
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._automaton = None
+
+        self._index: Dict[str, int] = {}
+        for raw, payload in keywords.items():
+            keyword = normalize_keyword(raw)
+            if not keyword:
+                continue
+            if keyword in self._index:
+                self._payloads[self._index[keyword]] = payload
+                continue
+            self._index[keyword] = len(self._keywords)
+            self._keywords.append(keyword)
+            self._payloads.append(payload)
+            self._boundary.append(self.word_boundaries and not contains_cjk(keyword))
+
+        # Allowed words share the automaton, with ids after the keywords
+        self._allowed: List[str] = []
+        for raw in allowed:
+            word = normalize_keyword(raw)
+            if word and word not in self._index and word not in self._allowed:
+                self._allowed.append(word)
+
+        if ahocorasick is not None:
+            self._build_native()
+        else:
+            for word_id, word in enumerate(self._keywords + self._allowed):
+                self._add(word_id, word)
+            self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def __contains__(self, keyword: str) -> bool:
+        return normalize_keyword(keyword) in self._index
+
+    @property
+    def keywords(self) -> List[str]:
+        return list(self._keywords)
+
+    def _build_native(self) -> None:
+        if not self._keywords:
+            return
+        self._automaton = ahocorasick.Automaton()
+        for word_id, word in enumerate(self._keywords + self._allowed):
+            self._automaton.add_word(word, word_id)
+        self._automaton.make_automaton()
+
+    def _add(self, keyword_id: int, keyword: str) -> None:
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(keyword_id)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state].extend(self._out[self._fail[next_state]])
+
+    def _on_boundary(self, text: str, start: int, end: int) -> bool:
+        if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+            return False
+        if end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+            return False
+        return True
+
+    def _iter_raw(self, text: str) -> Iterator[tuple]:
+        """Yield (end_index, keyword_id) for every occurrence, boundaries unchecked"""
+        if self._automaton is not None:
+            yield from self._automaton.iter(text)
+            return
+        if ahocorasick is not None:
+            return  # Native backend with no keywords
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword_id in out[state]:
+                yield pos, keyword_id
+
+    def iter_matches(self, text: str) -> Iterator[KeywordMatch]:
+        """Yield every keyword occurrence in text, in order of end position."""
+        if self._allowed:
+            yield from self._iter_allowed_filtered(text)
+            return
+        for pos, keyword_id in self._iter_raw(text):
+            match = self._match(text, pos, keyword_id)
+            if match is not None:
+                yield match
+
+    def _match(self, text: str, pos: int, keyword_id: int) -> Optional[KeywordMatch]:
+        keyword = self._keywords[keyword_id]
+        end = pos + 1
+        start = end - len(keyword)
+        if self._boundary[keyword_id] and not self._on_boundary(text, start, end):
+            return None
+        return KeywordMatch(keyword, start, end, self._payloads[keyword_id])
+
+    def _iter_allowed_filtered(self, text: str) -> Iterator[KeywordMatch]:
+        """Like iter_matches, dropping keywords that lie inside an allowed word"""
+        matches, allowed_spans = [], []
+        for pos, word_id in self._iter_raw(text):
+            if word_id >= len(self._keywords):
+                length = len(self._allowed[word_id - len(self._keywords)])
+                allowed_spans.append((pos + 1 - length, pos + 1))
+                continue
+            match = self._match(text, pos, word_id)
+            if match is not None:
+                matches.append(match)
+        for match in matches:
+            if not any(start <= match.start and match.end <= end for start, end in allowed_spans):
+                yield match
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Return all keyword occurrences in text."""
+        return list(self.iter_matches(text))
+
+    def find_keywords(self, text: str) -> Dict[str, Any]:
+        """Return distinct matched keywords mapped to their payloads."""
+        return {match.keyword: match.payload for match in self.iter_matches(text)}
+
+    def search(self, text: str) -> Optional[KeywordMatch]:
+        """Return the first keyword occurrence, or None."""
+        return next(self.iter_matches(text), None)
@@ -0,0 +1,121 @@
+"""
+Local Text Embeddings
+Offline, dependency-light embeddings built from hashed character n-grams
+(the "hashing trick"), used when Gemini embeddings are unavailable and as
+a cheap first-stage similarity filter before any remote call.
+
+- Latin text: each word contributes itself plus its boundary-padded
+  character 3- and 4-grams, so "cat" / "cats" / "kitten" stay related.
+- CJK text (no spaces): character unigrams and bigrams.
+
+Features are hashed with CRC32 into a fixed number of signed buckets,
+weighted by sublinear term frequency and L2-normalized. Vectors are
+deterministic across processes and take well under a millisecond for a
+typical prompt. There is no corpus IDF: fallback vectors are stored in
+prompt_cache, so they must not depend on what else has been indexed;
+whole words are weighted above their n-gram fragments instead.
+"""
+import math
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+from app.core.lazy import lazy_import
+from app.services.keyword_matcher import CJK_RANGES
+
+np = lazy_import("numpy")
+
+# Distinct from the old 256-dim hash pseudo-embeddings so they never mix
+LOCAL_EMBEDDING_DIMENSIONS = 384
+
+# Runs of CJK characters, or Latin-style words (mixed runs like "貓cat" split)
+SEGMENT_PATTERN = re.compile(f"(?P<cjk>[{CJK_RANGES}]+)|(?P<word>[^\\W{CJK_RANGES}]+)")
+
+# Whole words carry more meaning than their fragments
+WORD_WEIGHT = 2.0
+NGRAM_WEIGHT = 1.0
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dimensions: int) -> int:
+    """Signed bucket for a feature: index in the low bits, sign in bit 31."""
+    h = zlib.crc32(feature.encode())
+    index = h % dimensions
+    return index if h & 0x80000000 else ~index
+
+
+class LocalEmbedder:
+    """
+    Hashed character n-gram embedder.
+
+    Args:
+        dimensions: Output vector size
+    """
+
+    def __init__(self, dimensions: int = LOCAL_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> Iterator[tuple]:
+        for match in SEGMENT_PATTERN.finditer(text.lower()):
+            segment = match.group()
+            if match.lastgroup == "cjk":
+                yield from ((char, NGRAM_WEIGHT) for char in segment)
+                yield from ((segment[i:i + 2], WORD_WEIGHT) for i in range(len(segment) - 1))
+            else:
+                yield segment, WORD_WEIGHT
+                padded = f"<{segment}>"
+                for n in (3, 4):
+                    yield from ((padded[i:i + n], NGRAM_WEIGHT) for i in range(len(padded) - n + 1))
+
+    def embed(self, text: str) -> Optional["np.ndarray"]:
+        """
+        Embed one text.
+
+        Returns:
+            L2-normalized float32 vector, or None if the text has no word characters
+        """
+        weights: Dict[str, float] = {}
+        counts = Counter()
+        for feature, weight in self._features(text):
+            counts[feature] += 1
+            weights[feature] = weight
+        if not counts:
+            return None
+
+        buckets, values = [], []
+        for feature, count in counts.items():
+            bucket = _bucket(feature, self.dimensions)
+            value = weights[feature] * (1.0 + math.log(count))
+            if bucket >= 0:
+                buckets.append(bucket)
+                values.append(value)
+            else:
+                buckets.append(~bucket)
+                values.append(-value)
+        vector = np.bincount(buckets, weights=values, minlength=self.dimensions).astype(np.float32)
+
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+    def embed_list(self, text: str) -> List[float]:
+        """Embed one text as a list of floats (zero vector for empty text)."""
+        vector = self.embed(text)
+        if vector is None:
+            return [0.0] * self.dimensions
+        return vector.tolist()
+
+
+# Singleton instance
+_local_embedder: Optional[LocalEmbedder] = None
+
+
+def get_local_embedder() -> LocalEmbedder:
+    """Get or create local embedder singleton"""
+    global _local_embedder
+    if _local_embedder is None:
+        _local_embedder = LocalEmbedder()
+    return _local_embedder
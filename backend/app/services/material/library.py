@@ -14,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.base import BaseMaterialService, MaterialType, MaterialStatus, MaterialItem, MaterialRequirement
 from app.models.demo import ToolShowcase, DemoExample, ImageDemo, DemoVideo, PromptCache
+from app.services.response_cache import TOOL_SHOWCASES, get_version_keys
 from .requirements import MATERIAL_REQUIREMENTS, get_tool_requirements
 
 logger = logging.getLogger(__name__)
@@ -247,6 +248,7 @@ class MaterialLibraryService(BaseMaterialService):
         self.db.add(showcase)
         await self.db.commit()
         await self.db.refresh(showcase)
+        await get_version_keys().bump(TOOL_SHOWCASES)
 
         return str(showcase.id)
 
@@ -294,6 +296,7 @@ class MaterialLibraryService(BaseMaterialService):
                     if hasattr(showcase, key):
                         setattr(showcase, key, value)
                 await self.db.commit()
+                await get_version_keys().bump(TOOL_SHOWCASES)
                 return True
 
             example = await self.db.get(DemoExample, uuid.UUID(material_id))
@@ -19,15 +19,17 @@ import logging
 import base64
 import uuid as uid_module
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
-from sqlalchemy import select, delete, func
+from sqlalchemy import String, cast, delete, func, literal, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import AsyncSessionLocal
 from app.models.demo import ToolShowcase
 from app.models.material import Material, ToolType, MaterialSource, MaterialStatus
 from app.services.pollo_ai import PolloAIClient, get_pollo_client
+from app.services.preset_catalog import get_preset_catalog
+from app.services.response_cache import TOOL_SHOWCASES, get_version_keys
 from app.services.rescue_service import get_rescue_service
 from app.services.a2e_service import A2EAvatarService, get_a2e_service
 from app.services.watermark import WatermarkService, get_watermark_service
@@ -377,6 +379,19 @@ SCENE_PROMPTS = {
 }
 
 
+# Minimum active materials per category for the service to count as ready
+CATEGORY_MIN_COUNTS = {
+    'landing': 6,      # 6 topics
+    'pattern': 10,     # 10 patterns
+    'product': 6,      # 6 product examples
+    'video': 5,        # 5 video styles
+    'avatar': 6        # 6 avatar examples
+}
+
+# Landing page topics (SHORT_VIDEO and AI_AVATAR materials)
+LANDING_TOPICS = ["ecommerce", "social", "brand", "app", "promo", "service"]
+
+
 class MaterialGenerator:
     """
     Unified material generation service.
@@ -415,63 +430,75 @@ class MaterialGenerator:
         if not self.watermark_service:
             self.watermark_service = get_watermark_service()
 
-    async def check_materials_exist(
-        self,
-        session: AsyncSession,
+    async def count_materials(self, session: AsyncSession) -> Dict[Tuple[str, str, Optional[str]], int]:
+        """
+        Count active materials in one round trip.
+
+        Returns:
+            ("material", tool_type, topic) and ("showcase", tool_category, None) -> count
+        """
+        materials = (
+            select(
+                literal("material").label("source"),
+                cast(Material.tool_type, String).label("kind"),
+                Material.topic.label("topic"),
+                func.count(Material.id).label("count"),
+            )
+            .where(Material.is_active == True)
+            .group_by(Material.tool_type, Material.topic)
+        )
+        showcases = (
+            select(
+                literal("showcase").label("source"),
+                ToolShowcase.tool_category.label("kind"),
+                literal(None, String).label("topic"),
+                func.count(ToolShowcase.id).label("count"),
+            )
+            .where(ToolShowcase.is_active == True)
+            .group_by(ToolShowcase.tool_category)
+        )
+        result = await session.execute(union_all(materials, showcases))
+        return {(row.source, row.kind, row.topic): row.count for row in result.all()}
+
+    @staticmethod
+    def category_ready(
+        counts: Dict[Tuple[str, str, Optional[str]], int],
         category: str,
         min_count: int = 3
     ) -> bool:
-        """Check if enough materials exist for a category."""
+        """Check if enough materials exist for a category, given count_materials() output."""
         if category == 'landing':
             # Landing materials are stored in Material table with SHORT_VIDEO and AI_AVATAR types
-            landing_topics = ["ecommerce", "social", "brand", "app", "promo", "service"]
-
-            # Check for SHORT_VIDEO materials
-            video_result = await session.execute(
-                select(func.count(Material.id))
-                .where(Material.tool_type == ToolType.SHORT_VIDEO)
-                .where(Material.topic.in_(landing_topics))
-                .where(Material.is_active == True)
+            video_count = sum(
+                counts.get(("material", ToolType.SHORT_VIDEO.value, topic), 0) for topic in LANDING_TOPICS
             )
-            video_count = video_result.scalar() or 0
-
-            # Check for AI_AVATAR materials
-            avatar_result = await session.execute(
-                select(func.count(Material.id))
-                .where(Material.tool_type == ToolType.AI_AVATAR)
-                .where(Material.topic.in_(landing_topics))
-                .where(Material.is_active == True)
+            avatar_count = sum(
+                counts.get(("material", ToolType.AI_AVATAR.value, topic), 0) for topic in LANDING_TOPICS
             )
-            avatar_count = avatar_result.scalar() or 0
-
             logger.info(f"Landing: {video_count} videos, {avatar_count} avatars (min: {min_count} each)")
             return video_count >= min_count and avatar_count >= min_count
-        else:
-            # Other categories use ToolShowcase table
-            result = await session.execute(
-                select(func.count(ToolShowcase.id))
-                .where(ToolShowcase.tool_category == category)
-                .where(ToolShowcase.is_active == True)
-            )
-            count = result.scalar() or 0
-            logger.info(f"Category '{category}' has {count} materials (min: {min_count})")
-            return count >= min_count
 
-    async def check_all_materials(self, session: AsyncSession) -> Dict[str, bool]:
-        """Check material status for all categories."""
-        categories = {
-            'landing': 6,      # 6 topics
-            'pattern': 10,     # 10 patterns
-            'product': 6,      # 6 product examples
-            'video': 5,        # 5 video styles
-            'avatar': 6        # 6 avatar examples
-        }
+        # Other categories use ToolShowcase table
+        count = counts.get(("showcase", category, None), 0)
+        logger.info(f"Category '{category}' has {count} materials (min: {min_count})")
+        return count >= min_count
 
-        status = {}
-        for category, min_count in categories.items():
-            status[category] = await self.check_materials_exist(session, category, min_count)
+    async def check_materials_exist(
+        self,
+        session: AsyncSession,
+        category: str,
+        min_count: int = 3
+    ) -> bool:
+        """Check if enough materials exist for a category."""
+        return self.category_ready(await self.count_materials(session), category, min_count)
 
-        return status
+    async def check_all_materials(self, session: AsyncSession) -> Dict[str, bool]:
+        """Check material status for all categories (a single grouped query)."""
+        counts = await self.count_materials(session)
+        return {
+            category: self.category_ready(counts, category, min_count)
+            for category, min_count in CATEGORY_MIN_COUNTS.items()
+        }
 
     async def generate_missing_materials(self, force: bool = False) -> Dict[str, Any]:
         """
@@ -525,13 +552,17 @@ class MaterialGenerator:
                     logger.error(f"Failed to generate '{category}': {e}")
                     results['failed'].append({'category': category, 'error': str(e)})
 
+        if results['generated']:
+            await get_preset_catalog().bump_version()
+            await get_version_keys().bump(TOOL_SHOWCASES)
+
         return results
 
     async def _generate_landing_materials(self, session: AsyncSession):
         """Generate landing page video examples with avatars into Material table."""
         logger.info("Generating landing page materials into Material table...")
 
-        landing_topics = ["ecommerce", "social", "brand", "app", "promo", "service"]
+        landing_topics = LANDING_TOPICS
 
         # Clear old landing materials from Material table
         await session.execute(
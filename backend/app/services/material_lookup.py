@@ -9,10 +9,13 @@ In preset-only mode:
 - Downloads are BLOCKED for everyone
 """
 import logging
-from typing import Optional, List
+from typing import Optional, List, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from app.models.material import Material, ToolType, MaterialStatus
+from app.services.material_sampler import get_material_sampler
+from app.services.preset_catalog import PresetRecord, get_preset_catalog
+from app.services.write_behind import get_write_behind_counters
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +28,14 @@ class MaterialLookupService:
     - All generation requests are resolved from Material DB
     - No external API calls
     - Returns watermarked URLs only
+    - Lookups are served from the in-memory preset catalog snapshot,
+      falling back to the DB only when no snapshot could be loaded
     """
 
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def lookup_by_hash(self, lookup_hash: str) -> Optional[Material]:
+    async def lookup_by_hash(self, lookup_hash: str) -> Optional[Union[PresetRecord, Material]]:
         """
         Look up material by its lookup hash.
 
@@ -42,6 +47,10 @@ class MaterialLookupService:
         """
         from sqlalchemy import or_
 
+        catalog = await get_preset_catalog().get(self.db)
+        if catalog is not None:
+            return catalog.by_hash.get(lookup_hash)
+
         # PRESET-ONLY MODE: Accept materials with any result URL
         result = await self.db.execute(
             select(Material).where(
@@ -58,7 +67,7 @@ class MaterialLookupService:
         )
         return result.scalar_one_or_none()
 
-    async def lookup_by_id(self, material_id: str) -> Optional[Material]:
+    async def lookup_by_id(self, material_id: str) -> Optional[Union[PresetRecord, Material]]:
         """
         Look up material by its UUID.
 
@@ -68,6 +77,10 @@ class MaterialLookupService:
         Returns:
             Material if found, None otherwise
         """
+        catalog = await get_preset_catalog().get(self.db)
+        if catalog is not None:
+            return catalog.get(material_id)
+
         result = await self.db.execute(
             select(Material).where(
                 and_(
@@ -84,7 +97,7 @@ class MaterialLookupService:
         prompt: str,
         effect_prompt: Optional[str] = None,
         input_image_id: Optional[str] = None
-    ) -> Optional[Material]:
+    ) -> Optional[Union[PresetRecord, Material]]:
         """
         Look up material by preset parameters.
 
@@ -112,7 +125,7 @@ class MaterialLookupService:
         tool_type: str,
         topic: Optional[str] = None,
         limit: int = 20
-    ) -> List[Material]:
+    ) -> List[Union[PresetRecord, Material]]:
         """
         Get available presets for a tool.
 
@@ -132,6 +145,10 @@ class MaterialLookupService:
             logger.warning(f"Invalid tool type: {tool_type}")
             return []
 
+        catalog = await get_preset_catalog().get(self.db)
+        if catalog is not None:
+            return catalog.presets(tool_enum, topic, limit)
+
         # PRESET-ONLY MODE: Accept materials with any result URL
         # (watermarked preferred, but fallback to original)
         conditions = [
@@ -173,7 +190,6 @@ class MaterialLookupService:
         Returns:
             Random Material preset or None if no presets available
         """
-        from sqlalchemy.sql.expression import func
         from sqlalchemy import or_
 
         try:
@@ -196,28 +212,31 @@ class MaterialLookupService:
         if topic:
             conditions.append(Material.topic == topic)
 
-        if exclude_ids:
-            conditions.append(Material.id.notin_(exclude_ids))
-
-        result = await self.db.execute(
-            select(Material)
-            .where(and_(*conditions))
-            .order_by(func.random())
-            .limit(1)
+        # Draw from the in-process id sets and load only the chosen row
+        materials = await get_material_sampler().draw(
+            self.db,
+            1,
+            conditions,
+            tool_type=tool_enum,
+            topics=[topic] if topic else None,
+            exclude_ids=exclude_ids,
+            where=lambda record: record.is_preset,
         )
-        return result.scalar_one_or_none()
+        return materials[0] if materials else None
 
     async def increment_use_count(self, material_id: str) -> None:
         """
         Increment the use count for a material.
 
+        Buffered and written in batches (no query or commit on this path).
+
         Args:
             material_id: UUID of the material
         """
-        material = await self.lookup_by_id(material_id)
-        if material:
-            material.use_count = (material.use_count or 0) + 1
-            await self.db.commit()
+        try:
+            get_write_behind_counters().incr(Material, material_id, use_count=1)
+        except ValueError:
+            logger.warning(f"Invalid material id for use count: {material_id}")
 
 
 def get_material_lookup_service(db: AsyncSession) -> MaterialLookupService:
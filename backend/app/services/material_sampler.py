@@ -0,0 +1,315 @@
+"""
+Material Sampler
+Random material selection without ORDER BY random(): the ids of active
+materials are kept in process, partitioned by (tool_type, topic), and a
+sample is drawn by picking random positions. Only the chosen rows are then
+loaded by primary key, instead of Postgres scanning and sorting the whole
+filtered set on every call.
+
+Each draw is a uniform pick over the partitions in scope; ids that are
+excluded or fail the caller's filter are rejected and redrawn, with a
+full filter-and-sample pass as fallback when most of the scope is
+ineligible.
+
+The id sets follow the database through review_material (approve, reject,
+feature) and a periodic created_at/updated_at sync, which also picks up
+materials written or deactivated by scripts and workers. The inspiration
+gallery's category membership (GalleryIndex) is maintained alongside.
+"""
+import bisect
+import logging
+import random
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.material import Material, MaterialStatus, ToolType
+from app.services.gallery_index import GalleryIndex, GalleryItem
+from app.services.incremental_sync import IncrementalSync
+
+logger = logging.getLogger(__name__)
+
+PRESET_STATUSES = (MaterialStatus.APPROVED, MaterialStatus.FEATURED)
+
+
+class SampleRecord:
+    """Fields of a Material that sampling filters look at"""
+
+    __slots__ = (
+        "id", "tool_type", "topic", "language", "status", "tags",
+        "has_result", "has_video", "has_image",
+    )
+
+    def __init__(self, row):
+        self.id = row.id
+        self.tool_type = row.tool_type
+        self.topic = row.topic
+        self.language = row.language
+        self.status = row.status
+        self.tags = tuple(row.tags or ())
+        self.has_video = row.result_video_url is not None
+        self.has_image = row.result_image_url is not None or row.input_image_url is not None
+        self.has_result = (
+            row.result_watermarked_url is not None
+            or row.result_video_url is not None
+            or row.result_image_url is not None
+        )
+
+    @property
+    def is_preset(self) -> bool:
+        """Servable as a preset (same rule as MaterialLookupService)"""
+        return self.status in PRESET_STATUSES and self.has_result
+
+
+class _Partition:
+    """Ids of one (tool_type, topic), with O(1) add / remove / pick"""
+
+    __slots__ = ("ids", "positions")
+
+    def __init__(self):
+        self.ids: List[Any] = []
+        self.positions: Dict[Any, int] = {}
+
+    def add(self, key: Any) -> None:
+        if key not in self.positions:
+            self.positions[key] = len(self.ids)
+            self.ids.append(key)
+
+    def remove(self, key: Any) -> None:
+        position = self.positions.pop(key, None)
+        if position is None:
+            return
+        last = self.ids.pop()
+        if position < len(self.ids):
+            self.ids[position] = last
+            self.positions[last] = position
+
+
+def _as_uuid(value: Any) -> Optional[uuid.UUID]:
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class MaterialSampler:
+    """
+    In-process id sets of active materials for random sampling.
+
+    Args:
+        rng: Random source (seedable for tests)
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()
+        self._records: Dict[uuid.UUID, SampleRecord] = {}
+        self._partitions: Dict[Tuple[ToolType, str], _Partition] = {}
+        self.gallery = GalleryIndex()
+        self._sync = IncrementalSync(
+            "material sampler",
+            Material,
+            select(
+                Material.id,
+                Material.tool_type,
+                Material.topic,
+                Material.language,
+                Material.status,
+                Material.tags,
+                Material.is_active,
+                Material.result_watermarked_url,
+                Material.result_video_url,
+                Material.result_image_url,
+                Material.input_image_url,
+                Material.result_thumbnail_url,
+                Material.title_en,
+                Material.title_zh,
+                Material.title_ja,
+                Material.prompt,
+                Material.prompt_enhanced,
+            ),
+            Material.is_active == True,
+            apply=self.add,
+            clear=self.clear,
+        )
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, material_id: Any) -> bool:
+        return _as_uuid(material_id) in self._records
+
+    def add(self, material) -> None:
+        """Add, refresh or drop one material (row or ORM object) after a write."""
+        self.remove(material.id)
+        if not material.is_active:
+            return
+        record = SampleRecord(material)
+        self._records[record.id] = record
+        key = (record.tool_type, record.topic)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _Partition()
+        partition.add(record.id)
+        self.gallery.add(material, record.has_image)
+
+    def remove(self, material_id: Any) -> None:
+        record = self._records.pop(_as_uuid(material_id), None)
+        if record is None:
+            return
+        self.gallery.remove(record.id)
+        key = (record.tool_type, record.topic)
+        partition = self._partitions[key]
+        partition.remove(record.id)
+        if not partition.ids:
+            del self._partitions[key]
+
+    def clear(self) -> None:
+        self._records.clear()
+        self._partitions.clear()
+        self.gallery.clear()
+
+    def _scope(self, tool_type: Optional[ToolType], topics: Optional[Iterable[str]]) -> List[_Partition]:
+        if tool_type is not None and topics is not None:
+            keys = [(tool_type, topic) for topic in topics]
+            return [self._partitions[key] for key in keys if key in self._partitions]
+        topic_set = set(topics) if topics is not None else None
+        return [
+            partition for (part_tool, part_topic), partition in self._partitions.items()
+            if (tool_type is None or part_tool == tool_type)
+            and (topic_set is None or part_topic in topic_set)
+        ]
+
+    def sample(
+        self,
+        k: int,
+        tool_type: Optional[ToolType] = None,
+        topics: Optional[Iterable[str]] = None,
+        exclude_ids: Optional[Iterable[Any]] = None,
+        where: Optional[Callable[[SampleRecord], bool]] = None,
+    ) -> List[uuid.UUID]:
+        """
+        Draw up to k distinct material ids uniformly at random.
+
+        Args:
+            k: Number of ids
+            tool_type: Only this tool
+            topics: Only these topics
+            exclude_ids: Ids never to return (e.g. already viewed)
+            where: Extra filter on the record (status, language, media...)
+
+        Returns:
+            Sampled ids (fewer than k if not enough are eligible)
+        """
+        partitions = self._scope(tool_type, topics)
+        offsets, total = [], 0
+        for partition in partitions:
+            offsets.append(total)
+            total += len(partition.ids)
+        if k <= 0 or total == 0:
+            return []
+
+        seen = {key for key in map(_as_uuid, exclude_ids or ()) if key is not None}
+        chosen: List[uuid.UUID] = []
+        for _ in range(4 * k + 16):
+            if len(chosen) == k:
+                return chosen
+            position = self._rng.randrange(total)
+            index = bisect.bisect_right(offsets, position) - 1
+            key = partitions[index].ids[position - offsets[index]]
+            if key in seen:
+                continue
+            seen.add(key)
+            if where is None or where(self._records[key]):
+                chosen.append(key)
+        if len(chosen) == k:
+            return chosen
+
+        # Mostly ineligible scope: filter once, then sample the rest
+        pool = [
+            key for partition in partitions for key in partition.ids
+            if key not in seen and (where is None or where(self._records[key]))
+        ]
+        chosen.extend(self._rng.sample(pool, min(k - len(chosen), len(pool))))
+        return chosen
+
+    async def sync(self, db: AsyncSession) -> None:
+        """
+        Bring the id sets up to date: a full load on first use and every
+        hour, otherwise only materials created or updated since the last
+        sync (see IncrementalSync).
+        """
+        if await self._sync.sync(db):
+            logger.info(f"Material sampler built with {len(self)} materials")
+
+    async def sample_gallery(self, db: AsyncSession, category: str, k: int) -> List[GalleryItem]:
+        """Sync, then up to k random gallery items of a category (no row loads)."""
+        await self.sync(db)
+        return self.gallery.sample(category, k, self._rng)
+
+    async def load(self, db: AsyncSession, ids: Sequence[uuid.UUID], *conditions) -> List[Material]:
+        """
+        Load sampled materials by primary key, in sample order.
+
+        `conditions` re-check eligibility in SQL; ids whose rows no longer
+        match (changed since the last sync) are dropped from the sampler.
+        """
+        if not ids:
+            return []
+        result = await db.execute(
+            select(Material).where(and_(Material.id.in_(list(ids)), *conditions))
+        )
+        by_id = {material.id: material for material in result.scalars().all()}
+        for key in ids:
+            if key not in by_id:
+                self.remove(key)
+        return [by_id[key] for key in ids if key in by_id]
+
+    async def draw(
+        self,
+        db: AsyncSession,
+        k: int,
+        conditions: Sequence[Any] = (),
+        tool_type: Optional[ToolType] = None,
+        topics: Optional[Iterable[str]] = None,
+        exclude_ids: Optional[Iterable[Any]] = None,
+        where: Optional[Callable[[SampleRecord], bool]] = None,
+        attempts: int = 3,
+    ) -> List[Material]:
+        """
+        Sync, sample and load up to k random materials.
+
+        Picks that no longer pass `conditions` on load are dropped and
+        redrawn, up to `attempts` rounds.
+        """
+        await self.sync(db)
+        excluded = list(exclude_ids or ())
+        materials: List[Material] = []
+        for _ in range(attempts):
+            ids = self.sample(
+                k - len(materials), tool_type=tool_type, topics=topics,
+                exclude_ids=excluded, where=where,
+            )
+            if not ids:
+                break
+            loaded = await self.load(db, ids, *conditions)
+            materials.extend(loaded)
+            if len(materials) >= k or len(loaded) == len(ids):
+                break
+            excluded.extend(ids)
+        return materials
+
+
+# Singleton instance
+_material_sampler: Optional[MaterialSampler] = None
+
+
+def get_material_sampler() -> MaterialSampler:
+    """Get or create material sampler singleton"""
+    global _material_sampler
+    if _material_sampler is None:
+        _material_sampler = MaterialSampler()
+    return _material_sampler
@@ -0,0 +1,109 @@
+"""
+Micro-Batcher
+Gathers items submitted within a short window and processes them with one
+batched call, fanning the results back to the waiting callers.
+
+Used to send several moderation prompts to Gemini in a single request
+under bursts. Items the batched call fails to resolve fall back to
+individual calls, so callers always get an answer from one path or the
+other.
+
+Batching places several users' items in one request, so one item can
+influence the results for the others; callers must opt in knowingly.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Time/size-bounded batching of async calls.
+
+    A batch is flushed when it reaches max_batch_size or when window_ms has
+    elapsed since its first item, whichever comes first.
+
+    Args:
+        request_batch: Processes a batch; returns one result per item
+            (None for items it could not resolve)
+        request_single: Processes one item (used for batches of one and as
+            the fallback for unresolved items)
+        window_ms: Maximum time the first item of a batch waits for others
+        max_batch_size: Maximum number of items per batched call
+        timeout: Seconds allowed for the batched call before falling back
+    """
+
+    def __init__(
+        self,
+        request_batch: Callable[[List[Any]], Awaitable[Sequence[Optional[Any]]]],
+        request_single: Callable[[Any], Awaitable[Any]],
+        window_ms: int = 30,
+        max_batch_size: int = 16,
+        timeout: float = 15.0,
+    ):
+        self._request_batch = request_batch
+        self._request_single = request_single
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.timeout = timeout
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Running batches, referenced until done so they are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item for the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        results: Sequence[Optional[Any]] = [None] * len(items)
+
+        if len(items) > 1:
+            try:
+                results = await asyncio.wait_for(self._request_batch(items), self.timeout)
+                if len(results) != len(items):
+                    logger.warning(f"Batched call returned {len(results)} results for {len(items)} items")
+                    results = [None] * len(items)
+            except Exception as e:
+                logger.error(f"Batched call failed, falling back to single calls: {e}")
+                results = [None] * len(items)
+
+        await asyncio.gather(*(
+            self._resolve(item, future, result)
+            for (item, future), result in zip(batch, results)
+        ))
+
+    async def _resolve(self, item: Any, future: asyncio.Future, result: Optional[Any]) -> None:
+        try:
+            if result is None:
+                result = await self._request_single(item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
@@ -0,0 +1,148 @@
+"""
+MinHash / LSH Index
+Approximate set-similarity search: each token set is reduced to a MinHash
+signature, and signatures are split into bands that are hashed into
+buckets. Sets sharing any band bucket become candidates, so a lookup only
+touches the sets likely to be similar instead of every stored set.
+
+With `bands` bands of `rows` rows, two sets with Jaccard similarity s
+share a bucket with probability 1 - (1 - s^rows)^bands; the default
+32 x 4 catches s >= 0.7 more than 99.98% of the time and s = 0.4 a bit
+over half of the time. Callers re-check candidates with exact Jaccard.
+"""
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Mersenne prime 2^31 - 1: (a * x + b) stays below 2^62, no uint64 overflow
+_PRIME = (1 << 31) - 1
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity (0 for two empty sets)."""
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class MinHasher:
+    """
+    MinHash signatures from universal hashes h(x) = (a * x + b) mod p.
+
+    Args:
+        num_perm: Signature length
+        seed: Seed for the hash coefficients (fixed so signatures are stable)
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._prime = np.uint64(_PRIME)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: Iterable[str]) -> Optional["np.ndarray"]:
+        """Signature of a token set, or None if it is empty."""
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode()) for token in set(tokens)), dtype=np.uint64
+        ) % self._prime
+        if hashes.size == 0:
+            return None
+        return ((np.outer(hashes, self._a) + self._b) % self._prime).min(axis=0)
+
+
+class MinHashLSH:
+    """
+    Banded LSH over MinHash signatures, keeping each set for exact re-checks.
+
+    Args:
+        bands: Number of bands
+        rows: Signature rows per band
+        hasher: Shared MinHasher (must have bands * rows permutations)
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 4, hasher: Optional[MinHasher] = None):
+        self.bands = bands
+        self.rows = rows
+        self.hasher = hasher or MinHasher(bands * rows)
+        if self.hasher.num_perm != bands * rows:
+            raise ValueError("hasher.num_perm must equal bands * rows")
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bands)]
+        self._band_keys: Dict[Hashable, List[bytes]] = {}
+        self._sets: Dict[Hashable, Set[str]] = {}
+
+    @property
+    def reliable_threshold(self) -> float:
+        """Lowest similarity at which a pair becomes a candidate with probability >= 99%."""
+        return (1.0 - 0.01 ** (1.0 / self.bands)) ** (1.0 / self.rows)
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._sets
+
+    def _band_hashes(self, signature: "np.ndarray") -> List[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, self.rows)]
+
+    def add(self, key: Hashable, tokens: Iterable[str]) -> bool:
+        """Add or replace a set; returns False (and removes the key) if it is empty."""
+        self.remove(key)
+        token_set = set(tokens)
+        signature = self.hasher.signature(token_set)
+        if signature is None:
+            return False
+        band_keys = self._band_hashes(signature)
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, set()).add(key)
+        self._band_keys[key] = band_keys
+        self._sets[key] = token_set
+        return True
+
+    def remove(self, key: Hashable) -> bool:
+        band_keys = self._band_keys.pop(key, None)
+        if band_keys is None:
+            return False
+        for buckets, band_key in zip(self._buckets, band_keys):
+            keys = buckets.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del buckets[band_key]
+        del self._sets[key]
+        return True
+
+    def clear(self) -> None:
+        for buckets in self._buckets:
+            buckets.clear()
+        self._band_keys.clear()
+        self._sets.clear()
+
+    def candidates(self, tokens: Iterable[str]) -> Set[Hashable]:
+        """Keys sharing at least one band bucket with the token set."""
+        signature = self.hasher.signature(tokens)
+        if signature is None:
+            return set()
+        found: Set[Hashable] = set()
+        for buckets, band_key in zip(self._buckets, self._band_hashes(signature)):
+            found |= buckets.get(band_key, set())
+        return found
+
+    def query(self, tokens: Iterable[str], threshold: float) -> List[Tuple[Hashable, float]]:
+        """
+        Stored sets with exact Jaccard >= threshold, best first.
+
+        Thresholds below reliable_threshold fall back to checking every set,
+        since banding would miss too many true matches.
+        """
+        token_set = set(tokens)
+        keys = self._sets.keys() if threshold < self.reliable_threshold else self.candidates(token_set)
+        matches = []
+        for key in keys:
+            score = jaccard(token_set, self._sets[key])
+            if score >= threshold and score > 0:
+                matches.append((key, score))
+        matches.sort(key=lambda item: item[1], reverse=True)
+        return matches
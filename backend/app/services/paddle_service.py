@@ -20,9 +20,11 @@ import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, Tuple
 from uuid import UUID
-import httpx
 
 from app.core.config import get_settings
+from app.core.lazy import lazy_import
+
+httpx = lazy_import("httpx")
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -7,8 +7,10 @@ API Docs: https://docs.pollo.ai/
 import asyncio
 import logging
 from typing import Optional, Dict, Any, Tuple
-import httpx
 from app.core.config import get_settings
+from app.core.lazy import lazy_import
+
+httpx = lazy_import("httpx")
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
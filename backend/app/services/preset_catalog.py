@@ -0,0 +1,272 @@
+"""
+Preset Catalog Snapshot
+PRESET-ONLY mode serves almost every request from a small, read-mostly set
+of Material rows. The catalog loads the active materials once into compact
+__slots__ records and indexes them by id, by lookup_hash and by
+(tool_type, topic), so preset lookups are dictionary hits instead of
+database round trips.
+
+A snapshot is never modified after it is built. When the catalog version
+key in Redis changes (bumped after admins review materials or the
+generator writes new ones), a new snapshot is built and swapped in with a
+single reference assignment; requests holding the old one finish with it.
+Snapshots also expire after PRESET_CATALOG_MAX_AGE seconds, which covers
+writes that do not bump the version and Redis being unavailable.
+"""
+import asyncio
+import itertools
+import logging
+import sys
+import time
+import uuid
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    import aioredis as redis
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.material import Material, MaterialStatus, ToolType
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CATALOG_VERSION_KEY = "material:catalog:version"
+
+PRESET_STATUSES = (MaterialStatus.APPROVED, MaterialStatus.FEATURED)
+
+# Distinguishes snapshots built in this process (versions may repeat or be None)
+_generations = itertools.count(1)
+
+
+class PresetRecord:
+    """Read-only copy of the Material fields preset endpoints use"""
+
+    __slots__ = (
+        "id", "lookup_hash", "tool_type", "topic", "status",
+        "prompt", "prompt_zh", "input_image_url", "input_video_url", "input_params", "tags",
+        "result_image_url", "result_video_url", "result_watermarked_url", "result_thumbnail_url",
+        "sort_order", "quality_score",
+    )
+
+    def __init__(self, row):
+        for field in self.__slots__:
+            object.__setattr__(self, field, getattr(row, field))
+        object.__setattr__(self, "tags", tuple(row.tags or ()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PresetRecord is read-only")
+
+    @property
+    def has_result(self) -> bool:
+        return (
+            self.result_watermarked_url is not None
+            or self.result_video_url is not None
+            or self.result_image_url is not None
+        )
+
+    @property
+    def is_preset(self) -> bool:
+        return self.status in PRESET_STATUSES and self.has_result
+
+    @property
+    def sort_key(self) -> Tuple:
+        # ORDER BY sort_order, quality_score DESC (Postgres: NULLs last / first)
+        return (
+            self.sort_order is None, self.sort_order or 0,
+            self.quality_score is not None, -(self.quality_score or 0.0),
+        )
+
+
+def _deep_size(value: Any, seen: set) -> int:
+    """Approximate bytes held by a snapshot (containers, records and values)."""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (dict, MappingProxyType)):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in value)
+    elif isinstance(value, PresetRecord):
+        size += sum(_deep_size(getattr(value, field), seen) for field in PresetRecord.__slots__)
+    return size
+
+
+class CatalogSnapshot:
+    """
+    Immutable indexes over one load of the catalog.
+
+    - by_id: every active material
+    - by_hash: active materials with a result, by lookup_hash
+    - by_tool: presets per (tool_type, topic) and per (tool_type, None),
+      presorted by sort_order, quality_score desc
+    """
+
+    __slots__ = ("version", "generation", "built_at", "by_id", "by_hash", "by_tool", "nbytes")
+
+    def __init__(self, rows, version: Optional[str] = None):
+        by_id: Dict[uuid.UUID, PresetRecord] = {}
+        by_hash: Dict[str, PresetRecord] = {}
+        by_tool: Dict[Tuple[ToolType, Optional[str]], List[PresetRecord]] = {}
+        for row in rows:
+            record = PresetRecord(row)
+            by_id[record.id] = record
+            if record.lookup_hash and record.has_result:
+                by_hash[record.lookup_hash] = record
+            if record.is_preset:
+                by_tool.setdefault((record.tool_type, record.topic), []).append(record)
+                by_tool.setdefault((record.tool_type, None), []).append(record)
+
+        self.version = version
+        self.generation = next(_generations)
+        self.built_at = time.monotonic()
+        self.by_id: Mapping[uuid.UUID, PresetRecord] = MappingProxyType(by_id)
+        self.by_hash: Mapping[str, PresetRecord] = MappingProxyType(by_hash)
+        self.by_tool: Mapping[Tuple[ToolType, Optional[str]], Tuple[PresetRecord, ...]] = MappingProxyType({
+            key: tuple(sorted(records, key=lambda record: record.sort_key))
+            for key, records in by_tool.items()
+        })
+        self.nbytes = _deep_size((self.by_id, self.by_hash, self.by_tool), set())
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, material_id: Any) -> Optional[PresetRecord]:
+        try:
+            key = material_id if isinstance(material_id, uuid.UUID) else uuid.UUID(str(material_id))
+        except ValueError:
+            return None
+        return self.by_id.get(key)
+
+    def presets(self, tool_type: ToolType, topic: Optional[str] = None, limit: int = 20) -> List[PresetRecord]:
+        return list(self.by_tool.get((tool_type, topic or None), ())[:limit])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "generation": self.generation,
+            "materials": len(self.by_id),
+            "hashes": len(self.by_hash),
+            "preset_lists": len(self.by_tool),
+            "bytes": self.nbytes,
+            "age_seconds": round(time.monotonic() - self.built_at, 1),
+        }
+
+
+class PresetCatalog:
+    """Holds the current snapshot and swaps in a new one on version change."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.refresh_interval = getattr(settings, 'PRESET_CATALOG_REFRESH_INTERVAL', 5.0)
+        self.max_age = getattr(settings, 'PRESET_CATALOG_MAX_AGE', 300)
+        self._redis: Optional[redis.Redis] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._stale = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    async def _get_redis(self) -> redis.Redis:
+        """Get or create Redis connection"""
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True
+            )
+        return self._redis
+
+    async def _load(self, db: AsyncSession, version: Optional[str]) -> CatalogSnapshot:
+        columns = [getattr(Material, field) for field in PresetRecord.__slots__]
+        result = await db.execute(select(*columns).where(Material.is_active == True))
+        return CatalogSnapshot(result.all(), version)
+
+    async def get(self, db: AsyncSession) -> Optional[CatalogSnapshot]:
+        """
+        Current snapshot, reloaded first if the version key changed or it
+        is older than max_age. The version key is read at most every
+        refresh_interval seconds. Returns None only if no snapshot could
+        ever be loaded; callers then query the database directly.
+        """
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.refresh_interval:
+            return snapshot
+        # Someone else is already refreshing: keep serving the current one
+        if snapshot is not None and self._lock.locked():
+            return snapshot
+
+        async with self._lock:
+            now = time.monotonic()
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._checked_at < self.refresh_interval:
+                return snapshot
+            self._checked_at = now
+
+            version = None
+            try:
+                r = await self._get_redis()
+                version = await r.get(CATALOG_VERSION_KEY)
+            except Exception as e:
+                logger.error(f"Failed to read preset catalog version: {e}")
+                version = snapshot.version if snapshot is not None else None
+
+            if (
+                snapshot is not None
+                and not self._stale
+                and version == snapshot.version
+                and now - snapshot.built_at <= self.max_age
+            ):
+                return snapshot
+
+            try:
+                fresh = await self._load(db, version)
+            except Exception as e:
+                logger.error(f"Failed to load preset catalog: {e}")
+                return snapshot
+
+            self._snapshot = fresh
+            self._stale = False
+            logger.info(
+                f"Preset catalog loaded: {len(fresh)} materials, "
+                f"{fresh.nbytes / 1024:.0f} KiB (version {version})"
+            )
+            return fresh
+
+    async def bump_version(self) -> None:
+        """Mark the catalog as changed so every process reloads it."""
+        # Reload in this process on the next lookup, even if Redis is down
+        self._checked_at = 0.0
+        self._stale = True
+        try:
+            r = await self._get_redis()
+            await r.incr(CATALOG_VERSION_KEY)
+        except Exception as e:
+            logger.error(f"Failed to bump preset catalog version: {e}")
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+# Singleton instance
+_preset_catalog: Optional[PresetCatalog] = None
+
+
+def get_preset_catalog() -> PresetCatalog:
+    """Get or create preset catalog singleton"""
+    global _preset_catalog
+    if _preset_catalog is None:
+        _preset_catalog = PresetCatalog()
+    return _preset_catalog
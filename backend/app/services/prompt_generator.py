@@ -16,8 +16,8 @@ Key Features:
 import hashlib
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
-from sqlalchemy import select, and_, or_, func, update
+from typing import Dict, Any, List, Optional, Set, Tuple
+from sqlalchemy import select, and_, or_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
 
@@ -30,6 +30,10 @@ from app.models.prompt_template import (
     SUB_TOPIC_DISPLAY_NAMES,
 )
 from app.core.config import get_settings
+from app.services.incremental_sync import IncrementalSync
+from app.services.minhash_index import MinHasher, MinHashLSH
+from app.services.response_cache import PROMPT_TEMPLATES, get_version_keys
+from app.services.write_behind import get_write_behind_counters
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -360,6 +364,101 @@ DEFAULT_PROMPTS = {
 }
 
 
+class TemplateSimilarityIndex:
+    """
+    Per-group MinHash/LSH index over template keyword sets.
+
+    Holds every active default template (the ones find_similar_template may
+    return), not just the most popular page. Templates are added as they
+    are created or seeded in this process; other processes' writes arrive
+    through a periodic created_at/updated_at sync.
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 4):
+        self._hasher = MinHasher(bands * rows)
+        self._bands = bands
+        self._rows = rows
+        self._groups: Dict[PromptGroup, MinHashLSH] = {}
+        self._group_of: Dict[Any, PromptGroup] = {}
+        # id -> (popularity, quality): the old query order, used to break ties
+        self._ranks: Dict[Any, Tuple[int, float]] = {}
+        self._sync = IncrementalSync(
+            "template similarity index",
+            PromptTemplate,
+            select(
+                PromptTemplate.id,
+                PromptTemplate.group,
+                PromptTemplate.keywords,
+                PromptTemplate.popularity_score,
+                PromptTemplate.quality_score,
+                PromptTemplate.is_active,
+                PromptTemplate.is_default,
+            ),
+            and_(PromptTemplate.is_active == True, PromptTemplate.is_default == True),
+            apply=self.add,
+            clear=self.clear,
+        )
+
+    def __len__(self) -> int:
+        return len(self._group_of)
+
+    def __contains__(self, template_id: Any) -> bool:
+        return template_id in self._group_of
+
+    @staticmethod
+    def _is_matchable(template) -> bool:
+        return bool(template.is_active and template.is_default and template.keywords)
+
+    def add(self, template) -> None:
+        """Add, refresh or drop one template after a write."""
+        self.remove(template.id)
+        if not self._is_matchable(template):
+            return
+        group = PromptGroup(template.group)
+        lsh = self._groups.get(group)
+        if lsh is None:
+            lsh = self._groups[group] = MinHashLSH(self._bands, self._rows, self._hasher)
+        if lsh.add(template.id, template.keywords):
+            self._group_of[template.id] = group
+            self._ranks[template.id] = (template.popularity_score or 0, template.quality_score or 0.0)
+
+    def remove(self, template_id: Any) -> None:
+        group = self._group_of.pop(template_id, None)
+        self._ranks.pop(template_id, None)
+        if group is not None:
+            self._groups[group].remove(template_id)
+
+    def query(self, group: PromptGroup, words: Set[str], threshold: float) -> List[Tuple[Any, float]]:
+        """
+        Templates of a group with keyword Jaccard >= threshold.
+
+        Returns:
+            (template id, score) pairs, best first; ties go to the more
+            popular, then higher quality template
+        """
+        lsh = self._groups.get(group)
+        if lsh is None:
+            return []
+        matches = lsh.query(words, threshold)
+        matches.sort(key=lambda item: (item[1], *self._ranks[item[0]]), reverse=True)
+        return matches
+
+    def clear(self) -> None:
+        for lsh in self._groups.values():
+            lsh.clear()
+        self._group_of.clear()
+        self._ranks.clear()
+
+    async def sync(self, db: AsyncSession) -> None:
+        """
+        Bring the index up to date: a full load on first use and every
+        hour, otherwise only templates created or updated since the last
+        sync (see IncrementalSync).
+        """
+        if await self._sync.sync(db):
+            logger.info(f"Template similarity index built with {len(self)} templates")
+
+
 class PromptGeneratorService:
     """
     Service for generating, storing, and retrieving prompt templates.
@@ -529,6 +628,8 @@ class PromptGeneratorService:
         self.db.add(template)
         await self.db.commit()
         await self.db.refresh(template)
+        get_template_similarity_index().add(template)
+        await get_version_keys().bump(PROMPT_TEMPLATES)
 
         logger.info(f"Created template: {group.value}/{sub_topic.value} - {prompt[:50]}...")
         return template
@@ -699,6 +800,7 @@ class PromptGeneratorService:
 
         await self.db.commit()
         await self.db.refresh(template)
+        await get_version_keys().bump(PROMPT_TEMPLATES)
 
         logger.info(f"Cached result for template: {template_id}")
         return template
@@ -794,15 +896,13 @@ class PromptGeneratorService:
 
         self.db.add(usage)
 
-        # Update template statistics
-        await self.db.execute(
-            update(PromptTemplate)
-            .where(PromptTemplate.id == template_id)
-            .values(
-                usage_count=PromptTemplate.usage_count + 1,
-                popularity_score=PromptTemplate.popularity_score + 1,
-                last_used_at=datetime.utcnow(),
-            )
+        # Update template statistics (write-behind: no lock on the template row)
+        get_write_behind_counters().incr(
+            PromptTemplate,
+            template_id,
+            touch=("last_used_at",),
+            usage_count=1,
+            popularity_score=1,
         )
 
         await self.db.commit()
@@ -834,28 +934,18 @@ class PromptGeneratorService:
         # Extract keywords from input prompt
         words = set(prompt.lower().split())
 
-        # Get all templates in the group
-        templates = await self.get_templates_by_group(group, limit=50)
-
-        best_match = None
-        best_score = 0.0
-
-        for template in templates:
-            if not template.keywords:
-                continue
+        # Candidates from the group's LSH buckets, re-checked with exact Jaccard
+        index = get_template_similarity_index()
+        await index.sync(self.db)
 
-            # Calculate Jaccard similarity
-            template_words = set(template.keywords)
-            intersection = len(words & template_words)
-            union = len(words | template_words)
+        for template_id, _ in index.query(group, words, threshold):
+            template = await self.get_template_by_id(template_id)
+            if template and template.is_active and template.is_default:
+                return template
+            # Deactivated or deleted since the last sync
+            index.remove(template_id)
 
-            if union > 0:
-                score = intersection / union
-                if score > best_score and score >= threshold:
-                    best_score = score
-                    best_match = template
-
-        return best_match
+        return None
 
     # =========================================================================
     # BATCH OPERATIONS
@@ -963,6 +1053,18 @@ class PromptGeneratorService:
 
 # === Helper Functions ===
 
+# Singleton instance (the service itself is created per request)
+_template_similarity_index: Optional[TemplateSimilarityIndex] = None
+
+
+def get_template_similarity_index() -> TemplateSimilarityIndex:
+    """Get or create template similarity index singleton"""
+    global _template_similarity_index
+    if _template_similarity_index is None:
+        _template_similarity_index = TemplateSimilarityIndex()
+    return _template_similarity_index
+
+
 def get_prompt_generator_service(db: AsyncSession) -> PromptGeneratorService:
     """Factory function to create PromptGeneratorService instance."""
     return PromptGeneratorService(db)
@@ -7,11 +7,15 @@ Supports: English (en), Traditional Chinese (zh-TW), Japanese (ja), Korean (ko),
 import re
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from dataclasses import dataclass
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services.demo_search_index import DemoSearchIndex
+from app.services.incremental_sync import IncrementalSync
+from app.services.keyword_matcher import KeywordMatcher, normalize_keyword
+
 logger = logging.getLogger(__name__)
 
 
@@ -95,6 +99,12 @@ KEYWORD_TRANSLATIONS = {
     "swimming": {"zh-TW": ["游泳"], "ja": ["泳ぐ", "スイミング"], "ko": ["수영"], "es": ["nadando", "nadar"]},
 }
 
+_TOKEN_RE = re.compile(r'\w+')
+_HAN_RE = re.compile(r'[\u4e00-\u9fff]')
+_KANA_RE = re.compile(r'[\u3040-\u30ff]')
+_HANGUL_RE = re.compile(r'[\uac00-\ud7af]')
+_SPANISH_RE = re.compile(r'[áéíóúüñ¿¡]')
+
 # Category mapping keywords
 CATEGORY_KEYWORDS = {
     "animals": ["cat", "dog", "bird", "fish", "lion", "tiger", "elephant", "horse", "rabbit", "dragon", "pet", "wildlife", "animal"],
@@ -147,6 +157,46 @@ class PromptMatchingService:
         self.keyword_translations = KEYWORD_TRANSLATIONS
         self.category_keywords = CATEGORY_KEYWORDS
         self.style_keywords = STYLE_KEYWORDS
+        self._build_indexes()
+
+        # In-process search index over active, completed demos
+        self._demo_index = DemoSearchIndex()
+        self._demo_index_sync: Optional[IncrementalSync] = None
+
+    def _build_indexes(self) -> None:
+        """
+        Precompute reverse lookup tables from the keyword dictionaries.
+
+        - English token -> keyword (tokens of multi-word keywords included)
+        - Per language: automaton over translations -> English keyword
+        - Keyword -> categories / styles, with definition order as rank
+        Earlier dictionary entries win on duplicates, as in a linear scan.
+        """
+        self._english_index: Dict[str, str] = {}
+        translations_by_language: Dict[str, Dict[str, str]] = {}
+        for eng_word, translations in self.keyword_translations.items():
+            for token in [eng_word.lower(), *eng_word.lower().split()]:
+                self._english_index.setdefault(token, eng_word)
+            for language, terms in translations.items():
+                lookup = translations_by_language.setdefault(language, {})
+                for term in terms:
+                    lookup.setdefault(normalize_keyword(term), eng_word)
+        self._translation_matchers: Dict[str, KeywordMatcher] = {
+            language: KeywordMatcher(lookup)
+            for language, lookup in translations_by_language.items()
+        }
+
+        self._category_rank = {category: rank for rank, category in enumerate(self.category_keywords)}
+        self._category_index: Dict[str, List[str]] = {}
+        for category, cat_keywords in self.category_keywords.items():
+            for kw in dict.fromkeys(cat_keywords):
+                self._category_index.setdefault(kw, []).append(category)
+
+        self._style_index: Dict[str, str] = {}
+        for style, style_kws in self.style_keywords.items():
+            for kw in style_kws:
+                self._style_index.setdefault(kw, style)
+        self._style_rank = {style: rank for rank, style in enumerate(self.style_keywords)}
 
     def detect_language(self, text: str) -> str:
         """
@@ -154,15 +204,14 @@ class PromptMatchingService:
         Returns: 'en', 'zh-TW', 'ja', 'ko', 'es', or 'unknown'
         """
         # Check for character ranges
-        has_cjk = bool(re.search(r'[\u4e00-\u9fff]', text))  # Chinese/Japanese Kanji
-        has_hiragana = bool(re.search(r'[\u3040-\u309f]', text))  # Hiragana
-        has_katakana = bool(re.search(r'[\u30a0-\u30ff]', text))  # Katakana
-        has_korean = bool(re.search(r'[\uac00-\ud7af]', text))  # Korean
-        has_spanish_chars = bool(re.search(r'[áéíóúüñ¿¡]', text.lower()))
+        has_cjk = bool(_HAN_RE.search(text))  # Chinese/Japanese Kanji
+        has_kana = bool(_KANA_RE.search(text))  # Hiragana / Katakana
+        has_korean = bool(_HANGUL_RE.search(text))  # Korean
+        has_spanish_chars = bool(_SPANISH_RE.search(text.lower()))
 
         if has_korean:
             return "ko"
-        if has_hiragana or has_katakana:
+        if has_kana:
             return "ja"
         if has_cjk:
             return "zh-TW"  # Default to Traditional Chinese for CJK
@@ -173,47 +222,53 @@ class PromptMatchingService:
     def normalize_prompt(self, prompt: str) -> PromptAnalysis:
         """
         Normalize prompt to English and extract keywords.
+
+        Single pass: each token is one dictionary lookup, and translations
+        for the detected language are found with one automaton scan, so
+        multi-character CJK phrases match without spaces.
         """
         original = prompt.strip()
         language = self.detect_language(original)
-        normalized_words = []
-        matched_keywords = []
+        lowered = original.lower()
+
+        # (position, keyword) so both sources merge in prompt order
+        matches = []
+        words = []
+        english_spans = []
 
         # Tokenize (simple word splitting)
-        words = re.findall(r'\w+', original.lower())
-
-        for word in words:
-            matched = False
-
-            # Check if word matches any translation
-            for eng_word, translations in self.keyword_translations.items():
-                # Check English
-                if word == eng_word.lower() or word in eng_word.lower().split():
-                    normalized_words.append(eng_word)
-                    matched_keywords.append(eng_word)
-                    matched = True
-                    break
-
-                # Check translations for detected language
-                if language in translations:
-                    for trans in translations[language]:
-                        if word == trans.lower() or trans.lower() in original.lower():
-                            normalized_words.append(eng_word)
-                            matched_keywords.append(eng_word)
-                            matched = True
-                            break
-                if matched:
-                    break
-
-            if not matched and language == "en":
-                normalized_words.append(word)
+        for token in _TOKEN_RE.finditer(lowered):
+            word = token.group()
+            words.append(word)
+            eng_word = self._english_index.get(word)
+            if eng_word is not None:
+                matches.append((token.start(), eng_word))
+                english_spans.append((token.start(), token.end()))
+            elif language == "en":
+                matches.append((token.start(), None))
+
+        matcher = self._translation_matchers.get(language)
+        if matcher is not None:
+            taken_until = -1
+            # Leftmost-longest, non-overlapping phrases ("貓咪" over "貓")
+            found = sorted(matcher.iter_matches(lowered), key=lambda m: (m.start, -m.end))
+            for match in found:
+                if match.start < taken_until:
+                    continue
+                if any(start < match.end and match.start < end for start, end in english_spans):
+                    continue
+                matches.append((match.start, match.payload))
+                taken_until = match.end
+            matches.sort(key=lambda item: item[0])
+
+        matched_keywords = [eng_word for _, eng_word in matches if eng_word is not None]
 
         # Build normalized prompt
         if language == "en":
-            normalized = original.lower()
+            normalized = lowered
         else:
             # For non-English, use matched keywords
-            normalized = " ".join(normalized_words) if normalized_words else original
+            normalized = " ".join(matched_keywords) if matched_keywords else original
 
         # Detect category
         category = self._detect_category(matched_keywords + words)
@@ -236,23 +291,21 @@ class PromptMatchingService:
         )
 
     def _detect_category(self, keywords: List[str]) -> Optional[str]:
-        """Detect category from keywords"""
-        scores = {}
-        for category, cat_keywords in self.category_keywords.items():
-            score = sum(1 for kw in keywords if kw.lower() in cat_keywords)
-            if score > 0:
-                scores[category] = score
+        """Detect category from keywords (ties go to the earlier category)"""
+        scores: Dict[str, int] = {}
+        for kw in keywords:
+            for category in self._category_index.get(kw.lower(), ()):
+                scores[category] = scores.get(category, 0) + 1
 
         if scores:
-            return max(scores, key=scores.get)
+            return min(scores, key=lambda category: (-scores[category], self._category_rank[category]))
         return None
 
     def _detect_style(self, keywords: List[str]) -> Optional[str]:
-        """Detect style from keywords"""
-        for style, style_kws in self.style_keywords.items():
-            for kw in keywords:
-                if kw.lower() in style_kws:
-                    return style
+        """Detect style from keywords (the earliest matching style wins)"""
+        styles = [self._style_index[kw] for kw in map(str.lower, keywords) if kw in self._style_index]
+        if styles:
+            return min(styles, key=self._style_rank.__getitem__)
         return None
 
     def calculate_similarity(
@@ -295,6 +348,60 @@ class PromptMatchingService:
         """Generate hash for prompt caching"""
         return hashlib.sha256(prompt.strip().lower().encode()).hexdigest()
 
+    @staticmethod
+    def _is_searchable(demo) -> bool:
+        """Whether a demo (or row tuple) can be returned by find_similar_demos."""
+        return bool(demo.is_active and demo.status == "completed")
+
+    def index_demo(self, demo) -> None:
+        """Add, refresh or drop one demo in the search index after a write."""
+        if self._is_searchable(demo):
+            self._demo_index.add(
+                demo.id, demo.keywords, demo.category_slug, demo.style_slug, demo.popularity_score
+            )
+        else:
+            self._demo_index.remove(demo.id)
+
+    def unindex_demos(self, demo_ids: Iterable[Any]) -> None:
+        """Drop demos from the search index (e.g. after they expire)."""
+        for demo_id in demo_ids:
+            self._demo_index.remove(demo_id)
+
+    async def _sync_demo_index(self, db: AsyncSession) -> None:
+        """
+        Bring the demo search index up to date.
+
+        All searchable demos are loaded on first use and every hour; in
+        between, only rows created or updated since the last sync are read
+        (see IncrementalSync), which picks up demos written by other
+        processes such as the regeneration worker.
+        """
+        if self._demo_index_sync is None:
+            from app.models.demo import ImageDemo
+
+            self._demo_index_sync = IncrementalSync(
+                "demo search index",
+                ImageDemo,
+                select(
+                    ImageDemo.id,
+                    ImageDemo.keywords,
+                    ImageDemo.category_slug,
+                    ImageDemo.style_slug,
+                    ImageDemo.popularity_score,
+                    ImageDemo.is_active,
+                    ImageDemo.status,
+                ),
+                and_(
+                    ImageDemo.is_active == True,
+                    ImageDemo.status == "completed"
+                ),
+                apply=self.index_demo,
+                clear=self._demo_index.clear,
+            )
+
+        if await self._demo_index_sync.sync(db):
+            logger.info(f"Demo search index built with {len(self._demo_index)} demos")
+
     async def find_similar_demos(
         self,
         db: AsyncSession,
@@ -305,45 +412,59 @@ class PromptMatchingService:
         """
         Find similar demos in database for a given prompt.
         Returns list of demos with similarity scores.
+
+        Only demos sharing a keyword, category or style with the prompt are
+        scored (from the in-process index); just the top results are loaded.
         """
         from app.models.demo import ImageDemo
 
         # Analyze prompt
         analysis = self.normalize_prompt(prompt)
 
-        # Query active demos
-        query = select(ImageDemo).where(
-            and_(
-                ImageDemo.is_active == True,
-                ImageDemo.status == "completed"
-            )
-        )
-        result = await db.execute(query)
-        demos = result.scalars().all()
-
-        # Calculate scores
-        scored_demos = []
-        for demo in demos:
-            score = self.calculate_similarity(
+        await self._sync_demo_index(db)
+        ranked = self._demo_index.search(
+            keywords=analysis.keywords,
+            category=analysis.category,
+            style=analysis.style,
+            score=lambda entry: self.calculate_similarity(
                 query_keywords=analysis.keywords,
-                demo_keywords=demo.keywords or [],
+                demo_keywords=entry.keywords,
                 query_category=analysis.category,
-                demo_category=demo.category_slug,
+                demo_category=entry.category,
                 query_style=analysis.style,
-                demo_style=demo.style_slug
+                demo_style=entry.style
+            ),
+            limit=limit,
+            min_score=min_score
+        )
+        if not ranked:
+            return []
+
+        # Load the winners; the index may trail the database by one sync interval
+        result = await db.execute(
+            select(ImageDemo).where(
+                and_(
+                    ImageDemo.id.in_([entry.id for _, entry in ranked]),
+                    ImageDemo.is_active == True,
+                    ImageDemo.status == "completed"
+                )
             )
+        )
+        demos = {demo.id: demo for demo in result.scalars().all()}
 
-            if score >= min_score:
-                scored_demos.append({
-                    "demo": demo,
-                    "score": score,
-                    "matched_keywords": list(set(analysis.keywords) & set(demo.keywords or []))
-                })
-
-        # Sort by score (descending) and popularity
-        scored_demos.sort(key=lambda x: (x["score"], x["demo"].popularity_score), reverse=True)
-
-        return scored_demos[:limit]
+        scored_demos = []
+        for score, entry in ranked:
+            demo = demos.get(entry.id)
+            if demo is None:
+                self._demo_index.remove(entry.id)
+                continue
+            scored_demos.append({
+                "demo": demo,
+                "score": score,
+                "matched_keywords": list(set(analysis.keywords) & set(demo.keywords or []))
+            })
+
+        return scored_demos
 
     async def get_random_demo(
         self,
@@ -357,23 +478,27 @@ class PromptMatchingService:
         """
         from app.models.demo import ImageDemo
 
-        query = select(ImageDemo).where(
-            and_(
-                ImageDemo.is_active == True,
-                ImageDemo.status == "completed"
+        # Pick from the in-process index and load only that row; a pick
+        # gone stale since the last sync leaves the index and is redrawn
+        await self._sync_demo_index(db)
+        for _ in range(3):
+            entry = self._demo_index.sample(category=category, style=style)
+            if entry is None:
+                return None
+            result = await db.execute(
+                select(ImageDemo).where(
+                    and_(
+                        ImageDemo.id == entry.id,
+                        ImageDemo.is_active == True,
+                        ImageDemo.status == "completed"
+                    )
+                )
             )
-        )
-
-        if category:
-            query = query.where(ImageDemo.category_slug == category)
-        if style:
-            query = query.where(ImageDemo.style_slug == style)
-
-        # Random ordering
-        query = query.order_by(func.random()).limit(1)
-
-        result = await db.execute(query)
-        return result.scalar_one_or_none()
+            demo = result.scalar_one_or_none()
+            if demo is not None:
+                return demo
+            self._demo_index.remove(entry.id)
+        return None
 
 
 # Singleton instance
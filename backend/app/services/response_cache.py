@@ -0,0 +1,261 @@
+"""
+Pre-serialized Response Cache
+Listing endpoints whose content only changes when the catalog does (preset
+lists, prompt templates, tool categories) keep their JSON bodies as bytes,
+keyed by (endpoint, params, language) and tagged with the version of the
+data they were built from. Each body carries a strong ETag (hash of the
+bytes, so every worker agrees), and If-None-Match requests get a 304.
+
+When the version changes, the old body keeps being served while a
+background task rebuilds it with its own session; only keys with no body
+yet are built inline.
+
+Versions come from Redis counters (catalog:version:<name>) bumped by the
+code that writes the data, polled at most every refresh_interval seconds.
+They also roll over every max_age seconds, which covers writes that do
+not bump them (e.g. write-behind popularity updates).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    import aioredis as redis
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+VERSION_KEY_PREFIX = "catalog:version:"
+
+# Version names for data outside the preset catalog
+PROMPT_TEMPLATES = "prompt_templates"
+TOOL_SHOWCASES = "tool_showcases"
+
+Builder = Callable[[AsyncSession], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """A serialized JSON body and its validators"""
+    body: bytes
+    etag: str
+    version: Hashable
+
+
+def serialize(payload: Any, version: Hashable = None) -> CachedBody:
+    """Encode like FastAPI's JSONResponse, with a strong ETag over the bytes."""
+    body = json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return CachedBody(body=body, etag=etag, version=version)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def to_response(request: Request, cached: CachedBody, max_age: Optional[int] = None) -> Response:
+    """200 with the cached bytes, or 304 if the client already has them."""
+    max_age = max_age if max_age is not None else getattr(settings, 'RESPONSE_CACHE_CONTROL_MAX_AGE', 60)
+    headers = {"ETag": cached.etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+class VersionKeys:
+    """Local view of the catalog:version:<name> counters in Redis."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.refresh_interval = getattr(settings, 'PRESET_CATALOG_REFRESH_INTERVAL', 5.0)
+        self.max_age = getattr(settings, 'PRESET_CATALOG_MAX_AGE', 300)
+        self._redis: Optional[redis.Redis] = None
+        self._remote: Dict[str, Optional[str]] = {}
+        self._local: Dict[str, int] = {}
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _get_redis(self) -> redis.Redis:
+        """Get or create Redis connection"""
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True
+            )
+        return self._redis
+
+    async def get(self, name: str) -> str:
+        """Current version of a named data set."""
+        now = time.monotonic()
+        if name not in self._remote or now - self._checked_at >= self.refresh_interval:
+            async with self._lock:
+                if name not in self._remote or time.monotonic() - self._checked_at >= self.refresh_interval:
+                    await self._refresh(name)
+        epoch = int(time.time() // self.max_age) if self.max_age else 0
+        return f"{self._remote.get(name)}:{self._local.get(name, 0)}:{epoch}"
+
+    async def _refresh(self, name: str) -> None:
+        names = list(set(self._remote) | {name})
+        self._checked_at = time.monotonic()
+        try:
+            r = await self._get_redis()
+            values = await r.mget([VERSION_KEY_PREFIX + key for key in names])
+        except Exception as e:
+            logger.error(f"Failed to read catalog versions: {e}")
+            self._remote.setdefault(name, None)
+            return
+        self._remote.update(zip(names, values))
+
+    async def bump(self, name: str) -> None:
+        """Mark a data set as changed, here at once and in other workers on their next poll."""
+        self._local[name] = self._local.get(name, 0) + 1
+        try:
+            r = await self._get_redis()
+            await r.incr(VERSION_KEY_PREFIX + name)
+        except Exception as e:
+            logger.error(f"Failed to bump catalog version {name}: {e}")
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+class ResponseCache:
+    """
+    Serialized bodies by key, rebuilt in the background on version change.
+
+    Args:
+        session_factory: Creates sessions for background rebuilds
+        max_entries: Bodies kept (oldest dropped first)
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None, max_entries: Optional[int] = None):
+        self._session_factory = session_factory
+        self.max_entries = max_entries or getattr(settings, 'RESPONSE_CACHE_MAX_ENTRIES', 2000)
+        self._entries: Dict[Hashable, CachedBody] = {}
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    def _store(self, key: Hashable, cached: CachedBody) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = cached
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    async def get(self, db: AsyncSession, key: Hashable, version: Hashable, build: Builder) -> CachedBody:
+        """
+        Body for key at version.
+
+        A version of None means the data could not be versioned (e.g. the
+        catalog failed to load): the body is built and not cached.
+        """
+        if version is None:
+            return serialize(await build(db))
+
+        cached = self._entries.get(key)
+        if cached is not None and cached.version == version:
+            self.hits += 1
+            return cached
+        if cached is not None:
+            self.stale_hits += 1
+            self._schedule_rebuild(key, version, build)
+            return cached
+
+        self.misses += 1
+        cached = serialize(await build(db), version)
+        self._store(key, cached)
+        return cached
+
+    def _schedule_rebuild(self, key: Hashable, version: Hashable, build: Builder) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._rebuild(key, version, build))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _rebuild(self, key: Hashable, version: Hashable, build: Builder) -> None:
+        try:
+            async with self._session() as db:
+                payload = await build(db)
+            self._store(key, serialize(payload, version))
+        except Exception as e:
+            logger.error(f"Failed to rebuild cached response {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def close(self) -> None:
+        """Wait for background rebuilds to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Singleton instances
+_response_cache: Optional[ResponseCache] = None
+_version_keys: Optional[VersionKeys] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create response cache singleton"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+def get_version_keys() -> VersionKeys:
+    """Get or create catalog version keys singleton"""
+    global _version_keys
+    if _version_keys is None:
+        _version_keys = VersionKeys()
+    return _version_keys
+
+
+async def cached_json_response(
+    request: Request,
+    db: AsyncSession,
+    key: Hashable,
+    version: Hashable,
+    build: Builder,
+) -> Response:
+    """Serve build()'s JSON from the response cache, honouring If-None-Match."""
+    cached = await get_response_cache().get(db, key, version, build)
+    return to_response(request, cached)
@@ -6,18 +6,50 @@ Uses cosine similarity on text embeddings.
 import logging
 import hashlib
 import math
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, text
 
+from app.core.config import get_settings
 from app.models.demo import PromptCache
+from app.services.embedding_index import EmbeddingIndex
 from app.services.gemini_service import get_gemini_service
+from app.services.incremental_sync import IncrementalSync
+from app.services.local_embedding import get_local_embedder
+from app.services.write_behind import get_write_behind_counters
 
 logger = logging.getLogger(__name__)
 
 # Similarity threshold: 0.85 = 85% similar means we use cached result
 SIMILARITY_THRESHOLD = 0.85
 
+# pgvector column added by migration o3c4d5e6f7g8 (Gemini text-embedding-004 size)
+PGVECTOR_DIMENSIONS = 768
+
+PGVECTOR_COLUMN_QUERY = text("""
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'prompt_cache' AND column_name = 'embedding_vector'
+""")
+
+PGVECTOR_STORE_QUERY = text("""
+    UPDATE prompt_cache SET embedding_vector = CAST(:embedding AS vector) WHERE id = :id
+""")
+
+# ORDER BY distance LIMIT k in the inner query lets Postgres use the HNSW
+# index; the threshold is applied to those k candidates only.
+PGVECTOR_SEARCH_QUERY = text("""
+    SELECT id, similarity FROM (
+        SELECT id, 1 - (embedding_vector <=> CAST(:query AS vector)) AS similarity
+        FROM prompt_cache
+        WHERE embedding_vector IS NOT NULL
+          AND is_active AND status = 'completed' AND image_url IS NOT NULL
+        ORDER BY embedding_vector <=> CAST(:query AS vector)
+        LIMIT :limit
+    ) AS candidates
+    WHERE similarity >= :threshold
+    ORDER BY similarity DESC
+""")
+
 
 def calculate_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """
@@ -39,6 +71,11 @@ def calculate_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return dot_product / (magnitude1 * magnitude2)
 
 
+def _vector_literal(embedding: Sequence[float]) -> str:
+    """pgvector text input format: [x1,x2,...]"""
+    return "[" + ",".join(map(repr, map(float, embedding))) + "]"
+
+
 def normalize_prompt(prompt: str) -> str:
     """
     Normalize prompt for consistent matching.
@@ -68,12 +105,53 @@ class SimilarityService:
 
     Uses Gemini embeddings for semantic similarity matching.
     Falls back to hash-based matching when embeddings unavailable.
+
+    Nearest-neighbour search runs in Postgres through pgvector when the
+    embedding_vector column exists; otherwise embeddings of all active
+    cached prompts are kept in an in-memory EmbeddingIndex, synced
+    incrementally from the database.
+
+    A second index of offline n-gram embeddings (LocalEmbedder) of the
+    normalized prompts serves as a first stage: near-identical prompts are
+    matched without any remote call, and prompts with no lexically close
+    cached prompt skip the Gemini embedding request. It is only built while
+    one of SIMILARITY_LOCAL_MATCH_THRESHOLD / SIMILARITY_LOCAL_PREFILTER is on.
     """
 
     def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
         self.threshold = threshold
         self.gemini = get_gemini_service()
 
+        self._index = EmbeddingIndex()
+        self._local_index = EmbeddingIndex()
+        self.local_embedder = get_local_embedder()
+        self._index_sync = IncrementalSync(
+            "embedding index",
+            PromptCache,
+            select(
+                PromptCache.id,
+                PromptCache.prompt_normalized,
+                PromptCache.prompt_embedding,
+                PromptCache.is_active,
+                PromptCache.status,
+                PromptCache.image_url,
+            ),
+            and_(
+                PromptCache.is_active == True,
+                PromptCache.status == "completed",
+                PromptCache.image_url.isnot(None)
+            ),
+            apply=self._apply_row,
+            clear=self._clear_index,
+        )
+
+        # None until checked against the database schema
+        settings = get_settings()
+        self.use_pgvector = settings.SIMILARITY_USE_PGVECTOR
+        self.local_match_threshold = settings.SIMILARITY_LOCAL_MATCH_THRESHOLD
+        self.local_prefilter = settings.SIMILARITY_LOCAL_PREFILTER
+        self._pgvector_available: Optional[bool] = None
+
     async def find_similar_prompt(
         self,
         prompt: str,
@@ -100,7 +178,24 @@ class SimilarityService:
             logger.info(f"Found exact match for prompt: {prompt[:50]}...")
             return exact_match
 
-        # Step 2: Try semantic similarity with embeddings
+        # Step 2: First stage on offline n-gram embeddings (no remote call)
+        if embedding is None and self.local_stage_enabled:
+            local_embedding = self.local_embedder.embed(normalized)
+            if local_embedding is not None:
+                await self._sync_index(db)
+                candidates = self._local_index.search(local_embedding, k=10)
+                best_local = candidates[0][1] if candidates else 0.0
+
+                if self.local_match_threshold > 0:
+                    similar = await self._load_best_candidate(candidates, db, self.local_match_threshold)
+                    if similar:
+                        logger.info(f"Found near-identical cached prompt (local similarity: {similar['similarity']:.2f})")
+                        return similar
+
+                if best_local < self.local_prefilter:
+                    return None
+
+        # Step 3: Try semantic similarity with embeddings
         if embedding is None:
             # Generate embedding for the prompt
             embed_result = await self.gemini.get_embedding(normalized)
@@ -132,9 +227,8 @@ class SimilarityService:
         cached = result.scalar_one_or_none()
 
         if cached and cached.image_url:
-            # Update usage count
-            cached.usage_count += 1
-            await db.commit()
+            # Update usage count (buffered, written in batches)
+            get_write_behind_counters().incr(PromptCache, cached.id, usage_count=1)
 
             return {
                 "found": True,
@@ -150,6 +244,125 @@ class SimilarityService:
 
         return None
 
+    @staticmethod
+    def _is_servable(cached) -> bool:
+        """Whether a cache row (or row tuple) can serve similarity matches."""
+        return bool(cached.is_active and cached.status == "completed" and cached.image_url)
+
+    @property
+    def local_stage_enabled(self) -> bool:
+        """Whether the offline first stage (and so the local index) is in use."""
+        return self.local_match_threshold > 0 or self.local_prefilter > 0
+
+    def _index_row(self, cached_id, normalized: Optional[str], embedding: Optional[Sequence[float]]) -> None:
+        """Add or refresh a servable cache entry in the indexes in use."""
+        if embedding is not None and len(embedding):
+            self._index.add(cached_id, embedding)
+        else:
+            self._index.remove(cached_id)
+        if not self.local_stage_enabled:
+            return
+        local_embedding = self.local_embedder.embed(normalized) if normalized else None
+        if local_embedding is not None:
+            self._local_index.add(cached_id, local_embedding)
+        else:
+            self._local_index.remove(cached_id)
+
+    def _unindex_row(self, cached_id) -> None:
+        self._index.remove(cached_id)
+        self._local_index.remove(cached_id)
+
+    def _clear_index(self) -> None:
+        self._index.clear()
+        self._local_index.clear()
+
+    def _apply_row(self, row) -> None:
+        if self._is_servable(row):
+            self._index_row(row.id, row.prompt_normalized, row.prompt_embedding)
+        else:
+            self._unindex_row(row.id)
+
+    async def _sync_index(self, db: AsyncSession) -> None:
+        """
+        Bring the embedding indexes (Gemini and local) up to date.
+
+        The whole active cache is loaded on first use and every hour; in
+        between, only rows created or updated since the last sync are read
+        (see IncrementalSync). Rows that were deactivated since are dropped
+        from the index.
+        """
+        if await self._index_sync.sync(db):
+            logger.info(
+                f"Embedding index built with {len(self._index)} Gemini embeddings "
+                f"({len(self._local_index)} local)"
+            )
+
+    async def _check_pgvector(self, db: AsyncSession) -> bool:
+        """Whether the pgvector column exists (checked once per process)."""
+        if self._pgvector_available is None:
+            try:
+                self._pgvector_available = (await db.execute(PGVECTOR_COLUMN_QUERY)).scalar() is not None
+            except Exception as e:
+                logger.error(f"Failed to check for pgvector column: {e}")
+                await db.rollback()
+                self._pgvector_available = False
+            if self._pgvector_available:
+                logger.info("Using pgvector for prompt similarity search")
+        return self._pgvector_available
+
+    async def _search_pgvector(
+        self,
+        query_embedding: List[float],
+        db: AsyncSession,
+        limit: int
+    ) -> Optional[List[Tuple[Any, float]]]:
+        """
+        Nearest cached prompts above the threshold, searched in Postgres.
+
+        Returns:
+            List of (id, similarity), most similar first; None if pgvector
+            cannot serve this query (caller falls back to the local index)
+        """
+        if (
+            not self.use_pgvector
+            or len(query_embedding) != PGVECTOR_DIMENSIONS
+            or not await self._check_pgvector(db)
+        ):
+            return None
+
+        try:
+            result = await db.execute(
+                PGVECTOR_SEARCH_QUERY,
+                {
+                    "query": _vector_literal(query_embedding),
+                    "limit": limit,
+                    "threshold": self.threshold,
+                },
+            )
+            return [(row.id, float(row.similarity)) for row in result.all()]
+        except Exception as e:
+            logger.error(f"pgvector similarity search failed, using local index: {e}")
+            await db.rollback()
+            self._pgvector_available = False
+            return None
+
+    async def _store_pgvector(self, cached_id, embedding: Optional[Sequence[float]], db: AsyncSession) -> None:
+        """
+        Write embedding_vector for a cache entry (part of the caller's transaction).
+
+        Runs in a savepoint so a failure never discards the caller's changes.
+        """
+        if not self._pgvector_available or embedding is None or len(embedding) != PGVECTOR_DIMENSIONS:
+            return
+        try:
+            async with db.begin_nested():
+                await db.execute(
+                    PGVECTOR_STORE_QUERY,
+                    {"id": cached_id, "embedding": _vector_literal(embedding)},
+                )
+        except Exception as e:
+            logger.error(f"Failed to store pgvector embedding: {e}")
+
     async def _find_similar_by_embedding(
         self,
         query_embedding: List[float],
@@ -159,47 +372,42 @@ class SimilarityService:
         """
         Find similar prompts by embedding similarity.
 
-        We load recent cached prompts and compute similarity in Python.
-        For larger datasets, consider using pgvector extension.
+        Gets the nearest candidates from pgvector, or from the in-memory
+        embedding index over the whole active cache, then loads only the
+        best candidates by primary key. Candidates that were deactivated
+        since the last index sync are dropped and skipped.
         """
-        # Get recent cached prompts with embeddings
-        result = await db.execute(
-            select(PromptCache).where(
-                and_(
-                    PromptCache.prompt_embedding.isnot(None),
-                    PromptCache.is_active == True,
-                    PromptCache.status == "completed",
-                    PromptCache.image_url.isnot(None)
-                )
-            ).order_by(PromptCache.usage_count.desc()).limit(100)
-        )
-        cached_prompts = result.scalars().all()
+        candidates = await self._search_pgvector(query_embedding, db, limit)
+        if candidates is None:
+            await self._sync_index(db)
+            candidates = self._index.search(query_embedding, k=limit)
 
-        best_match = None
-        best_similarity = 0.0
+        return await self._load_best_candidate(candidates, db, self.threshold)
 
-        for cached in cached_prompts:
-            if cached.prompt_embedding:
-                # Calculate similarity
-                similarity = calculate_cosine_similarity(
-                    query_embedding,
-                    cached.prompt_embedding
-                )
+    async def _load_best_candidate(
+        self,
+        candidates: List[Tuple[Any, float]],
+        db: AsyncSession,
+        threshold: float
+    ) -> Optional[Dict[str, Any]]:
+        """Load the best still-servable candidate at or above the threshold."""
+        for cached_id, similarity in candidates:
+            # Results are sorted, so nothing after this can pass either
+            if similarity < threshold:
+                break
 
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match = cached
+            best_match = await db.get(PromptCache, cached_id)
+            if best_match is None or not self._is_servable(best_match):
+                self._unindex_row(cached_id)
+                continue
 
-        # Check if best match exceeds threshold
-        if best_match and best_similarity >= self.threshold:
-            # Update usage count
-            best_match.usage_count += 1
-            await db.commit()
+            # Update usage count (buffered, written in batches)
+            get_write_behind_counters().incr(PromptCache, best_match.id, usage_count=1)
 
             return {
                 "found": True,
                 "exact_match": False,
-                "similarity": best_similarity,
+                "similarity": similarity,
                 "cached_id": str(best_match.id),
                 "prompt_original": best_match.prompt_original,
                 "prompt_enhanced": best_match.prompt_enhanced,
@@ -241,6 +449,10 @@ class SimilarityService:
         normalized = normalize_prompt(prompt)
         prompt_hash = generate_prompt_hash(prompt)
 
+        # Before any changes: the check may roll back on failure
+        if self.use_pgvector:
+            await self._check_pgvector(db)
+
         # Check if already cached
         existing = await db.execute(
             select(PromptCache).where(PromptCache.prompt_hash == prompt_hash)
@@ -255,8 +467,12 @@ class SimilarityService:
             cached.prompt_enhanced = enhanced_prompt
             cached.prompt_embedding = embedding
             cached.status = "completed"
+            await self._store_pgvector(cached.id, embedding, db)
             await db.commit()
 
+            if cached.is_active:
+                self._index_row(cached.id, cached.prompt_normalized, embedding)
+
             return {
                 "success": True,
                 "cached_id": str(cached.id),
@@ -279,15 +495,66 @@ class SimilarityService:
         )
 
         db.add(new_cache)
+        await db.flush()
+        await self._store_pgvector(new_cache.id, embedding, db)
         await db.commit()
         await db.refresh(new_cache)
 
+        self._index_row(new_cache.id, normalized, embedding)
+
         return {
             "success": True,
             "cached_id": str(new_cache.id),
             "is_update": False
         }
 
+    async def embed_missing(self, db: AsyncSession, batch_size: int = 500) -> int:
+        """
+        Embed servable cache entries that have no Gemini embedding yet.
+
+        Prompts are embedded in bulk with GeminiService.get_embeddings (one
+        batchEmbedContents request per 100 texts), stored and indexed. Texts
+        the API failed on are left for the next run.
+
+        Returns:
+            Number of entries embedded
+        """
+        result = await db.execute(
+            select(PromptCache.id, PromptCache.prompt_normalized)
+            .where(
+                and_(
+                    PromptCache.is_active == True,
+                    PromptCache.status == "completed",
+                    PromptCache.image_url.isnot(None),
+                    PromptCache.prompt_embedding.is_(None)
+                )
+            )
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+
+        if self.use_pgvector:
+            await self._check_pgvector(db)
+        embeddings = await self.gemini.get_embeddings([row.prompt_normalized for row in rows])
+
+        embedded = []
+        for row, embed_result in zip(rows, embeddings):
+            if not embed_result.get("success") or not embed_result.get("embedding"):
+                continue
+            cached = await db.get(PromptCache, row.id)
+            if cached is None:
+                continue
+            cached.prompt_embedding = embed_result["embedding"]
+            await self._store_pgvector(cached.id, embed_result["embedding"], db)
+            embedded.append((row, embed_result["embedding"]))
+        await db.commit()
+
+        for row, embedding in embedded:
+            self._index_row(row.id, row.prompt_normalized, embedding)
+        return len(embedded)
+
 
 # Singleton instance
 _similarity_service: Optional[SimilarityService] = None
@@ -0,0 +1,142 @@
+"""
+Single-Flight Request Coalescing
+Collapses concurrent identical calls (e.g. Gemini moderation of the same
+prompt) into one in-flight request whose result is shared by all callers.
+
+Within a process, callers for the same key await the same asyncio task.
+Across workers (optional), the first worker takes a short-lived Redis lock
+and publishes its result under a result key; other workers poll for it
+instead of issuing their own request.
+
+Redis Keys:
+- flight:{namespace}:lock:{key} -> held by the worker making the call
+- flight:{namespace}:result:{key} -> encoded result (short TTL)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def flight_key(text: str) -> str:
+    """Key for coalescing: hash of the lowercased, whitespace-collapsed text"""
+    normalized = re.sub(r"\s+", " ", text.lower().strip())
+    return hashlib.sha256(normalized.encode()).hexdigest()[:16]
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    Args:
+        namespace: Prefix for Redis keys (one per kind of call)
+        distributed: Also coalesce across workers through Redis
+        encode: Serialize a result for the Redis result key
+        decode: Deserialize a result read from the Redis result key
+    """
+
+    LOCK_TTL = 15          # Longer than the Gemini request timeout
+    RESULT_TTL = 30        # Followers only need the result briefly
+    POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        namespace: str,
+        distributed: bool = False,
+        encode: Callable[[Any], str] = json.dumps,
+        decode: Callable[[str], Any] = json.loads,
+    ):
+        self.namespace = namespace
+        self.distributed = distributed
+        self._encode = encode
+        self._decode = decode
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.redis: Optional[redis.Redis] = None
+
+    async def init_redis(self):
+        """Initialize Redis connection"""
+        if not self.redis:
+            self.redis = redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True
+            )
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        The shared call is shielded, so a cancelled caller does not cancel
+        the request for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.distributed:
+            return await fn()
+
+        lock_key = f"flight:{self.namespace}:lock:{key}"
+        result_key = f"flight:{self.namespace}:result:{key}"
+
+        try:
+            await self.init_redis()
+            cached = await self.redis.get(result_key)
+            if cached is not None:
+                return self._decode(cached)
+            is_leader = await self.redis.set(lock_key, "1", nx=True, ex=self.LOCK_TTL)
+        except Exception as e:
+            logger.error(f"Single-flight Redis error (calling directly): {e}")
+            return await fn()
+
+        if is_leader:
+            return await self._lead(lock_key, result_key, fn)
+        return await self._follow(lock_key, result_key, fn)
+
+    async def _lead(self, lock_key: str, result_key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Make the call and publish the result for other workers"""
+        try:
+            result = await fn()
+            try:
+                await self.redis.set(result_key, self._encode(result), ex=self.RESULT_TTL)
+            except Exception as e:
+                logger.error(f"Failed to publish single-flight result: {e}")
+            return result
+        finally:
+            try:
+                await self.redis.delete(lock_key)
+            except Exception as e:
+                logger.error(f"Failed to release single-flight lock: {e}")
+
+    async def _follow(self, lock_key: str, result_key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Wait for another worker's result; call directly if it never arrives"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.LOCK_TTL
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(self.POLL_INTERVAL)
+                cached = await self.redis.get(result_key)
+                if cached is not None:
+                    return self._decode(cached)
+                if not await self.redis.exists(lock_key):
+                    # Leader finished without a result (or died)
+                    break
+        except Exception as e:
+            logger.error(f"Single-flight wait failed (calling directly): {e}")
+        return await fn()
@@ -9,8 +9,13 @@ from pathlib import Path
 import tempfile
 import subprocess
 import shutil
-import httpx
-from PIL import Image, ImageDraw, ImageFont
+
+from app.core.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
 
 logger = logging.getLogger(__name__)
 
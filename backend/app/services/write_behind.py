@@ -0,0 +1,218 @@
+"""
+Write-Behind Counters
+Buffers popularity/usage counter increments in process and writes them to
+Postgres in the background, so hot read paths no longer commit (and wait
+on row locks) just to bump a counter.
+
+Every flush issues one UPDATE ... FROM (VALUES ...) per table:
+
+    UPDATE materials SET use_count = coalesce(materials.use_count, 0) + v.use_count
+    FROM (VALUES (:id_1, :use_count_1), ...) AS v (id, use_count)
+    WHERE materials.id = v.id
+
+Increments are additive, so each worker flushes its own buffer without
+coordination. Deltas are kept and retried if a flush fails, up to
+max_retries consecutive failures, after which they are dropped and the
+dropped counts logged; at most one flush interval of increments is lost if
+a worker dies.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from sqlalchemy import column, func, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindCounters:
+    """
+    Per-process buffer of row counter increments, flushed to the database.
+
+    Args:
+        session_factory: Callable returning an AsyncSession context manager
+        flush_interval: Seconds between background flushes
+        max_retries: Consecutive failed flushes after which buffered
+            increments are dropped instead of retried
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        flush_interval: float = 5.0,
+        max_retries: int = 12,
+    ):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._failed_flushes = 0
+        # model -> row id -> column -> delta
+        self._deltas: Dict[Type, Dict[Any, Dict[str, int]]] = defaultdict(lambda: defaultdict(dict))
+        # model -> row id -> column -> latest timestamp
+        self._touches: Dict[Type, Dict[Any, Dict[str, datetime]]] = defaultdict(lambda: defaultdict(dict))
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def incr(self, model: Type, row_id: Any, touch: Tuple[str, ...] = (), **deltas: int) -> None:
+        """
+        Record counter increments for one row; they reach the database on the next flush.
+
+        Args:
+            model: ORM model class (must have an `id` primary key)
+            row_id: Primary key of the row
+            touch: Timestamp columns to set to the time of this call
+            **deltas: column=amount increments
+        """
+        # One buffer entry per row: a duplicate id in VALUES would drop increments
+        if isinstance(row_id, str):
+            row_id = uuid.UUID(row_id)
+        row = self._deltas[model][row_id]
+        for name, amount in deltas.items():
+            row[name] = row.get(name, 0) + amount
+        if touch:
+            now = datetime.now(timezone.utc)
+            for name in touch:
+                self._touches[model][row_id][name] = now
+        self._ensure_flusher()
+
+    def pending(self, model: Type, row_id: Any) -> Dict[str, int]:
+        """Not-yet-flushed deltas for one row (column -> delta)."""
+        return dict(self._deltas.get(model, {}).get(row_id, {}))
+
+    def _ensure_flusher(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # No running loop (sync caller): deltas wait for an explicit flush
+            self._flush_task = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _get_session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    @staticmethod
+    def _build_update(model: Type, rows: Dict[Any, Dict[str, int]], touches: Dict[Any, Dict[str, datetime]]):
+        """One UPDATE ... FROM (VALUES ...) statement for all buffered rows of a table."""
+        table = model.__table__
+        counter_names = sorted({name for row in rows.values() for name in row})
+        touch_names = sorted({name for row in touches.values() for name in row})
+        row_ids = list(rows.keys() | touches.keys())
+
+        source = values(
+            column("id", table.c.id.type),
+            *(column(name, table.c[name].type) for name in counter_names),
+            *(column(name, table.c[name].type) for name in touch_names),
+            name="v",
+        ).data([
+            (
+                row_id,
+                *(rows.get(row_id, {}).get(name, 0) for name in counter_names),
+                *(touches.get(row_id, {}).get(name) for name in touch_names),
+            )
+            for row_id in row_ids
+        ])
+
+        assignments = {
+            name: func.coalesce(table.c[name], 0) + source.c[name] for name in counter_names
+        }
+        assignments.update({
+            name: func.coalesce(source.c[name], table.c[name]) for name in touch_names
+        })
+        return update(table).where(table.c.id == source.c.id).values(assignments)
+
+    async def flush(self) -> int:
+        """
+        Write all buffered increments, one UPDATE per table, in one transaction.
+
+        On failure the increments are kept and retried on the next flush;
+        after max_retries consecutive failures they are dropped (and logged).
+
+        Returns:
+            Number of rows updated
+        """
+        async with self._flush_lock:
+            if not self._deltas and not self._touches:
+                return 0
+
+            deltas, self._deltas = self._deltas, defaultdict(lambda: defaultdict(dict))
+            touches, self._touches = self._touches, defaultdict(lambda: defaultdict(dict))
+            try:
+                updated = 0
+                async with self._get_session() as session:
+                    for model in deltas.keys() | touches.keys():
+                        rows, touched = deltas.get(model, {}), touches.get(model, {})
+                        await session.execute(self._build_update(model, rows, touched))
+                        updated += len(rows.keys() | touched.keys())
+                    await session.commit()
+                self._failed_flushes = 0
+                return updated
+            except Exception as e:
+                logger.error(f"Failed to flush write-behind counters: {e}")
+                self._failed_flushes += 1
+                if self._failed_flushes > self.max_retries:
+                    self._log_dropped(deltas, touches)
+                    self._failed_flushes = 0
+                else:
+                    self._restore(deltas, touches)
+                return 0
+
+    @staticmethod
+    def _log_dropped(deltas, touches) -> None:
+        for model in deltas.keys() | touches.keys():
+            totals: Dict[str, int] = defaultdict(int)
+            for row in deltas.get(model, {}).values():
+                for name, amount in row.items():
+                    totals[name] += amount
+            rows = len(deltas.get(model, {}).keys() | touches.get(model, {}).keys())
+            logger.error(
+                f"Dropped write-behind counters for {rows} {model.__tablename__} rows "
+                f"after repeated flush failures: {dict(totals)}"
+            )
+
+    def _restore(self, deltas, touches) -> None:
+        for model, rows in deltas.items():
+            for row_id, row in rows.items():
+                current = self._deltas[model][row_id]
+                for name, amount in row.items():
+                    current[name] = current.get(name, 0) + amount
+        for model, rows in touches.items():
+            for row_id, row in rows.items():
+                current = self._touches[model][row_id]
+                for name, touched_at in row.items():
+                    current[name] = max(touched_at, current.get(name, touched_at))
+
+    async def close(self) -> None:
+        """Stop the background flusher and write what is left."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+
+# Singleton instance
+_write_behind_counters: Optional[WriteBehindCounters] = None
+
+
+def get_write_behind_counters() -> WriteBehindCounters:
+    """Get or create write-behind counters singleton"""
+    global _write_behind_counters
+    if _write_behind_counters is None:
+        _write_behind_counters = WriteBehindCounters(
+            flush_interval=get_settings().COUNTER_FLUSH_INTERVAL
+        )
+    return _write_behind_counters
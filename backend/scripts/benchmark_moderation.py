@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Moderation Benchmark and Regression Corpus
+
+Measures the cost of `check_prompt_safety` (PromptBlockCache) and
+`ModerationService.moderate` on a generated corpus of safe and unsafe
+prompts in all five supported languages (en, zh-TW, ja, ko, es) and three
+lengths.
+
+- Redis: fakeredis by default (requirements-dev.txt), or a real Redis via
+  --redis-url. The benchmark FLUSHES the selected database, so never point
+  it at a shared instance.
+- Gemini: stubbed at the HTTP layer (httpx.MockTransport) with a
+  configurable latency; it flags the corpus's "gemini-only" unsafe prompts,
+  which contain no blocked keyword.
+
+Each target runs a cold pass (empty caches) and a warm pass (same corpus
+again) and reports p50/p95/p99 latency, throughput, Redis commands and
+round trips per prompt, Gemini calls per prompt and detection accuracy.
+
+Results are written as JSON (tagged with the git commit) so runs can be
+compared between commits with --compare.
+
+Usage:
+    python -m scripts.benchmark_moderation [--per-language 40] [--concurrency 16]
+        [--gemini-latency-ms 150] [--redis-url redis://localhost:6379/15]
+        [--output benchmarks/results/moderation.json]
+        [--compare benchmarks/results/baseline.json] [--max-regression 20]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import app.services.block_cache as block_cache_module
+from app.services.block_cache import PromptBlockCache, check_prompt_safety
+from app.services.moderation import ModerationService
+from tests.moderation_corpus import GEMINI_ONLY_UNSAFE, build_corpus
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+# =============================================================================
+# STUBS AND INSTRUMENTATION
+# =============================================================================
+
+class GeminiStub:
+    """Stubbed Gemini generateContent endpoint answering all three prompt formats"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def _is_unsafe(self, text: str) -> bool:
+        return any(phrase in text for phrase in GEMINI_ONLY_UNSAFE.values())
+
+    def _answer(self, text: str) -> str:
+        if "Respond with only a JSON array" in text:
+            # Batched moderation: one verdict per JSON item, by id
+            items = json.loads(text.split("Items:\n", 1)[1].split("\n", 1)[0])
+            verdicts = []
+            for item in items:
+                unsafe = self._is_unsafe(item["text"])
+                verdicts.append({
+                    "id": item["id"], "safe": not unsafe,
+                    "categories": ["dangerous"] if unsafe else [], "confidence": 0.9, "reason": "stub",
+                })
+            return json.dumps(verdicts)
+
+        # Only the prompt under analysis, not the instructions around it
+        target = text.split("Text to analyze:", 1)[-1]
+        unsafe = self._is_unsafe(target)
+        if "Respond in this exact JSON format" in text:
+            return json.dumps({
+                "is_safe": not unsafe, "reason": "stub" if unsafe else "",
+                "categories": ["dangerous"] if unsafe else [], "blocked_words": [], "confidence": 0.9,
+            })
+        return (
+            f"SAFE: {'no' if unsafe else 'yes'}\nCATEGORIES: {'dangerous' if unsafe else 'none'}\n"
+            f"CONFIDENCE: 0.9\nREASON: stub"
+        )
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        text = json.loads(request.content)["contents"][0]["parts"][0]["text"]
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": self._answer(text)}]}}]})
+
+
+def install_gemini_stub(stub: GeminiStub) -> None:
+    """Route every httpx.AsyncClient through the stub transport"""
+    transport = httpx.MockTransport(stub.handle)
+    real_client = httpx.AsyncClient
+
+    class StubbedAsyncClient(real_client):
+        def __init__(self, *args, **kwargs):
+            kwargs["transport"] = transport
+            super().__init__(*args, **kwargs)
+
+    httpx.AsyncClient = StubbedAsyncClient
+
+
+class RedisCommandCounter:
+    """Counts commands and network round trips issued through a Redis client"""
+
+    def __init__(self, client):
+        self.commands = 0
+        self.round_trips = 0
+
+        execute_command = client.execute_command
+        pipeline = client.pipeline
+
+        async def counted_execute_command(*args, **kwargs):
+            self.commands += 1
+            self.round_trips += 1
+            return await execute_command(*args, **kwargs)
+
+        def counted_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def counted_execute(*a, **k):
+                self.commands += len(pipe.command_stack)
+                self.round_trips += 1
+                return await execute(*a, **k)
+
+            pipe.execute = counted_execute
+            return pipe
+
+        client.execute_command = counted_execute_command
+        client.pipeline = counted_pipeline
+
+
+def create_redis(redis_url: str):
+    if redis_url:
+        import redis.asyncio as redis
+        return redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is not installed: pip install fakeredis, or pass --redis-url")
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def percentile(values: List[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def run_pass(check, corpus, concurrency, counter, stub, cache) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    correct = 0
+
+    async def one(entry):
+        nonlocal correct
+        async with semaphore:
+            start = time.perf_counter()
+            blocked = await check(entry["prompt"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            correct += blocked == entry["unsafe"]
+
+    commands, round_trips, gemini_calls = counter.commands, counter.round_trips, stub.calls
+    started = time.perf_counter()
+    await asyncio.gather(*(one(entry) for entry in corpus))
+    # Include the amortized stats flush in the Redis cost
+    await cache._counters.flush()
+    elapsed = time.perf_counter() - started
+
+    n = len(corpus)
+    return {
+        "prompts": n,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_per_s": round(n / elapsed, 1),
+        "redis_commands_per_prompt": round((counter.commands - commands) / n, 2),
+        "redis_round_trips_per_prompt": round((counter.round_trips - round_trips) / n, 2),
+        "gemini_calls_per_prompt": round((stub.calls - gemini_calls) / n, 3),
+        "accuracy": round(correct / n, 4),
+    }
+
+
+async def run_target(name, corpus, args, stub) -> Dict[str, Any]:
+    client = create_redis(args.redis_url)
+    await client.flushdb()
+    counter = RedisCommandCounter(client)
+
+    cache = PromptBlockCache(gemini_api_key="stub")
+    cache._redis = client
+    block_cache_module._block_cache = cache
+
+    if name == "check_prompt_safety":
+        async def check(prompt):
+            return (await check_prompt_safety(prompt)).is_blocked
+    else:
+        service = ModerationService(api_key="stub")
+
+        async def check(prompt):
+            return not (await service.moderate(prompt)).is_safe
+
+    results = {}
+    for phase in ("cold", "warm"):
+        results[phase] = await run_pass(check, corpus, args.concurrency, counter, stub, cache)
+
+    await cache.close()
+    block_cache_module._block_cache = None
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any], max_regression: float) -> bool:
+    """Print metric deltas against a previous run; return False on regression"""
+    ok = True
+    print(f"\nComparison with {previous.get('commit')} ({previous.get('created_at')})")
+    watched = ("p95_ms", "redis_commands_per_prompt", "gemini_calls_per_prompt")
+    for target, phases in current["results"].items():
+        for phase, metrics in phases.items():
+            before = previous.get("results", {}).get(target, {}).get(phase)
+            if not before:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s", *watched[1:], "accuracy"):
+                old, new = before.get(metric), metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                change = ((new - old) / old * 100) if old else 0.0
+                flag = ""
+                if metric in watched and change > max_regression:
+                    flag, ok = "  REGRESSION", False
+                if metric == "accuracy" and new < old:
+                    flag, ok = "  REGRESSION", False
+                print(f"  {target:<20} {phase:<5} {metric:<28} {old:>10} -> {new:>10} ({change:+.1f}%){flag}")
+    return ok
+
+
+async def main_async(args) -> int:
+    corpus = build_corpus(args.per_language, args.seed)
+    stub = GeminiStub(args.gemini_latency_ms)
+    install_gemini_stub(stub)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "redis": args.redis_url or "fakeredis",
+        "params": {
+            "per_language": args.per_language,
+            "prompts": len(corpus),
+            "concurrency": args.concurrency,
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+
+    for target in ("check_prompt_safety", "moderate"):
+        report["results"][target] = await run_target(target, corpus, args, stub)
+
+    for target, phases in report["results"].items():
+        for phase, metrics in phases.items():
+            print(
+                f"{target:<20} {phase:<5} p50 {metrics['p50_ms']:>8.2f}ms  p95 {metrics['p95_ms']:>8.2f}ms  "
+                f"p99 {metrics['p99_ms']:>8.2f}ms  {metrics['throughput_per_s']:>8.1f}/s  "
+                f"redis {metrics['redis_commands_per_prompt']:>6.2f} cmd ({metrics['redis_round_trips_per_prompt']:.2f} rt)  "
+                f"gemini {metrics['gemini_calls_per_prompt']:.3f}  acc {metrics['accuracy']:.2%}"
+            )
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"moderation-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        if not compare(previous, report, args.max_regression):
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-language", type=int, default=40, help="Prompts per language")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests")
+    parser.add_argument("--gemini-latency-ms", type=float, default=150, help="Stubbed Gemini latency")
+    parser.add_argument("--redis-url", default="", help="Real Redis to use instead of fakeredis (will be flushed)")
+    parser.add_argument("--seed", type=int, default=1234, help="Corpus seed")
+    parser.add_argument("--output", default="", help="Result JSON path")
+    parser.add_argument("--compare", default="", help="Previous result JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed %% increase in p95 / Redis commands / Gemini calls")
+    args = parser.parse_args()
+    # Per-prompt "blocked" warnings would drown the report
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: ModerationService keyword and pattern filters
+
+Compares the compiled single-pass filters (Aho-Corasick keyword automaton +
+combined pattern regex) against the original per-keyword `in` checks and
+per-pattern `re.search` calls, on long multilingual prompts.
+
+The legacy implementations are reproduced here so both variants run on the
+same inputs; the script also asserts that they flag the same keywords.
+
+A second run uses the larger multilingual PromptBlockCache seed list to show
+how the automaton scales with the number of keywords, while the `in` loop
+grows linearly with it.
+
+Usage:
+    python -m scripts.benchmark_moderation_filters [--words 400] [--prompts 50] [--repeat 20]
+"""
+import argparse
+import random
+import re
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.block_cache import PromptBlockCache
+from app.services.keyword_matcher import KeywordMatcher, ahocorasick
+from app.services.moderation import (
+    BLOCKED_KEYWORDS,
+    SUSPICIOUS_PATTERNS,
+    ModerationService,
+)
+
+FILLER_WORDS = {
+    "en": "a beautiful sunset over the calm ocean with soft golden light and gentle waves".split(),
+    "zh-TW": ["美麗的", "夕陽", "海邊", "柔和", "金色", "光線", "溫柔", "海浪", "城市", "夜景"],
+    "ja": ["美しい", "夕日", "海辺", "柔らかい", "金色", "光", "穏やかな", "波", "街", "夜景"],
+    "ko": ["아름다운", "석양", "바다", "부드러운", "황금빛", "빛", "잔잔한", "파도", "도시", "야경"],
+    "es": "una hermosa puesta de sol sobre el océano tranquilo con luz dorada".split(),
+}
+
+
+def legacy_keyword_filter(prompt_lower: str):
+    flagged_keywords = []
+    for category, keywords in BLOCKED_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in prompt_lower:
+                flagged_keywords.append(keyword)
+    return flagged_keywords
+
+
+def legacy_pattern_check(prompt_lower: str):
+    return [pattern for pattern in SUSPICIOUS_PATTERNS if re.search(pattern, prompt_lower)]
+
+
+def build_prompts(words: int, count: int, seed: int = 42):
+    """Long prompts mixing all five languages, a few with a blocked keyword"""
+    rng = random.Random(seed)
+    vocabulary = [word for language_words in FILLER_WORDS.values() for word in language_words]
+    blocked = [keyword for keywords in BLOCKED_KEYWORDS.values() for keyword in keywords]
+    prompts = []
+    for i in range(count):
+        tokens = [rng.choice(vocabulary) for _ in range(words)]
+        if i % 4 == 0:
+            tokens.insert(rng.randrange(len(tokens)), rng.choice(blocked))
+        if i % 7 == 0:
+            tokens.insert(rng.randrange(len(tokens)), "young girl")
+        prompts.append(" ".join(tokens).lower())
+    return prompts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=400, help="Words per prompt")
+    parser.add_argument("--prompts", type=int, default=50, help="Number of distinct prompts")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the prompt set")
+    args = parser.parse_args()
+
+    service = ModerationService(api_key="")
+    prompts = build_prompts(args.words, args.prompts)
+
+    for prompt in prompts:
+        compiled = [keyword for _, keyword in service._match_keywords(prompt)]
+        assert sorted(compiled) == sorted(legacy_keyword_filter(prompt)), prompt
+        assert service._match_suspicious_patterns(prompt) == legacy_pattern_check(prompt), prompt
+
+    def run_legacy():
+        for prompt in prompts:
+            legacy_keyword_filter(prompt)
+            legacy_pattern_check(prompt)
+
+    def run_compiled():
+        for prompt in prompts:
+            service._match_keywords(prompt)
+            service._match_suspicious_patterns(prompt)
+
+    calls = args.prompts * args.repeat
+    legacy = min(timeit.repeat(run_legacy, number=args.repeat, repeat=3)) / calls
+    compiled = min(timeit.repeat(run_compiled, number=args.repeat, repeat=3)) / calls
+
+    backend = "pyahocorasick" if ahocorasick is not None else "pure Python"
+    print(f"Prompts: {args.prompts} x {args.words} words (en, zh-TW, ja, ko, es), automaton: {backend}")
+    print(f"Legacy   (per-keyword in + re.search): {legacy * 1e6:9.1f} us/prompt")
+    print(f"Compiled (automaton + combined regex): {compiled * 1e6:9.1f} us/prompt")
+    print(f"Speedup: {legacy / compiled:.2f}x")
+
+    seed_words = sorted({word for words in PromptBlockCache.SEED_BLOCKED_WORDS.values() for word in words})
+    seed_matcher = KeywordMatcher(seed_words, word_boundaries=False)
+
+    def run_seed_legacy():
+        for prompt in prompts:
+            [word for word in seed_words if word in prompt]
+
+    def run_seed_compiled():
+        for prompt in prompts:
+            seed_matcher.find_keywords(prompt)
+
+    legacy = min(timeit.repeat(run_seed_legacy, number=args.repeat, repeat=3)) / calls
+    compiled = min(timeit.repeat(run_seed_compiled, number=args.repeat, repeat=3)) / calls
+
+    print(f"\nBlock-cache seed list ({len(seed_words)} keywords)")
+    print(f"Legacy   (per-keyword in):             {legacy * 1e6:9.1f} us/prompt")
+    print(f"Compiled (automaton):                  {compiled * 1e6:9.1f} us/prompt")
+    print(f"Speedup: {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
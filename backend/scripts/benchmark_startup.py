@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Worker Cold-Start Benchmark
+
+Measures what a fresh uvicorn / ARQ worker pays before it can serve:
+
+- import profile: `python -X importtime -c "import app.main"`, reported as
+  the slowest modules (cumulative and self time) and self time per
+  top-level package;
+- deferred imports: whether numpy, httpx and PIL were executed while
+  importing the app (they are bound through app.core.lazy and should only
+  load on first use);
+- time to first request: process launch -> app imported -> lifespan
+  started -> GET /health/live answered, in a fresh interpreter.
+
+Every measurement runs in a new interpreter `--runs` times and medians are
+reported. Results are written as JSON (tagged with the git commit) so runs
+can be compared between commits with --compare. The run fails if the
+median time to first request is above --target seconds or a deferred
+module was loaded at import time.
+
+Usage:
+    python -m scripts.benchmark_startup [--runs 5] [--top 25] [--target 4.0]
+        [--output benchmarks/results/startup.json]
+        [--compare benchmarks/results/baseline.json] [--max-regression 20]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+# Heavy modules that must not be executed by `import app.main`
+DEFERRED_MODULES = ("numpy", "httpx", "PIL.Image")
+
+# Process launch to first /health/live response, median of --runs
+COLD_START_TARGET_SECONDS = 4.0
+
+# Runs in a fresh interpreter; prints one JSON line on stdout
+FIRST_REQUEST_SNIPPET = """
+import asyncio, json, logging, sys, time
+logging.disable(logging.CRITICAL)
+started = time.time()
+import app.main
+imported = time.time()
+from app.core.lazy import is_loaded
+loaded = {name: is_loaded(name) for name in json.loads(sys.argv[1])}
+
+async def first_request():
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/health/live", "raw_path": b"/health/live",
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    async with app.main.app.router.lifespan_context(app.main.app):
+        await app.main.app(scope, receive, send)
+        served = time.time()
+    return messages[0]["status"], served
+
+status, served = asyncio.run(first_request())
+print(json.dumps({"started": started, "imported": imported, "served": served, "status": status, "loaded": loaded}))
+"""
+
+
+def measure_first_request() -> Dict[str, Any]:
+    """Launch a fresh interpreter, serve one request, return timings in seconds."""
+    launched = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST_SNIPPET, json.dumps(DEFERRED_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "interpreter_s": result["started"] - launched,
+        "import_s": result["imported"] - result["started"],
+        "first_request_s": result["served"] - launched,
+        "status": result["status"],
+        "loaded": result["loaded"],
+    }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def profile_imports() -> List[Tuple[str, int, int]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def summarize_profiles(profiles: List[List[Tuple[str, int, int]]], top: int) -> Dict[str, Any]:
+    """Median self / cumulative ms per module and self ms per top-level package."""
+    self_ms, cumulative_ms = defaultdict(list), defaultdict(list)
+    packages = defaultdict(lambda: [0.0] * len(profiles))
+    for run, rows in enumerate(profiles):
+        for module, self_us, cumulative_us in rows:
+            self_ms[module].append(self_us / 1000)
+            cumulative_ms[module].append(cumulative_us / 1000)
+            packages[module.split(".")[0]][run] += self_us / 1000
+
+    def ranked(values, limit):
+        medians = {name: round(statistics.median(v), 2) for name, v in values.items()}
+        return sorted(medians.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    return {
+        "import_ms": round(statistics.median(cumulative_ms["app.main"]), 1) if "app.main" in cumulative_ms else None,
+        "modules": len(self_ms),
+        "top_cumulative": ranked(cumulative_ms, top),
+        "top_self": ranked(self_ms, top),
+        "packages": dict(ranked(packages, top)),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any], max_regression: float) -> bool:
+    """Print metric deltas against a previous run; return False on regression"""
+    ok = True
+    print(f"\nComparison with {previous.get('commit')} ({previous.get('created_at')})")
+    for metric in ("import_ms", "first_request_ms", "modules"):
+        old, new = previous.get("results", {}).get(metric), current["results"].get(metric)
+        if old is None or new is None:
+            continue
+        change = ((new - old) / old * 100) if old else 0.0
+        flag = ""
+        if metric != "modules" and change > max_regression:
+            flag, ok = "  REGRESSION", False
+        print(f"  {metric:<20} {old:>10} -> {new:>10} ({change:+.1f}%){flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=25, help="Modules / packages listed")
+    parser.add_argument("--target", type=float, default=COLD_START_TARGET_SECONDS,
+                        help="Maximum median seconds from launch to first response")
+    parser.add_argument("--output", default="", help="Result JSON path")
+    parser.add_argument("--compare", default="", help="Previous result JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed %% increase in import / first request time")
+    args = parser.parse_args()
+
+    summary = summarize_profiles([profile_imports() for _ in range(args.runs)], args.top)
+    requests = [measure_first_request() for _ in range(args.runs)]
+    loaded = sorted({name for r in requests for name, is_loaded in r["loaded"].items() if is_loaded})
+
+    results = {
+        **summary,
+        "interpreter_ms": round(statistics.median(r["interpreter_s"] for r in requests) * 1000, 1),
+        "app_import_ms": round(statistics.median(r["import_s"] for r in requests) * 1000, 1),
+        "first_request_ms": round(statistics.median(r["first_request_s"] for r in requests) * 1000, 1),
+        "first_request_status": [r["status"] for r in requests],
+        "deferred_loaded_at_import": loaded,
+    }
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {"runs": args.runs, "target_s": args.target},
+        "results": results,
+    }
+
+    print(f"import app.main (-X importtime)  {results['import_ms']:>9.1f} ms  ({results['modules']} modules)")
+    print(f"interpreter start                 {results['interpreter_ms']:>9.1f} ms")
+    print(f"app import (wall)                 {results['app_import_ms']:>9.1f} ms")
+    print(f"launch -> first response          {results['first_request_ms']:>9.1f} ms  (target {args.target * 1000:.0f} ms)")
+    print(f"deferred modules loaded at import {', '.join(loaded) or 'none'}")
+    print("\nSlowest imports (cumulative ms)")
+    for module, ms in results["top_cumulative"]:
+        print(f"  {ms:>9.1f}  {module}")
+    print("\nSlowest imports (self ms)")
+    for module, ms in results["top_self"]:
+        print(f"  {ms:>9.1f}  {module}")
+    print("\nSelf time by top-level package (ms)")
+    for package, ms in results["packages"].items():
+        print(f"  {ms:>9.1f}  {package}")
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"startup-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nResults written to {output}")
+
+    ok = results["first_request_ms"] <= args.target * 1000 and not loaded
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        ok = compare(previous, report, args.max_regression) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Embed Prompt Cache Entries
+
+Fills in the Gemini embeddings of servable prompt_cache rows that have none
+(e.g. rows imported by pregeneration, or cached while Gemini was down), so
+they can be matched by similarity. Prompts are embedded in bulk with
+batchEmbedContents: 100 texts per request.
+
+Usage:
+    python -m scripts.embed_prompt_cache [--batch-size 500] [--max-batches 0]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import AsyncSessionLocal
+from app.services.similarity import get_similarity_service
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Embed prompt cache entries missing an embedding")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows loaded and embedded per pass")
+    parser.add_argument("--max-batches", type=int, default=0, help="Stop after this many passes (0 = until done)")
+    args = parser.parse_args()
+
+    service = get_similarity_service()
+    total = 0
+    batches = 0
+    async with AsyncSessionLocal() as session:
+        while True:
+            embedded = await service.embed_missing(session, batch_size=args.batch_size)
+            total += embedded
+            batches += 1
+            logger.info(f"Pass {batches}: embedded {embedded} prompts ({total} total)")
+            # A short pass means the rest are done or failed (retried next run)
+            if embedded < args.batch_size or batches == args.max_batches:
+                break
+
+    logger.info(f"Embedded {total} prompt cache entries")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Shared Test Doubles
+
+In-memory stand-ins used across the unit tests: a row factory, an
+AsyncSession serving fixed rows, a Redis whose every command fails, a
+preset catalog with no snapshot, and a fixture for swapping module-level
+singletons (get_x() services).
+"""
+import copy
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+
+def row_factory(**defaults):
+    """
+    make_x(**fields) for SimpleNamespace rows: each row gets a fresh uuid
+    id and its own copy of the defaults, overridden by `fields`.
+    """
+    def make(**fields):
+        values = {"id": uuid.uuid4(), **copy.deepcopy(defaults)}
+        values.update(fields)
+        return SimpleNamespace(**values)
+    return make
+
+
+class FakeResult:
+    """Result stand-in over a list of rows"""
+
+    def __init__(self, rows):
+        self._rows = list(rows)
+
+    def all(self):
+        return list(self._rows)
+
+    def scalars(self):
+        return self
+
+    def scalar(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeSession:
+    """
+    AsyncSession stand-in serving a fixed set of rows.
+
+    Every execute() returns all rows (tests edit `rows`, keyed by id, to
+    simulate writes from other processes). Queries, get() calls and commits
+    are counted; set `fail` to make execute() raise.
+    """
+
+    def __init__(self, rows=()):
+        self.rows = {getattr(row, "id", index): row for index, row in enumerate(rows)}
+        self.executed = []
+        self.gets = 0
+        self.commits = 0
+        self.fail = False
+
+    @property
+    def queries(self) -> int:
+        return len(self.executed)
+
+    async def execute(self, query, params=None):
+        self.executed.append(query)
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        return FakeResult(self.rows.values())
+
+    async def get(self, model, key):
+        self.gets += 1
+        return self.rows.get(key)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class UnavailableRedis:
+    """Redis stand-in whose every command fails (simulates Redis being down)"""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise ConnectionError("redis unavailable")
+        return fail
+
+    def pipeline(self, transaction=True):
+        raise ConnectionError("redis unavailable")
+
+
+class StubCatalog:
+    """Preset catalog with no snapshot: callers fall back to the database"""
+
+    snapshot = None
+
+    async def get(self, db):
+        return None
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def install_singleton(monkeypatch):
+    """install(module, "_name", value): use `value` as the module's singleton for one test"""
+    def install(module, name, value):
+        monkeypatch.setattr(module, name, value)
+        return value
+    return install
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, patch
 from httpx import AsyncClient, ASGITransport
 from app.main import app
 from app.api.deps import get_db
+from tests.conftest import StubCatalog
 
 # Mark all tests as async
 pytestmark = pytest.mark.asyncio
@@ -41,7 +42,8 @@ async def test_health_check(mock_startup):
 async def test_get_presets_background_removal():
     """Verify getting presets returns structure"""
     # Mock MaterialLookupService inside the endpoint
-    with patch("app.services.material_lookup.get_material_lookup_service") as mock_service_factory:
+    with patch("app.services.material_lookup.get_material_lookup_service") as mock_service_factory, \
+            patch("app.services.preset_catalog.get_preset_catalog", return_value=StubCatalog()):
         mock_service = AsyncMock()
         mock_service.get_presets_for_tool.return_value = [] # Return empty list for safety
         mock_service_factory.return_value = mock_service
@@ -56,7 +58,8 @@ async def test_get_presets_background_removal():
 
 async def test_get_presets_includes_input_params():
     """Verify presets response includes parameters for frontend matching"""
-    with patch("app.services.material_lookup.get_material_lookup_service") as mock_service_factory:
+    with patch("app.services.material_lookup.get_material_lookup_service") as mock_service_factory, \
+            patch("app.services.preset_catalog.get_preset_catalog", return_value=StubCatalog()):
         mock_service = AsyncMock()
         
         # Mock a material-like object
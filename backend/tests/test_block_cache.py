@@ -0,0 +1,369 @@
+"""
+Unit Tests for Prompt Block Cache and Keyword Matcher
+"""
+import pytest
+from app.services import keyword_matcher
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.block_cache import PromptBlockCache, BlockReason
+from tests.conftest import UnavailableRedis
+from tests.moderation_corpus import build_corpus
+
+
+class InMemoryRedis:
+    """Minimal async Redis stand-in that records issued commands"""
+
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+        self.commands = []
+
+    async def get(self, key):
+        self.commands.append("GET")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self.commands.append("SET")
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        self.commands.append("DEL")
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    async def mget(self, keys):
+        self.commands.append("MGET")
+        return [self.data.get(key) for key in keys]
+
+    async def publish(self, channel, message):
+        self.commands.append("PUBLISH")
+        return 0
+
+    async def incr(self, key):
+        self.commands.append("INCR")
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+
+    async def hincrby(self, key, field, amount=1):
+        self.commands.append("HINCRBY")
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    """Queues commands and runs them against InMemoryRedis in one round trip"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis.commands.append("PIPELINE")
+        commands, self.redis.commands = self.redis.commands, []
+        results = [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.queued]
+        self.redis.commands = commands
+        self.queued = []
+        return results
+
+
+class TestKeywordMatcher:
+    """Tests for the Aho-Corasick keyword matcher"""
+
+    def test_matches_overlapping_keywords(self):
+        """Test that overlapping keywords are all reported"""
+        matcher = KeywordMatcher(["he", "she", "his", "hers"], word_boundaries=False)
+        found = {m.keyword for m in matcher.find_all("ushers")}
+        assert found == {"he", "she", "hers"}
+
+    def test_latin_keywords_respect_word_boundaries(self):
+        """Test that 'kill' does not match inside 'skill'"""
+        matcher = KeywordMatcher(["kill"])
+        assert matcher.find_all("a skill tree") == []
+        assert [m.keyword for m in matcher.find_all("kill it")] == ["kill"]
+
+    def test_multi_word_phrases(self):
+        """Test that multi-word phrases match after whitespace normalization"""
+        matcher = KeywordMatcher(["How to  Make Bomb"])
+        match = matcher.search("tell me how to make bomb now")
+        assert match is not None
+        assert match.keyword == "how to make bomb"
+
+    def test_cjk_substrings(self):
+        """Test that CJK keywords match inside unsegmented text"""
+        matcher = KeywordMatcher({"裸體": "adult", "누드": "adult", "ヌード": "adult"})
+        assert matcher.find_keywords("一張裸體照片") == {"裸體": "adult"}
+        assert matcher.find_keywords("누드를 그려줘") == {"누드": "adult"}
+        assert matcher.find_keywords("ヌード写真") == {"ヌード": "adult"}
+
+    def test_allowed_words_suppress_inner_keywords(self):
+        """Test that keywords inside allowed words do not match"""
+        matcher = KeywordMatcher(
+            ["ロリ", "グロ", "性的", "裸"],
+            allowed=["カロリー", "グローバル", "女性的", "赤裸裸"],
+        )
+        assert matcher.find_all("カロリー控えめ") == []
+        assert matcher.find_all("グローバル") == []
+        assert matcher.find_all("女性的な肖像") == []
+        assert matcher.find_all("赤裸裸") == []
+        assert matcher.find_keywords("カロリーとロリ") == {"ロリ": None}
+        assert matcher.find_keywords("女性的な裸の絵") == {"裸": None}
+
+    def test_payload_override(self):
+        """Test that later duplicates override earlier payloads"""
+        matcher = KeywordMatcher({"nazi": "violence", "NAZI": "hate"})
+        assert len(matcher) == 1
+        assert matcher.find_keywords("nazi flag") == {"nazi": "hate"}
+
+    def test_pure_python_fallback_matches_native(self, monkeypatch):
+        """Test that the pure-Python automaton gives the same results as pyahocorasick"""
+        keywords = {"kill": 1, "he": 2, "she": 3, "hers": 4, "血腥": 5, "how to make bomb": 6}
+        text = "she said: kill ushers, how to make bomb, 血腥的 skill"
+        native = KeywordMatcher(keywords).find_all(text)
+
+        monkeypatch.setattr(keyword_matcher, "ahocorasick", None)
+        fallback = KeywordMatcher(keywords).find_all(text)
+
+        assert fallback == native
+        assert [m.keyword for m in fallback] == ["she", "kill", "how to make bomb", "血腥"]
+
+
+class TestBlockCacheMatcher:
+    """Tests for the in-process blocked-word matcher in PromptBlockCache"""
+
+    def setup_method(self):
+        self.cache = PromptBlockCache(redis_url="redis://localhost:1/0", gemini_api_key="")
+        self.cache._redis = UnavailableRedis()
+
+    @pytest.mark.asyncio
+    async def test_seed_words_match_without_redis(self):
+        """Test that seed words are matched even when Redis is down"""
+        matches = await self.cache._match_blocked_words("a nude figure")
+        assert matches == {"nude": BlockReason.ADULT.value}
+
+    @pytest.mark.asyncio
+    async def test_cjk_seed_words_match(self):
+        """Test that CJK seed words are caught inside longer text"""
+        matches = await self.cache._match_blocked_words("請畫一個血腥的場景")
+        assert matches.get("血腥") == BlockReason.VIOLENCE.value
+
+    @pytest.mark.asyncio
+    async def test_cjk_seed_words_in_sentences(self):
+        """Test that CJK seed words are caught without separators around them"""
+        assert "裸體" in await self.cache._match_blocked_words("一張裸體照片")
+        assert "누드" in await self.cache._match_blocked_words("누드를 그려줘")
+        assert "ロリ" in await self.cache._match_blocked_words("ロリキャラの絵")
+
+    @pytest.mark.asyncio
+    async def test_seed_allowed_words_not_blocked(self):
+        """Test that ordinary words containing seed words are not blocked"""
+        for prompt in ("カロリー控えめ", "グローバル", "女性的な肖像", "赤裸裸的真相"):
+            assert await self.cache._match_blocked_words(prompt) == {}, prompt
+
+    @pytest.mark.asyncio
+    async def test_safe_prompt_has_no_matches(self):
+        """Test that ordinary prompts do not trigger the matcher"""
+        matches = await self.cache._match_blocked_words("a skilled chef cooking dinner")
+        assert matches == {}
+
+    @pytest.mark.asyncio
+    async def test_check_prompt_blocks_from_matcher(self):
+        """Test that check_prompt blocks using the local matcher"""
+        result = await self.cache.check_prompt("Graphic MURDER scene")
+        assert result.is_blocked
+        assert "murder" in result.blocked_words
+        assert result.source == "cache"
+
+    @pytest.mark.asyncio
+    async def test_benchmark_corpus_keyword_labels(self):
+        """Test the matcher against the multilingual benchmark corpus labels"""
+        for entry in build_corpus(per_language=12):
+            if entry["kind"] == "gemini":
+                continue
+            matches = await self.cache._match_blocked_words(self.cache._normalize_prompt(entry["prompt"]))
+            assert bool(matches) == entry["unsafe"], (entry["language"], entry["prompt"], matches)
+
+
+class TestBatchedWordLookup:
+    """Tests for the batched (non-matcher) block cache lookup path"""
+
+    def setup_method(self):
+        self.redis = InMemoryRedis()
+        self.cache = PromptBlockCache(redis_url="redis://localhost:1/0", gemini_api_key="")
+        self.cache._redis = self.redis
+
+    @pytest.mark.asyncio
+    async def test_lookup_uses_single_mget_and_pipeline(self):
+        """Test that all n-grams resolve in one MGET and hits in one pipeline"""
+        await self.cache._cache_blocked_word("child abuse", BlockReason.ILLEGAL.value, "seed")
+        await self.cache._cache_blocked_word("gore", BlockReason.VIOLENCE.value, "seed")
+        self.redis.commands.clear()
+
+        words = self.cache._extract_words("a child abuse scene with gore")
+        found = await self.cache._check_words_in_cache(words)
+
+        assert {entry["word"] for entry in found.values()} == {"child abuse", "gore"}
+        assert self.redis.commands == ["MGET"]
+
+        await self.cache._counters.flush()
+        assert self.redis.commands == ["MGET", "PIPELINE"]
+        assert self.redis.hashes[PromptBlockCache.WORD_HITS_KEY] == {"child abuse": 1, "gore": 1}
+        assert self.redis.hashes["block:stats"]["cache_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_lookup_does_not_rewrite_word_entries(self):
+        """Test that hit counting leaves the cached JSON untouched"""
+        await self.cache._cache_blocked_word("gore", BlockReason.VIOLENCE.value, "seed")
+        key = f"block:word:{self.cache._hash_text('gore')}"
+        before = self.redis.data[key]
+
+        await self.cache._check_words_in_cache(["gore"])
+
+        assert self.redis.data[key] == before
+        assert "SET" not in self.redis.commands[-2:]
+
+
+class TestStatsAggregation:
+    """Tests for in-process aggregation of block:stats counters"""
+
+    def setup_method(self):
+        self.redis = InMemoryRedis()
+        self.cache = PromptBlockCache(redis_url="redis://localhost:1/0", gemini_api_key="")
+        self.cache._redis = self.redis
+
+    @pytest.mark.asyncio
+    async def test_counters_flush_in_one_pipeline(self):
+        """Test that many stat events reach Redis as one pipelined batch"""
+        for word in ("gore", "blood", "murder"):
+            await self.cache._cache_blocked_word(word, BlockReason.VIOLENCE.value, "manual")
+        assert "HINCRBY" not in self.redis.commands
+
+        await self.cache._counters.flush()
+
+        assert self.redis.commands.count("PIPELINE") == 1
+        assert self.redis.hashes["block:stats"] == {"total_blocked_words": 3, "blocked_by_manual": 3}
+        assert self.cache._counters.pending("block:stats") == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_deltas(self):
+        """Test that deltas survive a failed flush and are retried"""
+        self.cache._counters.incr("block:stats", "cache_hits", 2)
+        self.cache._redis = UnavailableRedis()
+        await self.cache._counters.flush()
+        assert self.cache._counters.pending("block:stats") == {"cache_hits": 2}
+
+        self.cache._redis = self.redis
+        await self.cache._counters.flush()
+        assert self.redis.hashes["block:stats"] == {"cache_hits": 2}
+
+
+class TestSeedLoading:
+    """Tests for versioned bulk seeding of seed words"""
+
+    def setup_method(self):
+        self.redis = InMemoryRedis()
+
+    def _cache(self):
+        cache = PromptBlockCache(redis_url="redis://localhost:1/0", gemini_api_key="")
+        cache._redis = self.redis
+        return cache
+
+    @pytest.mark.asyncio
+    async def test_seeds_loaded_in_one_pipeline(self):
+        """Test that all seed words are written in a single pipeline"""
+        cache = self._cache()
+        await cache.initialize()
+
+        seed_words = cache._seed_word_reasons()
+        assert self.redis.commands == ["GET", "SET", "PIPELINE"]
+        assert self.redis.data[PromptBlockCache.SEED_VERSION_KEY] == cache._seed_version(seed_words)
+        assert PromptBlockCache.SEED_LOCK_KEY not in self.redis.data
+        assert f"block:word:{cache._hash_text('nude')}" in self.redis.data
+        assert self.redis.hashes["block:stats"]["blocked_by_seed"] == len(seed_words)
+
+    @pytest.mark.asyncio
+    async def test_other_workers_skip_loaded_seeds(self):
+        """Test that a second process skips seeding and does not inflate stats"""
+        await self._cache().initialize()
+        stats = dict(self.redis.hashes["block:stats"])
+        self.redis.commands.clear()
+
+        await self._cache().initialize()
+
+        assert self.redis.commands == ["GET"]
+        assert self.redis.hashes["block:stats"] == stats
+
+    @pytest.mark.asyncio
+    async def test_locked_seeding_is_not_retried_per_call(self):
+        """Test that a worker waiting on another's seed lock backs off until the lock expires"""
+        self.redis.data[PromptBlockCache.SEED_LOCK_KEY] = "other"
+        cache = self._cache()
+
+        await cache.initialize()
+        await cache.initialize()
+        assert self.redis.commands == ["GET", "SET"]
+        assert not cache._initialized
+
+        del self.redis.data[PromptBlockCache.SEED_LOCK_KEY]
+        cache._seed_retry_at = 0.0
+        await cache.initialize()
+        assert cache._initialized
+
+
+class TestVerdictCacheTiers:
+    """Tests for the local LRU tier in front of Redis prompt verdicts"""
+
+    def setup_method(self):
+        self.redis = InMemoryRedis()
+        self.cache = PromptBlockCache(redis_url="redis://localhost:1/0", gemini_api_key="")
+        self.cache._redis = self.redis
+
+    @pytest.mark.asyncio
+    async def test_local_tier_avoids_redis(self):
+        """Test that a warm verdict is served without any Redis command"""
+        await self.cache._cache_prompt_result("a cat", False)
+        self.redis.commands.clear()
+
+        cached = await self.cache._check_prompt_in_cache("a cat")
+
+        assert cached["is_blocked"] is False
+        assert self.redis.commands == []
+        assert self.cache._verdict_cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_fills_local_tier(self):
+        """Test that a Redis hit is promoted into the local LRU"""
+        await self.cache._cache_prompt_result("gore scene", True, "violence", ["gore"])
+        self.cache._verdict_cache.clear()
+
+        assert (await self.cache._check_prompt_in_cache("gore scene"))["is_blocked"]
+        assert (await self.cache._check_prompt_in_cache("gore scene"))["is_blocked"]
+        assert self.redis.commands.count("MGET") == 1
+        assert self.cache._redis_verdict_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_word_changes_invalidate_local_tier(self):
+        """Test that adding a blocked word drops local verdicts and notifies other workers"""
+        await self.cache._cache_prompt_result("a dragon", False)
+        await self.cache.add_blocked_word("dragon", BlockReason.CUSTOM.value)
+
+        assert len(self.cache._verdict_cache) == 0
+        assert "PUBLISH" in self.redis.commands
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
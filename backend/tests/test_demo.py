@@ -1,8 +1,14 @@
 """
 Unit Tests for Demo Matching Service
 """
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
 import pytest
-from app.services.demo import DemoMatchingService, get_demo_service
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.services.demo import DemoMatchingService, _tsquery_any, get_demo_service
 
 
 class TestKeywordExtraction:
@@ -255,6 +261,97 @@ class TestMatchScoring:
         assert score <= 1.0
 
 
+def make_video(prompt, keywords, style=None, popularity=0, quality=0.5, featured=False):
+    return SimpleNamespace(
+        id=uuid.uuid4(), title=prompt, description=None, prompt=prompt, keywords=keywords,
+        resolution="720p", style=style, video_url_watermarked=None, thumbnail_url=None,
+        duration_seconds=5.0, is_featured=featured, popularity_score=popularity,
+        quality_score=quality, created_at=datetime(2025, 1, 1)
+    )
+
+
+class CandidateResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class CandidateSession:
+    """AsyncSession stand-in answering each candidate query in turn"""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.statements = []
+
+    async def execute(self, query):
+        self.statements.append(str(query.compile(dialect=asyncpg.dialect())))
+        return CandidateResult(self.batches.pop(0) if self.batches else [])
+
+
+class TestSearchDemos:
+    """Tests for SQL candidate generation and Python re-ranking"""
+
+    def setup_method(self):
+        self.service = DemoMatchingService()
+
+    def compile(self, query):
+        return str(query.compile(dialect=asyncpg.dialect()))
+
+    def test_text_query_uses_indexed_expressions(self):
+        """The text candidates filter on the GIN-indexed keyword array and tsvector"""
+        text_query, popular_query = self.service._candidate_queries(["cat", "ball"], "animals", None, None)
+        sql = self.compile(text_query)
+
+        assert "demo_videos.keywords && " in sql
+        assert "to_tsvector('simple', coalesce(demo_videos.title, '') || ' ' || demo_videos.prompt) @@ " in sql
+        assert "LIMIT" in sql
+        assert "to_tsquery('simple'::regconfig, " in sql
+        assert "ts_rank(" in sql
+        assert "unnest" not in sql
+
+        popular_sql = self.compile(popular_query)
+        assert "demo_videos.popularity_score > " in popular_sql
+        assert "ORDER BY demo_videos.popularity_score DESC" in popular_sql
+
+    def test_tsquery_terms_are_quoted_lexemes(self):
+        """Query words become quoted to_tsquery lexemes joined by |, so operators in them are inert"""
+        assert _tsquery_any(["cat", "ball"]) == "'cat' | 'ball'"
+        assert _tsquery_any(["it's", "a&b", "c\\"]) == "'it''s' | 'a&b' | 'c\\\\'"
+
+    def test_style_filter_keeps_all_style_rows_eligible(self):
+        """With a style, the popular candidates are not limited by popularity"""
+        queries = self.service._candidate_queries([], None, None, "anime")
+
+        assert len(queries) == 1
+        sql = self.compile(queries[0])
+        assert "demo_videos.style = " in sql
+        assert "popularity_score > " not in sql
+
+    @pytest.mark.asyncio
+    async def test_reranks_candidates(self):
+        """Candidates from both queries are merged, re-scored and cut to the limit"""
+        cat = make_video("A cat playing with a ball", ["cat", "ball"])
+        cat_popular = make_video("A sleepy cat", ["cat"], popularity=600, quality=0.9)
+        dog = make_video("A dog running", ["dog"])
+        evergreen = make_video("City lights", ["city"], popularity=700, quality=0.9, featured=True)
+        db = CandidateSession([cat, cat_popular, dog], [cat_popular, evergreen])
+
+        results = await self.service.search_demos(db, "cat with a ball", limit=3)
+
+        assert len(db.statements) == 2
+        ids = [result.demo.id for result in results]
+        assert ids[0] == cat.id
+        assert set(ids) == {cat.id, cat_popular.id, evergreen.id}
+        assert dog.id not in ids
+        scores = [result.match_score for result in results]
+        assert scores == sorted(scores, reverse=True)
+
+
 class TestDemoServiceSingleton:
     """Tests for demo service singleton"""
 
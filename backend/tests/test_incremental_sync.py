@@ -0,0 +1,102 @@
+"""
+Unit Tests for the Shared Incremental Index Sync
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.models.demo import ImageDemo
+from app.services.incremental_sync import IncrementalSync
+from tests.conftest import FakeSession
+
+
+def make_row(row_id, created_at, updated_at=None):
+    return SimpleNamespace(id=row_id, created_at=created_at, updated_at=updated_at)
+
+
+class TestIncrementalSync:
+    """Tests for IncrementalSync"""
+
+    def setup_method(self):
+        self.applied = []
+        self.clears = 0
+
+        def clear():
+            self.clears += 1
+
+        self.sync = IncrementalSync(
+            "test index",
+            ImageDemo,
+            select(ImageDemo.id),
+            ImageDemo.is_active == True,
+            apply=lambda row: self.applied.append(row.id),
+            clear=clear,
+        )
+
+    @pytest.mark.asyncio
+    async def test_full_then_incremental(self):
+        """The first sync rebuilds; later ones read from the watermark minus the overlap"""
+        db = FakeSession([make_row(1, datetime(2025, 1, 1)), make_row(2, datetime(2025, 1, 2))])
+
+        assert await self.sync.sync(db) is True
+        assert (self.applied, self.clears) == ([1, 2], 1)
+        assert self.sync.watermark == datetime(2025, 1, 2)
+        assert "is_active" in str(db.executed[0])
+
+        db.rows = {1: make_row(1, datetime(2025, 1, 1), updated_at=datetime(2025, 1, 3))}
+        self.sync.interval = 0
+        assert await self.sync.sync(db) is False
+
+        assert self.applied == [1, 2, 1]
+        assert self.clears == 1
+        assert self.sync.watermark == datetime(2025, 1, 3)
+        assert "updated_at >=" in str(db.executed[1])
+
+    @pytest.mark.asyncio
+    async def test_not_due_skips_query(self):
+        """Syncs within the interval do not query"""
+        db = FakeSession([])
+        await self.sync.sync(db)
+        await self.sync.sync(db)
+
+        assert db.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_query_error_keeps_index(self):
+        """A failed query keeps the current entries and the sync is retried later"""
+        db = FakeSession([make_row(1, datetime(2025, 1, 1))])
+        await self.sync.sync(db)
+
+        db.fail = True
+        self.sync.interval = 0
+        assert await self.sync.sync(db) is False
+
+        assert self.applied == [1]
+        assert self.sync.watermark == datetime(2025, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_failed_rebuild_backs_off(self):
+        """A failed first load is retried after the interval, not on every call"""
+        db = FakeSession([make_row(1, datetime(2025, 1, 1))])
+        db.fail = True
+        assert await self.sync.sync(db) is False
+        assert await self.sync.sync(db) is False
+        assert db.queries == 1
+        assert self.sync.built_at is None
+
+        db.fail = False
+        self.sync.interval = 0
+        assert await self.sync.sync(db) is True
+        assert self.applied == [1]
+
+    @pytest.mark.asyncio
+    async def test_rebuild_after_max_age(self):
+        """An index older than max_age is cleared and reloaded"""
+        db = FakeSession([make_row(1, datetime(2025, 1, 1))])
+        await self.sync.sync(db)
+
+        self.sync.max_age = -1
+        assert await self.sync.sync(db) is True
+        assert self.clears == 2
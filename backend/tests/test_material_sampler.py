@@ -0,0 +1,265 @@
+"""
+Unit Tests for Random Material Sampling
+"""
+import random
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from app.models.material import MaterialStatus, ToolType
+from app.services import material_sampler
+from app.services.demo_search_index import DemoSearchIndex
+from app.services.gallery_index import gallery_categories
+from app.services.material_lookup import MaterialLookupService
+from app.services.material_sampler import MaterialSampler
+from tests.conftest import FakeResult, FakeSession, row_factory
+
+
+make_material = row_factory(
+    tool_type=ToolType.BACKGROUND_REMOVAL,
+    topic="product",
+    language="en",
+    status=MaterialStatus.APPROVED,
+    tags=[],
+    is_active=True,
+    result_watermarked_url="https://example.com/wm.png",
+    result_video_url=None,
+    result_image_url=None,
+    input_image_url=None,
+    result_thumbnail_url=None,
+    title_en=None,
+    title_zh=None,
+    title_ja=None,
+    prompt="a prompt",
+    prompt_enhanced=None,
+    created_at=datetime(2025, 1, 1),
+    updated_at=None,
+)
+
+
+class MaterialSession(FakeSession):
+    """
+    FakeSession where primary-key loads get the requested ids that are
+    still active (sync queries get every row)
+    """
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.loads = []
+
+    async def execute(self, query, params=None):
+        ids = next(
+            (value for value in query.compile().params.values()
+             if isinstance(value, list) and value and isinstance(value[0], uuid.UUID)),
+            None
+        )
+        if not ids:
+            return await super().execute(query)
+        self.loads.append(ids)
+        return FakeResult(
+            self.rows[key] for key in ids if key in self.rows and self.rows[key].is_active
+        )
+
+
+@pytest.fixture
+def sampler(install_singleton):
+    return install_singleton(material_sampler, "_material_sampler", MaterialSampler(rng=random.Random(5)))
+
+
+class TestMaterialSampler:
+    """Tests for the in-process id sets"""
+
+    def test_scope_and_filters(self, sampler):
+        """Samples stay inside the tool / topic scope and the record filter"""
+        product = make_material(topic="product")
+        food = make_material(topic="food")
+        pending = make_material(topic="product", status=MaterialStatus.PENDING)
+        video = make_material(tool_type=ToolType.SHORT_VIDEO, topic="product")
+        for material in (product, food, pending, video):
+            sampler.add(material)
+
+        ids = sampler.sample(
+            5, tool_type=ToolType.BACKGROUND_REMOVAL, topics=["product"],
+            where=lambda record: record.is_preset,
+        )
+
+        assert ids == [product.id]
+        assert set(sampler.sample(5, tool_type=ToolType.BACKGROUND_REMOVAL)) == {product.id, food.id, pending.id}
+
+    def test_exclude_ids(self, sampler):
+        """Excluded ids (as strings or UUIDs) are never drawn"""
+        materials = [make_material() for _ in range(20)]
+        for material in materials:
+            sampler.add(material)
+        excluded = [str(material.id) for material in materials[:19]]
+
+        for _ in range(10):
+            assert sampler.sample(1, exclude_ids=excluded) == [materials[19].id]
+        assert sampler.sample(1, exclude_ids=[m.id for m in materials]) == []
+
+    def test_uniform_across_partitions(self, sampler):
+        """Every eligible id is about equally likely, whatever its topic"""
+        materials = [make_material(topic="big") for _ in range(9)] + [make_material(topic="small")]
+        for material in materials:
+            sampler.add(material)
+
+        counts = Counter(sampler.sample(1)[0] for _ in range(5000))
+
+        assert set(counts) == {material.id for material in materials}
+        assert all(350 < count < 650 for count in counts.values())
+
+    def test_distinct_sample(self, sampler):
+        """Multi-id samples have no duplicates and stop at the eligible count"""
+        materials = [make_material() for _ in range(5)]
+        for material in materials:
+            sampler.add(material)
+
+        ids = sampler.sample(10)
+
+        assert sorted(ids) == sorted(material.id for material in materials)
+
+    def test_review_updates_sets(self, sampler):
+        """Re-adding applies status changes; deactivated materials leave"""
+        material = make_material()
+        sampler.add(material)
+
+        material.status = MaterialStatus.REJECTED
+        sampler.add(material)
+        assert sampler.sample(1, where=lambda record: record.is_preset) == []
+
+        material.is_active = False
+        sampler.add(material)
+        assert material.id not in sampler
+        assert len(sampler) == 0
+
+
+class TestGetRandomPreset:
+    """Tests for sampler-backed random presets"""
+
+    @pytest.mark.asyncio
+    async def test_loads_only_sampled_row(self, sampler):
+        """One primary-key load per pick, honouring topic and exclusions"""
+        first = make_material(topic="product")
+        second = make_material(topic="product")
+        other = make_material(topic="food")
+        db = MaterialSession([first, second, other])
+        service = MaterialLookupService(db)
+
+        preset = await service.get_random_preset("background_removal", topic="product", exclude_ids=[str(first.id)])
+
+        assert preset is second
+        assert db.loads == [[second.id]]
+
+    @pytest.mark.asyncio
+    async def test_stale_pick_redrawn(self, sampler):
+        """A material deactivated since the sync is dropped and another drawn"""
+        stale = make_material()
+        fresh = make_material()
+        db = MaterialSession([stale, fresh])
+        await sampler.sync(db)
+        stale.is_active = False
+
+        for _ in range(5):
+            assert await MaterialLookupService(db).get_random_preset("background_removal") is fresh
+        assert stale.id not in sampler
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_or_empty(self, sampler):
+        """Unknown tools and empty scopes return None"""
+        db = MaterialSession([make_material()])
+        service = MaterialLookupService(db)
+
+        assert await service.get_random_preset("unknown") is None
+        assert await service.get_random_preset("try_on") is None
+
+
+class TestGalleryIndex:
+    """Tests for precomputed gallery category membership"""
+
+    def test_membership_matches_keyword_filter(self):
+        """Topic substrings (any case) and exact tags select categories"""
+        assert gallery_categories("Product_Shots", []) >= {"recommended", "ecommerceDesign", "productDesign"}
+        assert gallery_categories("misc", ["mascot"]) == {"character"}
+        assert gallery_categories("misc", ["Mascot"]) == frozenset()
+
+    @pytest.mark.asyncio
+    async def test_sample_gallery_without_loads(self, sampler):
+        """Members are served from the index, with localized titles"""
+        cat = make_material(
+            topic="pets", result_image_url="https://example.com/cat.png",
+            title_en="Cat", title_zh="貓", prompt="a cat",
+        )
+        no_image = make_material(topic="pets")
+        db = MaterialSession([cat, no_image])
+
+        items = await sampler.sample_gallery(db, "animals", 8)
+
+        assert [item.id for item in items] == [cat.id]
+        assert items[0].title("zh-TW") == "貓"
+        assert items[0].title("ja") == "Cat"
+        assert items[0].thumb == "https://example.com/cat.png"
+        assert db.loads == []
+
+    @pytest.mark.asyncio
+    async def test_inspirations_titles_match_across_categories(self, sampler):
+        """Gallery and ad-hoc categories resolve titles the same way (ja included)"""
+        from app.api.v1.demo import get_inspirations
+
+        castle = make_material(
+            topic="castle", tags=["magical"], title_en="Castle", title_zh="城堡", title_ja="城",
+            input_image_url="https://example.com/castle.png",
+        )
+        db = MaterialSession([castle])
+
+        for category in ("fantasy", "castle"):
+            for language, title in (("ja", "城"), ("zh-TW", "城堡"), ("es", "Castle")):
+                response = await get_inspirations(category=category, language=language, limit=8, db=db)
+                assert [item["title"] for item in response["items"]] == [title], (category, language)
+
+    def test_membership_follows_changes(self, sampler):
+        """Topic changes move a material; deactivation removes it"""
+        material = make_material(topic="pets", input_image_url="https://example.com/in.png")
+        sampler.add(material)
+        assert sampler.gallery.count("animals") == 1
+
+        material.topic = "castle"
+        material.tags = ["magical"]
+        sampler.add(material)
+        assert sampler.gallery.count("animals") == 0
+        assert sampler.gallery.count("fantasy") == 1
+
+        material.is_active = False
+        sampler.add(material)
+        assert material.id not in sampler.gallery
+        assert sampler.gallery.count("fantasy") == 0
+
+
+class TestDemoIndexSample:
+    """Tests for random picks from the demo search index"""
+
+    def test_facet_filters(self):
+        """Picks respect category and style, even for rare facets"""
+        index = DemoSearchIndex()
+        for i in range(200):
+            index.add(i, ["cat"], "animals", "anime")
+        index.add("rare", ["robot"], "sci-fi", "pixar")
+        rng = random.Random(1)
+
+        assert index.sample(category="sci-fi", rng=rng).id == "rare"
+        assert index.sample(category="animals", style="pixar", rng=rng) is None
+        assert index.sample(style="anime", rng=rng).id != "rare"
+
+    def test_remove_keeps_positions(self):
+        """Swap-removal keeps every remaining demo reachable"""
+        index = DemoSearchIndex()
+        for i in range(5):
+            index.add(i, [], None, None)
+        index.remove(1)
+        index.remove(4)
+        rng = random.Random(2)
+
+        assert {index.sample(rng=rng).id for _ in range(200)} == {0, 2, 3}
+        index.clear()
+        assert index.sample(rng=rng) is None
@@ -0,0 +1,153 @@
+"""
+Unit Tests for the Preset Catalog Snapshot
+"""
+import uuid
+
+import pytest
+
+from app.models.material import MaterialStatus, ToolType
+from app.services import preset_catalog
+from app.services.material_lookup import MaterialLookupService
+from app.services.preset_catalog import CATALOG_VERSION_KEY, CatalogSnapshot, PresetCatalog
+from tests.conftest import FakeSession, UnavailableRedis, row_factory
+
+
+_make_row = row_factory(
+    tool_type=ToolType.BACKGROUND_REMOVAL,
+    topic="product",
+    status=MaterialStatus.APPROVED,
+    prompt="a prompt",
+    prompt_zh=None,
+    input_image_url=None,
+    input_video_url=None,
+    input_params={},
+    tags=["studio"],
+    result_image_url=None,
+    result_video_url=None,
+    result_watermarked_url="https://example.com/wm.png",
+    result_thumbnail_url=None,
+    sort_order=0,
+    quality_score=0.8,
+)
+
+
+def make_row(**fields):
+    fields.setdefault("lookup_hash", uuid.uuid4().hex)
+    return _make_row(**fields)
+
+
+class VersionRedis:
+    """Async Redis stand-in for the catalog version key"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+
+
+@pytest.fixture
+def catalog(install_singleton):
+    catalog = PresetCatalog(redis_url="redis://localhost:1/0")
+    catalog._redis = VersionRedis()
+    catalog.refresh_interval = 0
+    return install_singleton(preset_catalog, "_preset_catalog", catalog)
+
+
+class TestCatalogSnapshot:
+    """Tests for the snapshot indexes"""
+
+    def test_indexes(self):
+        """By id (all active), by hash (with results), by tool (presets only)"""
+        preset = make_row()
+        pending = make_row(status=MaterialStatus.PENDING)
+        no_result = make_row(result_watermarked_url=None)
+        snapshot = CatalogSnapshot([preset, pending, no_result], version="3")
+
+        assert snapshot.get(str(preset.id)).id == preset.id
+        assert snapshot.get(no_result.id) is not None
+        assert snapshot.get("not-a-uuid") is None
+        assert set(snapshot.by_hash) == {preset.lookup_hash, pending.lookup_hash}
+        assert [r.id for r in snapshot.presets(ToolType.BACKGROUND_REMOVAL)] == [preset.id]
+        assert snapshot.presets(ToolType.TRY_ON) == []
+        assert snapshot.stats()["version"] == "3"
+        assert snapshot.nbytes > 0
+
+    def test_presorted_lists(self):
+        """Lists follow ORDER BY sort_order, quality_score DESC, per topic and per tool"""
+        low = make_row(sort_order=1, quality_score=0.9)
+        best = make_row(sort_order=0, quality_score=0.9)
+        second = make_row(sort_order=0, quality_score=0.5)
+        food = make_row(topic="food", sort_order=0, quality_score=0.7)
+        snapshot = CatalogSnapshot([low, best, second, food])
+
+        assert [r.id for r in snapshot.presets(ToolType.BACKGROUND_REMOVAL, "product")] == [best.id, second.id, low.id]
+        assert [r.id for r in snapshot.presets(ToolType.BACKGROUND_REMOVAL, limit=3)] == [best.id, food.id, second.id]
+
+    def test_records_read_only(self):
+        """Snapshot records and maps cannot be modified"""
+        snapshot = CatalogSnapshot([make_row()])
+        record = next(iter(snapshot.by_id.values()))
+
+        with pytest.raises(AttributeError):
+            record.topic = "other"
+        with pytest.raises(TypeError):
+            snapshot.by_id[uuid.uuid4()] = record
+
+
+class TestPresetCatalog:
+    """Tests for version-driven snapshot swaps"""
+
+    @pytest.mark.asyncio
+    async def test_lookups_without_queries(self, catalog):
+        """After the load, lookups by id, hash and tool do not touch the DB"""
+        row = make_row()
+        db = FakeSession([row])
+        service = MaterialLookupService(db)
+        await catalog.get(db)
+        loaded = db.queries
+
+        assert (await service.lookup_by_id(str(row.id))).id == row.id
+        assert (await service.lookup_by_hash(row.lookup_hash)).id == row.id
+        assert [p.id for p in await service.get_presets_for_tool("background_removal", "product")] == [row.id]
+        assert db.queries == loaded
+
+    @pytest.mark.asyncio
+    async def test_swap_on_version_change(self, catalog):
+        """A new version key loads a new snapshot; an unchanged one reuses it"""
+        db = FakeSession([make_row()])
+        first = await catalog.get(db)
+        assert await catalog.get(db) is first
+
+        added = make_row()
+        db.rows[added.id] = added
+        catalog._redis.data[CATALOG_VERSION_KEY] = "1"
+        second = await catalog.get(db)
+
+        assert second is not first
+        assert second.get(added.id) is not None
+        assert first.get(added.id) is None
+        assert db.queries == 2
+
+    @pytest.mark.asyncio
+    async def test_bump_reloads_without_redis(self, catalog):
+        """A local bump reloads this process even when Redis is down"""
+        db = FakeSession([make_row()])
+        first = await catalog.get(db)
+        catalog._redis = UnavailableRedis()
+
+        assert await catalog.get(db) is first
+        await catalog.bump_version()
+        assert await catalog.get(db) is not first
+
+    @pytest.mark.asyncio
+    async def test_failed_load_falls_back_to_db(self, catalog):
+        """Without any snapshot, lookups query the database directly"""
+        db = FakeSession()
+        db.fail = True
+
+        assert await catalog.get(db) is None
+        assert catalog.snapshot is None
@@ -0,0 +1,235 @@
+"""
+Unit Tests for Prompt Matching (normalization, detection and demo search)
+"""
+from datetime import datetime
+
+import pytest
+
+from app.services.demo_search_index import DemoSearchIndex
+from app.services.prompt_matching import PromptMatchingService
+from tests.conftest import FakeSession, row_factory
+
+
+@pytest.fixture
+def service():
+    return PromptMatchingService()
+
+
+_make_demo = row_factory(
+    is_active=True,
+    status="completed",
+    created_at=datetime(2025, 1, 1),
+    updated_at=None,
+)
+
+
+def make_demo(keywords, category=None, style=None, popularity=0, **fields):
+    return _make_demo(
+        keywords=keywords, category_slug=category, style_slug=style, popularity_score=popularity, **fields
+    )
+
+
+class TestNormalizePrompt:
+    """Tests for single-pass prompt normalization"""
+
+    def test_english_prompt(self, service):
+        """English keywords are matched and the prompt is kept as-is"""
+        analysis = service.normalize_prompt("Oil painting of a dragon castle at night")
+
+        assert analysis.language == "en"
+        assert analysis.normalized == "oil painting of a dragon castle at night"
+        assert set(analysis.keywords) == {"oil painting", "dragon", "castle", "night"}
+        assert analysis.category == "fantasy"
+        assert analysis.style == "oil_painting"
+        assert analysis.confidence == pytest.approx(5 / 8)
+
+    def test_multi_word_keyword_parts(self, service):
+        """A token of a multi-word keyword maps to the whole keyword"""
+        analysis = service.normalize_prompt("pink blossom tree")
+
+        assert analysis.keywords == ["cherry blossom"]
+        assert analysis.category == "nature"
+
+    def test_chinese_phrases_without_spaces(self, service):
+        """Every CJK phrase is found in one scan, in prompt order"""
+        analysis = service.normalize_prompt("夕陽下的海洋")
+
+        assert analysis.language == "zh-TW"
+        assert analysis.normalized == "sunset ocean"
+        assert analysis.category == "nature"
+
+    def test_longest_phrase_wins(self, service):
+        """Overlapping translations ("貓咪" and "貓") count once"""
+        analysis = service.normalize_prompt("一隻可愛的貓咪")
+
+        assert analysis.normalized == "cat"
+        assert analysis.keywords == ["cat"]
+
+    def test_korean_particles(self, service):
+        """Hangul translations match with attached particles"""
+        analysis = service.normalize_prompt("고양이가 정원에서 놀고 있어요")
+
+        assert analysis.language == "ko"
+        assert analysis.normalized == "cat"
+        assert analysis.category == "animals"
+
+    def test_spanish_word_boundaries(self, service):
+        """Latin-script translations only match whole words"""
+        analysis = service.normalize_prompt("perro pequeño")
+
+        assert analysis.language == "es"
+        assert analysis.normalized == "dog"
+        assert analysis.confidence == pytest.approx(0.5)
+
+    def test_no_keywords(self, service):
+        """Unmatched non-English prompts keep the original text"""
+        analysis = service.normalize_prompt("  こんにちは  ")
+
+        assert analysis.normalized == "こんにちは"
+        assert analysis.keywords == []
+        assert analysis.category is None
+        assert analysis.style is None
+
+
+class TestDetection:
+    """Tests for category and style lookups"""
+
+    def test_category_highest_score(self, service):
+        """The category with the most keyword hits wins"""
+        assert service._detect_category(["city", "neon", "robot"]) == "urban"
+
+    def test_category_tie_goes_to_earlier_category(self, service):
+        """Ties resolve in CATEGORY_KEYWORDS order"""
+        # "dragon" is in both animals and fantasy
+        assert service._detect_category(["dragon"]) == "animals"
+        assert service._detect_category(["magic", "cat"]) == "animals"
+
+    def test_style_earliest_style(self, service):
+        """The first style in STYLE_KEYWORDS order with a hit wins"""
+        # "cartoon" is in both anime and pixar
+        assert service._detect_style(["cartoon"]) == "anime"
+        assert service._detect_style(["neon", "watercolor"]) == "watercolor"
+        assert service._detect_style(["Nothing"]) is None
+
+
+class TestDemoSearchIndex:
+    """Tests for the keyword / facet posting lists"""
+
+    def test_candidates_union_of_postings(self):
+        """Candidates share a keyword, the category or the style"""
+        index = DemoSearchIndex()
+        index.add("cat", ["Cat", "garden"], "animals", "anime")
+        index.add("city", ["city", "neon"], "urban", "cyberpunk")
+        index.add("dog", ["dog"], "animals", "realistic")
+
+        assert index.candidates(["cat"]) == {"cat"}
+        assert index.candidates(["neon"], category="animals") == {"city", "cat", "dog"}
+        assert index.candidates([], style="cyberpunk") == {"city"}
+        assert index.candidates(["unknown"]) == set()
+
+    def test_replace_and_remove(self):
+        """Re-adding replaces postings; removing clears them"""
+        index = DemoSearchIndex()
+        index.add("demo", ["cat"], "animals", None)
+        index.add("demo", ["dog"], "animals", None)
+
+        assert index.candidates(["cat"]) == set()
+        assert index.candidates(["dog"]) == {"demo"}
+        assert index.remove("demo")
+        assert not index.remove("demo")
+        assert len(index) == 0
+        assert index.candidates(["dog"], category="animals") == set()
+
+    def test_search_top_k(self):
+        """Best scores first, ties broken by popularity, limited to k"""
+        index = DemoSearchIndex()
+        index.add("a", ["cat"], None, None, popularity=1)
+        index.add("b", ["cat"], None, None, popularity=5)
+        index.add("c", ["cat", "dog"], None, None)
+        index.add("d", ["fish"], None, None)
+
+        ranked = index.search(
+            ["cat", "dog"], None, None,
+            score=lambda entry: len({"cat", "dog"} & set(entry.keywords)) / 2,
+            limit=2, min_score=0.1
+        )
+
+        assert [(score, entry.id) for score, entry in ranked] == [(1.0, "c"), (0.5, "b")]
+
+
+class TestFindSimilarDemos:
+    """Tests for index-backed demo matching"""
+
+    @pytest.mark.asyncio
+    async def test_matches_full_scan(self, service):
+        """Same results as scoring every demo and sorting"""
+        demos = [
+            make_demo(["cat"], "animals", "anime", popularity=3),
+            make_demo(["cat", "garden"], "animals", "realistic"),
+            make_demo(["city", "neon"], "urban", "cyberpunk"),
+            make_demo(["dog"], "animals", None, popularity=9),
+            make_demo(["robot"], "sci-fi", "pixar", status="failed"),
+        ]
+        db = FakeSession(demos)
+
+        results = await service.find_similar_demos(db, "anime cat", limit=3, min_score=0.1)
+
+        analysis = service.normalize_prompt("anime cat")
+        expected = sorted(
+            (
+                (service.calculate_similarity(
+                    analysis.keywords, demo.keywords, analysis.category,
+                    demo.category_slug, analysis.style, demo.style_slug
+                ), demo.popularity_score, demo.id)
+                for demo in demos[:4]
+            ),
+            reverse=True
+        )
+        expected = [item for item in expected if item[0] >= 0.1][:3]
+        assert [(r["score"], r["demo"].id) for r in results] == [(s, i) for s, _, i in expected]
+        assert results[0]["matched_keywords"] == ["cat"]
+
+    @pytest.mark.asyncio
+    async def test_incremental_refresh(self, service):
+        """Created and expired demos update the index without a rebuild"""
+        cat = make_demo(["cat"], "animals")
+        db = FakeSession([cat])
+        assert len(await service.find_similar_demos(db, "cat")) == 1
+
+        dog = make_demo(["dog"], "animals")
+        db.rows[dog.id] = dog
+        service.index_demo(dog)
+        results = await service.find_similar_demos(db, "dog")
+        assert results[0]["demo"] is dog
+
+        service.unindex_demos([dog.id])
+        assert all(r["demo"] is not dog for r in await service.find_similar_demos(db, "dog"))
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_dropped(self, service):
+        """Demos gone from the database are not returned and leave the index"""
+        cat = make_demo(["cat"], "animals")
+        db = FakeSession([cat])
+        await service.find_similar_demos(db, "cat")
+
+        del db.rows[cat.id]
+
+        assert await service.find_similar_demos(db, "cat") == []
+        assert cat.id not in service._demo_index
+
+    @pytest.mark.asyncio
+    async def test_sync_reads_changes_only(self, service):
+        """After the first build, syncs apply changed rows (e.g. from the worker)"""
+        cat = make_demo(["cat"], "animals")
+        db = FakeSession([cat])
+        await service._sync_demo_index(db)
+        assert cat.id in service._demo_index
+
+        service._demo_index_sync.interval = 0
+        expired = make_demo(["cat"], "animals", is_active=False, updated_at=datetime(2025, 1, 2))
+        expired.id = cat.id
+        db.rows = {cat.id: expired}
+        await service._sync_demo_index(db)
+
+        assert cat.id not in service._demo_index
+        assert service._demo_index_sync.watermark == datetime(2025, 1, 2)
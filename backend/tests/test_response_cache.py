@@ -0,0 +1,147 @@
+"""
+Unit Tests for Pre-serialized, ETag-aware Responses
+"""
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.services.response_cache import (
+    ResponseCache,
+    VersionKeys,
+    etag_matches,
+    serialize,
+    to_response,
+)
+from tests.conftest import UnavailableRedis
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class NullSession:
+    """Session stand-in for background rebuilds"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class Builder:
+    """Counts builds and returns the current payload"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    async def __call__(self, db):
+        self.calls += 1
+        return self.payload
+
+
+class TestSerialization:
+    """Tests for bodies, ETags and conditional responses"""
+
+    def test_body_matches_json_response(self):
+        """Same bytes as FastAPI's JSONResponse; ETag depends only on content"""
+        body = serialize({"title": "貓", "count": 2})
+
+        assert body.body == json.dumps({"title": "貓", "count": 2}, ensure_ascii=False, separators=(",", ":")).encode()
+        assert body.etag == serialize({"title": "貓", "count": 2}, version="other").etag
+        assert body.etag != serialize({"title": "貓", "count": 3}).etag
+
+    def test_if_none_match(self):
+        """Lists, weak validators and * all match"""
+        etag = '"abc"'
+        assert etag_matches('"abc"', etag)
+        assert etag_matches('"x", W/"abc"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"abcd"', etag)
+        assert not etag_matches(None, etag)
+
+    def test_not_modified(self):
+        """A matching If-None-Match gets an empty 304 with the same validators"""
+        cached = serialize([1, 2, 3])
+
+        full = to_response(make_request(), cached, max_age=30)
+        not_modified = to_response(make_request(cached.etag), cached, max_age=30)
+
+        assert full.status_code == 200
+        assert full.body == b"[1,2,3]"
+        assert full.headers["etag"] == cached.etag
+        assert full.headers["cache-control"] == "public, max-age=30"
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+        assert not_modified.headers["etag"] == cached.etag
+
+
+class TestResponseCache:
+    """Tests for version-tagged bodies and background rebuilds"""
+
+    @pytest.mark.asyncio
+    async def test_same_version_built_once(self):
+        """Repeated requests at one version reuse the serialized bytes"""
+        cache = ResponseCache(session_factory=NullSession)
+        build = Builder({"items": [1]})
+
+        first = await cache.get(None, ("presets", "try_on"), 1, build)
+        second = await cache.get(None, ("presets", "try_on"), 1, build)
+
+        assert first is second
+        assert build.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_version_change_rebuilds_in_background(self):
+        """The old body is served while the new one is built"""
+        cache = ResponseCache(session_factory=NullSession)
+        build = Builder({"items": [1]})
+        old = await cache.get(None, "key", 1, build)
+
+        build.payload = {"items": [1, 2]}
+        stale = await cache.get(None, "key", 2, build)
+        assert stale is old
+        await cache.close()
+
+        fresh = await cache.get(None, "key", 2, build)
+        assert json.loads(fresh.body) == {"items": [1, 2]}
+        assert build.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_unversioned_not_cached(self):
+        """Without a version (catalog unavailable) every call builds"""
+        cache = ResponseCache(session_factory=NullSession)
+        build = Builder([])
+
+        await cache.get(None, "key", None, build)
+        await cache.get(None, "key", None, build)
+
+        assert build.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_max_entries(self):
+        """The oldest bodies are dropped first"""
+        cache = ResponseCache(session_factory=NullSession, max_entries=2)
+        for key in ("a", "b", "c"):
+            await cache.get(None, key, 1, Builder(key))
+
+        assert list(cache._entries) == ["b", "c"]
+
+
+class TestVersionKeys:
+    """Tests for catalog version counters"""
+
+    @pytest.mark.asyncio
+    async def test_local_bump_without_redis(self):
+        """A bump changes the version in this process even if Redis is down"""
+        versions = VersionKeys(redis_url="redis://localhost:1/0")
+        versions._redis = UnavailableRedis()
+
+        before = await versions.get("prompt_templates")
+        await versions.bump("prompt_templates")
+
+        assert await versions.get("prompt_templates") != before
+        assert await versions.get("tool_showcases") == await versions.get("tool_showcases")
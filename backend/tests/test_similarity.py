@@ -0,0 +1,631 @@
+"""
+Unit Tests for Prompt Similarity Service and Embedding Index
+"""
+import contextlib
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import fakeredis
+import httpx
+import numpy as np
+import pytest
+from app.services.embedding_cache import EmbeddingCache, pack_embedding, unpack_embedding
+from app.services.embedding_index import EmbeddingIndex
+from app.services.gemini_service import GeminiService
+from app.services.local_embedding import LOCAL_EMBEDDING_DIMENSIONS, LocalEmbedder
+from app.models.demo import PackedEmbedding, PromptCache
+from app.services import write_behind
+from app.services.similarity import (
+    PGVECTOR_COLUMN_QUERY,
+    PGVECTOR_DIMENSIONS,
+    PGVECTOR_SEARCH_QUERY,
+    PGVECTOR_STORE_QUERY,
+    SimilarityService,
+    calculate_cosine_similarity,
+    normalize_prompt,
+)
+from tests.conftest import FakeResult, FakeSession, row_factory
+
+
+@pytest.fixture(autouse=True)
+async def counters(install_singleton):
+    """Fresh write-behind counters per test (never flushed to a database)"""
+    buffer = install_singleton(
+        write_behind, "_write_behind_counters", write_behind.WriteBehindCounters(flush_interval=3600)
+    )
+    yield buffer
+    if buffer._flush_task is not None:
+        buffer._flush_task.cancel()
+
+
+_cache_row = row_factory(
+    prompt_normalized="prompt",
+    is_active=True,
+    status="completed",
+    image_url="https://cdn.example.com/image.png",
+    video_url=None,
+    video_url_watermarked=None,
+    prompt_original="prompt",
+    prompt_enhanced="enhanced prompt",
+    usage_count=0,
+    created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    updated_at=None,
+)
+
+
+def cache_row(embedding, **overrides):
+    """PromptCache stand-in (serves as both ORM object and selected row)"""
+    return _cache_row(prompt_embedding=embedding, **overrides)
+
+
+class PgvectorSession(FakeSession):
+    """FakeSession whose database has the pgvector column"""
+
+    def __init__(self, rows, neighbours=None, fail_search=False):
+        super().__init__(rows)
+        self.neighbours = neighbours or []
+        self.fail_search = fail_search
+        self.search_params = None
+
+    async def execute(self, query, params=None):
+        if query is PGVECTOR_COLUMN_QUERY:
+            return FakeResult([1])
+        if query is PGVECTOR_SEARCH_QUERY:
+            if self.fail_search:
+                raise RuntimeError("operator does not exist: vector <=> vector")
+            self.search_params = params
+            return FakeResult([SimpleNamespace(id=key, similarity=score) for key, score in self.neighbours])
+        return await super().execute(query)
+
+
+class WriteSession:
+    """AsyncSession stand-in for cache_generation_result (empty cache, pgvector present)"""
+
+    def __init__(self):
+        self.added = []
+        self.stored = []
+        self.commits = 0
+
+    async def execute(self, query, params=None):
+        if query is PGVECTOR_COLUMN_QUERY:
+            return FakeResult([1])
+        if query is PGVECTOR_STORE_QUERY:
+            self.stored.append(params)
+            return FakeResult([])
+        return SimpleNamespace(scalar_one_or_none=lambda: None)
+
+    def add(self, obj):
+        obj.id = uuid.uuid4()
+        self.added.append(obj)
+
+    async def flush(self):
+        pass
+
+    @contextlib.asynccontextmanager
+    async def _savepoint(self):
+        yield
+
+    def begin_nested(self):
+        return self._savepoint()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def refresh(self, obj):
+        pass
+
+
+class TestPackedEmbedding:
+    """Tests for the bytea embedding column type"""
+
+    def test_float32_round_trip_is_zero_copy(self):
+        """Test that loads are views over the fetched bytes"""
+        column_type = PackedEmbedding()
+        packed = column_type.process_bind_param([0.5, -1.25, 3.0], None)
+        loaded = column_type.process_result_value(packed, None)
+
+        assert len(packed) == 4 + 3 * 4
+        assert loaded.tolist() == [0.5, -1.25, 3.0]
+        assert not loaded.flags.owndata
+
+    def test_float16_halves_storage(self):
+        """Test that float16 storage is readable regardless of the configured dtype"""
+        packed = PackedEmbedding("float16").process_bind_param(np.ones(768), None)
+        assert len(packed) == 4 + 768 * 2
+        assert PackedEmbedding().process_result_value(packed, None).dtype == np.float16
+
+    def test_empty_vector_is_null(self):
+        """Test that empty embeddings are stored as NULL"""
+        assert PackedEmbedding().process_bind_param([], None) is None
+
+    def test_embedding_column_is_deferred(self):
+        """Test that plain PromptCache loads do not fetch the embedding"""
+        from sqlalchemy import inspect
+        assert inspect(PromptCache).attrs.prompt_embedding.deferred
+
+
+class TestEmbeddingIndex:
+    """Tests for the NumPy embedding index"""
+
+    def test_search_matches_python_cosine(self):
+        """Test that index scores equal the reference cosine similarity"""
+        rng = np.random.default_rng(0)
+        vectors = {i: rng.normal(size=32).tolist() for i in range(50)}
+        index = EmbeddingIndex()
+        index.add_many(vectors.items())
+
+        query = rng.normal(size=32).tolist()
+        results = index.search(query, k=5)
+        expected = sorted(
+            ((key, calculate_cosine_similarity(query, vector)) for key, vector in vectors.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:5]
+
+        assert [key for key, _ in results] == [key for key, _ in expected]
+        for (_, score), (_, reference) in zip(results, expected):
+            assert score == pytest.approx(reference, abs=1e-5)
+
+    def test_update_and_remove(self):
+        """Test that upserts replace vectors and removals keep the matrix dense"""
+        index = EmbeddingIndex()
+        for i in range(100):
+            index.add(i, [1.0, float(i)])
+        index.add(5, [0.0, -1.0])
+        for i in range(0, 100, 2):
+            index.remove(i)
+
+        assert len(index) == 50
+        assert 4 not in index
+        assert all(key % 2 == 1 for key, _ in index.search([1.0, 50.0], k=50))
+
+    def test_dimensions_are_not_mixed(self):
+        """Test that vectors of a different dimension never match"""
+        index = EmbeddingIndex()
+        index.add("gemini", [1.0, 0.0, 0.0])
+        index.add("fallback", [1.0, 0.0])
+
+        assert index.search([1.0, 0.0], k=5) == [("fallback", pytest.approx(1.0))]
+        assert index.search([0.0, 0.0], k=5) == []
+
+
+class TestSimilarityIndex:
+    """Tests for SimilarityService embedding matching through the index"""
+
+    def setup_method(self):
+        self.service = SimilarityService(threshold=0.9)
+
+    @pytest.mark.asyncio
+    async def test_finds_match_beyond_first_hundred_rows(self, counters):
+        """Test that every active cached prompt is searchable"""
+        rows = [cache_row([1.0, float(i), 0.0]) for i in range(1, 300)]
+        target = cache_row([0.0, 0.0, 1.0])
+        db = FakeSession(rows + [target])
+
+        result = await self.service._find_similar_by_embedding([0.0, 0.1, 1.0], db)
+
+        assert result["cached_id"] == str(target.id)
+        assert result["similarity"] == pytest.approx(0.995, abs=1e-3)
+        assert counters.pending(PromptCache, target.id) == {"usage_count": 1}
+        assert db.gets == 1
+        assert db.commits == 0
+
+    @pytest.mark.asyncio
+    async def test_index_is_reused_between_queries(self):
+        """Test that repeated queries do not reload the cache table"""
+        db = FakeSession([cache_row([1.0, 0.0])])
+
+        await self.service._find_similar_by_embedding([1.0, 0.0], db)
+        await self.service._find_similar_by_embedding([1.0, 0.0], db)
+
+        assert db.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_below_threshold_returns_none(self):
+        """Test that dissimilar prompts do not match"""
+        db = FakeSession([cache_row([1.0, 0.0])])
+        assert await self.service._find_similar_by_embedding([0.0, 1.0], db) is None
+        assert db.gets == 0
+
+    @pytest.mark.asyncio
+    async def test_deactivated_candidate_is_skipped(self):
+        """Test that rows deactivated after indexing are dropped"""
+        stale = cache_row([1.0, 0.0])
+        fresh = cache_row([0.99, 0.05])
+        db = FakeSession([stale, fresh])
+        await self.service._sync_index(db)
+
+        stale.is_active = False
+        result = await self.service._find_similar_by_embedding([1.0, 0.0], db)
+
+        assert result["cached_id"] == str(fresh.id)
+        assert stale.id not in self.service._index
+
+    @pytest.mark.asyncio
+    async def test_incremental_sync_applies_changes(self):
+        """Test that incremental syncs add new rows and drop deactivated ones"""
+        old = cache_row([1.0, 0.0])
+        db = FakeSession([old])
+        await self.service._sync_index(db)
+
+        new = cache_row([0.0, 1.0], created_at=datetime(2024, 1, 2, tzinfo=timezone.utc))
+        db.rows[new.id] = new
+        old.is_active = False
+        self.service._index_sync.synced_at = 0.0
+        await self.service._sync_index(db)
+
+        assert new.id in self.service._index
+        assert old.id not in self.service._index
+        assert self.service._index_sync.watermark == new.created_at
+
+    @pytest.mark.asyncio
+    async def test_local_index_only_built_when_enabled(self):
+        """Test that cached prompts are embedded locally only while the local stage is on"""
+        db = FakeSession([cache_row([1.0, 0.0], prompt_normalized="a cozy cafe")])
+        await self.service._sync_index(db)
+        assert len(self.service._index) == 1
+        assert len(self.service._local_index) == 0
+
+        self.service.local_prefilter = 0.3
+        self.service._index_sync.max_age = -1
+        await self.service._sync_index(db)
+        assert len(self.service._local_index) == 1
+
+
+class TestSimilarityPgvector:
+    """Tests for the pgvector nearest-neighbour path"""
+
+    def setup_method(self):
+        self.service = SimilarityService(threshold=0.9)
+        self.service.use_pgvector = True
+        self.query = [1.0] + [0.0] * (PGVECTOR_DIMENSIONS - 1)
+
+    @pytest.mark.asyncio
+    async def test_search_runs_in_postgres(self):
+        """Test that 768-dim queries use pgvector and skip the local index"""
+        target = cache_row(self.query)
+        db = PgvectorSession([target], neighbours=[(target.id, 0.97)])
+
+        result = await self.service._find_similar_by_embedding(self.query, db)
+
+        assert result["cached_id"] == str(target.id)
+        assert result["similarity"] == pytest.approx(0.97)
+        assert db.search_params["threshold"] == 0.9
+        assert db.search_params["query"].startswith("[1.0,0.0,")
+        assert db.queries == 0
+        assert len(self.service._index) == 0
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_index_on_error(self):
+        """Test that a failing pgvector query falls back to the in-memory index"""
+        target = cache_row(self.query)
+        db = PgvectorSession([target], fail_search=True)
+
+        result = await self.service._find_similar_by_embedding(self.query, db)
+
+        assert result["cached_id"] == str(target.id)
+        assert self.service._pgvector_available is False
+        assert db.queries == 1
+
+
+class TestEmbeddingCache:
+    """Tests for the two-tier embedding cache"""
+
+    def setup_method(self):
+        self.cache = EmbeddingCache(model="test", local_size=10)
+        self.redis = fakeredis.aioredis.FakeRedis()
+        self.cache._redis = self.redis
+
+    def test_packed_float32_round_trip(self):
+        """Test that vectors are stored as 4 bytes per dimension"""
+        packed = pack_embedding([0.5, -1.25, 3.0])
+        assert len(packed) == 12
+        assert unpack_embedding(packed) == [0.5, -1.25, 3.0]
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_is_shared(self):
+        """Test that a second worker reads vectors stored by the first"""
+        await self.cache.set_many({"a cat": [0.5, 0.25]})
+
+        other = EmbeddingCache(model="test")
+        other._redis = self.redis
+        assert await other.get_many(["a cat", "a dog"]) == {"a cat": [0.5, 0.25]}
+        assert await self.redis.get(self.cache.key("a cat")) == pack_embedding([0.5, 0.25])
+
+    @pytest.mark.asyncio
+    async def test_local_tier_avoids_redis(self):
+        """Test that hot vectors are served from the in-process LRU"""
+        await self.cache.set_many({"a cat": [0.5, 0.25]})
+        await self.redis.flushall()
+        assert await self.cache.get_many(["a cat"]) == {"a cat": [0.5, 0.25]}
+
+
+class TestCachedEmbedding:
+    """Tests for the embedding cache in GeminiService.get_embedding"""
+
+    def setup_method(self):
+        self.service = GeminiService(api_key="test-key")
+        self.service._embedding_cache = EmbeddingCache(model="test")
+        self.requests = []
+
+    def install_transport(self, monkeypatch, status_code=200):
+        def handler(request):
+            body = json.loads(request.content)
+            self.requests.append((request.url.path, body))
+            text = body["content"]["parts"][0]["text"]
+            return httpx.Response(status_code, json={"embedding": {"values": [float(len(text)), 1.0]}})
+
+        transport = httpx.MockTransport(handler)
+        real_client = httpx.AsyncClient
+        monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    @pytest.mark.asyncio
+    async def test_repeated_text_is_requested_once(self, monkeypatch):
+        """Test that a cached embedding skips the API"""
+        self.install_transport(monkeypatch)
+
+        first = await self.service.get_embedding("bb")
+        second = await self.service.get_embedding("bb")
+
+        assert len(self.requests) == 1
+        assert self.requests[0][0].endswith(":embedContent")
+        assert first["embedding"] == second["embedding"] == [2.0, 1.0]
+        assert second.get("cached")
+
+    @pytest.mark.asyncio
+    async def test_api_error_falls_back_to_local_embedding(self, monkeypatch):
+        """Test that failed requests return a fallback vector and are not cached"""
+        self.install_transport(monkeypatch, status_code=500)
+
+        result = await self.service.get_embedding("bb")
+
+        assert result["success"] is False
+        assert len(result["embedding"]) == LOCAL_EMBEDDING_DIMENSIONS
+        assert await self.service._embedding_cache.get_many(["bb"]) == {}
+
+
+class TestBatchEmbeddings:
+    """Tests for GeminiService.get_embeddings"""
+
+    def setup_method(self):
+        self.service = GeminiService(api_key="test-key")
+        self.service._embedding_cache = EmbeddingCache(model="test")
+        self.requests = []
+
+    def install_transport(self, monkeypatch, status_code=200):
+        def handler(request):
+            body = json.loads(request.content)
+            self.requests.append((request.url.path, body))
+            embeddings = [
+                {"values": [float(len(item["content"]["parts"][0]["text"])), 1.0]}
+                for item in body["requests"]
+            ]
+            return httpx.Response(status_code, json={"embeddings": embeddings})
+
+        transport = httpx.MockTransport(handler)
+        real_client = httpx.AsyncClient
+        monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    @pytest.mark.asyncio
+    async def test_deduplicates_and_chunks(self, monkeypatch):
+        """Test that duplicates are embedded once and batches are capped"""
+        self.install_transport(monkeypatch)
+        self.service.EMBEDDING_BATCH_SIZE = 2
+        texts = ["a", "bb", "a", "ccc", "bb"]
+
+        results = await self.service.get_embeddings(texts)
+
+        assert [result["embedding"][0] for result in results] == [1.0, 2.0, 1.0, 3.0, 2.0]
+        assert [len(body["requests"]) for _, body in self.requests] == [2, 1]
+        assert self.requests[0][0].endswith(":batchEmbedContents")
+
+    @pytest.mark.asyncio
+    async def test_cached_texts_are_not_requested(self, monkeypatch):
+        """Test that cached embeddings skip the API, including get_embedding"""
+        self.install_transport(monkeypatch)
+        await self.service.get_embeddings(["a", "bb"])
+        self.requests.clear()
+
+        results = await self.service.get_embeddings(["a", "bb"])
+        single = await self.service.get_embedding("a")
+
+        assert self.requests == []
+        assert all(result.get("cached") for result in results)
+        assert single["embedding"] == [1.0, 1.0]
+
+    @pytest.mark.asyncio
+    async def test_api_error_falls_back_to_local_embeddings(self, monkeypatch):
+        """Test that failed batches return fallback vectors and are not cached"""
+        self.install_transport(monkeypatch, status_code=500)
+
+        results = await self.service.get_embeddings(["a", "bb"])
+
+        assert [result["success"] for result in results] == [False, False]
+        assert len(results[0]["embedding"]) == LOCAL_EMBEDDING_DIMENSIONS
+        assert await self.service._embedding_cache.get_many(["a"]) == {}
+
+
+class TestEmbedMissing:
+    """Tests for bulk embedding of cache entries without an embedding"""
+
+    @pytest.mark.asyncio
+    async def test_embeds_in_one_batch_and_indexes(self):
+        """Test that missing embeddings are fetched in one call, stored and indexed"""
+        calls = []
+
+        async def get_embeddings(texts):
+            calls.append(list(texts))
+            return [
+                {"success": text != "broken", "embedding": [1.0, float(len(text))]}
+                for text in texts
+            ]
+
+        service = SimilarityService()
+        service.use_pgvector = False
+        service.gemini = SimpleNamespace(get_embeddings=get_embeddings)
+        cat = cache_row(None, prompt_normalized="a cat")
+        broken = cache_row(None, prompt_normalized="broken")
+        db = FakeSession([cat, broken])
+
+        assert await service.embed_missing(db) == 1
+
+        assert calls == [["a cat", "broken"]]
+        assert cat.prompt_embedding == [1.0, 5.0]
+        assert broken.prompt_embedding is None
+        assert cat.id in service._index and broken.id not in service._index
+        assert db.commits == 1
+
+
+class TestLocalEmbedding:
+    """Tests for the offline n-gram embedder"""
+
+    def setup_method(self):
+        self.embedder = LocalEmbedder()
+
+    def similarity(self, a, b):
+        return float(self.embedder.embed(a) @ self.embedder.embed(b))
+
+    def test_similar_prompts_score_higher(self):
+        """Test that vectors carry lexical similarity, unlike hash embeddings"""
+        close = self.similarity("a cute cat playing with a ball", "cute cats playing with balls")
+        far = self.similarity("a cute cat playing with a ball", "a red sports car on a highway")
+        assert close > 0.6 > far
+
+    def test_cjk_prompts(self):
+        """Test that CJK text without spaces is embedded by character n-grams"""
+        close = self.similarity("一隻可愛的貓在玩球", "可愛的貓咪玩球")
+        far = self.similarity("一隻可愛的貓在玩球", "城市夜景")
+        assert close > 0.5 > far
+
+    def test_deterministic_and_normalized(self):
+        """Test that vectors are stable, unit-length and of fixed size"""
+        vector = self.embedder.embed("A Cozy Coffee Shop")
+        assert vector.shape == (LOCAL_EMBEDDING_DIMENSIONS,)
+        assert float(np.linalg.norm(vector)) == pytest.approx(1.0)
+        assert np.array_equal(vector, LocalEmbedder().embed("a cozy coffee shop"))
+        assert self.embedder.embed("!!!") is None
+
+
+class TestSimilarityLocalStage:
+    """Tests for the offline first stage of find_similar_prompt"""
+
+    def setup_method(self):
+        self.service = SimilarityService(threshold=0.9)
+        self.service.local_match_threshold = 0.95
+        self.service.local_prefilter = 0.3
+        self.embedding_calls = []
+
+        async def no_exact_match(prompt_hash, db):
+            return None
+
+        async def get_embedding(text):
+            self.embedding_calls.append(text)
+            return {"success": True, "embedding": [1.0, 0.0]}
+
+        self.service._find_exact_match = no_exact_match
+        self.service.gemini = SimpleNamespace(get_embedding=get_embedding)
+
+    @pytest.mark.asyncio
+    async def test_near_identical_prompt_needs_no_remote_call(self):
+        """Test that a lexically near-identical prompt is matched locally"""
+        target = cache_row(None, prompt_normalized="a cozy coffee shop on a rainy afternoon")
+        db = FakeSession([target])
+
+        result = await self.service.find_similar_prompt("A cozy coffee shop on a rainy afternoon!", db)
+
+        assert result["cached_id"] == str(target.id)
+        assert self.embedding_calls == []
+
+    @pytest.mark.asyncio
+    async def test_unrelated_prompt_skips_gemini(self):
+        """Test that prompts with no lexically close cached prompt skip the embedding call"""
+        db = FakeSession([cache_row([1.0, 0.0], prompt_normalized="a red sports car on a highway")])
+
+        assert await self.service.find_similar_prompt("一隻可愛的貓在玩球", db) is None
+        assert self.embedding_calls == []
+
+    @pytest.mark.asyncio
+    async def test_related_prompt_uses_gemini_embedding(self):
+        """Test that plausible candidates still go through the Gemini embedding"""
+        target = cache_row([1.0, 0.0], prompt_normalized="a cute cat playing with a ball")
+        db = FakeSession([target])
+
+        result = await self.service.find_similar_prompt("cute cats playing with balls", db)
+
+        assert self.embedding_calls == ["cute cats playing with balls"]
+        assert result["cached_id"] == str(target.id)
+
+
+class TestSimilarityLocalStageDefaults:
+    """The offline first stage is off by default: n-gram scores are lexical"""
+
+    CAT = "a fluffy orange cat sleeping on a grey velvet sofa in a sunny living room"
+    DOG = "a fluffy orange dog sleeping on a grey velvet sofa in a sunny living room"
+    PARAPHRASE = "ginger kitten napping on the couch"
+
+    def setup_method(self):
+        self.service = SimilarityService(threshold=0.9)
+        self.embedding_calls = []
+        self.gemini_vectors = {}
+
+        async def no_exact_match(prompt_hash, db):
+            return None
+
+        async def get_embedding(text):
+            self.embedding_calls.append(text)
+            return {"success": True, "embedding": self.gemini_vectors[text]}
+
+        self.service._find_exact_match = no_exact_match
+        self.service.gemini = SimpleNamespace(get_embedding=get_embedding)
+
+    def local_similarity(self, a, b):
+        embedder = self.service.local_embedder
+        return float(embedder.embed(normalize_prompt(a)) @ embedder.embed(normalize_prompt(b)))
+
+    @pytest.mark.asyncio
+    async def test_near_miss_noun_does_not_match(self):
+        """Test that one different noun is not reused even though it scores above 0.95 locally"""
+        assert self.local_similarity(self.CAT, self.DOG) > 0.95
+        self.gemini_vectors[self.DOG] = [0.0, 1.0]
+        db = FakeSession([cache_row([1.0, 0.0], prompt_normalized=self.CAT)])
+
+        assert await self.service.find_similar_prompt(self.DOG, db) is None
+        assert self.embedding_calls == [self.DOG]
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_reaches_embedding_path(self):
+        """Test that a paraphrase with little lexical overlap is still matched by embedding"""
+        assert self.local_similarity(self.CAT, self.PARAPHRASE) < 0.3
+        self.gemini_vectors[self.PARAPHRASE] = [1.0, 0.0]
+        target = cache_row([1.0, 0.0], prompt_normalized=self.CAT)
+        db = FakeSession([target])
+
+        result = await self.service.find_similar_prompt(self.PARAPHRASE, db)
+
+        assert self.embedding_calls == [self.PARAPHRASE]
+        assert result["cached_id"] == str(target.id)
+
+
+class TestCacheGenerationResult:
+    """Tests for storing new cache entries"""
+
+    @pytest.mark.asyncio
+    async def test_new_entry_is_indexed_and_stored_in_pgvector(self):
+        """Test that new entries reach both indexes and embedding_vector"""
+        service = SimilarityService()
+        service.use_pgvector = True
+        service.local_prefilter = 0.3
+        db = WriteSession()
+        embedding = [0.5] * PGVECTOR_DIMENSIONS
+
+        result = await service.cache_generation_result(
+            "A cozy cafe", "enhanced", embedding, "https://cdn.example.com/cafe.png", db=db
+        )
+
+        entry = db.added[0]
+        assert result["cached_id"] == str(entry.id)
+        assert entry.id in service._index and entry.id in service._local_index
+        assert db.stored[0]["id"] == entry.id
+        assert db.stored[0]["embedding"].startswith("[0.5,0.5,")
@@ -0,0 +1,180 @@
+"""
+Unit Tests for Startup Validation and Health Checks
+"""
+import asyncio
+import json
+import subprocess
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.lazy import is_loaded, lazy_import
+from app.main import app
+from app.services.material_generator import MaterialGenerator
+from app.services.preset_catalog import CatalogSnapshot
+from scripts.benchmark_startup import (
+    BACKEND_DIR, COLD_START_TARGET_SECONDS, DEFERRED_MODULES, measure_first_request,
+)
+from tests.conftest import FakeSession, StubCatalog
+
+
+class TestMaterialValidation:
+    """Tests for the grouped material count"""
+
+    @pytest.mark.asyncio
+    async def test_all_categories_one_query(self):
+        """Every category is checked from a single grouped query"""
+        db = FakeSession([
+            SimpleNamespace(source=source, kind=kind, topic=topic, count=count)
+            for source, kind, topic, count in [
+                ("material", "short_video", "ecommerce", 4),
+                ("material", "short_video", "brand", 2),
+                ("material", "short_video", "other", 50),
+                ("material", "ai_avatar", "social", 6),
+                ("showcase", "pattern", None, 10),
+                ("showcase", "product", None, 5),
+            ]
+        ])
+
+        status = await MaterialGenerator().check_all_materials(db)
+
+        assert status == {
+            "landing": True,
+            "pattern": True,
+            "product": False,
+            "video": False,
+            "avatar": False,
+        }
+        assert db.queries == 1
+
+
+class LoadedCatalog(StubCatalog):
+    """Preset catalog whose load succeeds"""
+
+    snapshot = CatalogSnapshot([])
+
+    async def get(self, db):
+        return self.snapshot
+
+
+async def wait_for_startup_checks():
+    for _ in range(50):
+        if app.state.readiness != "starting":
+            return
+        await asyncio.sleep(0.01)
+
+
+class TestStartupReadiness:
+    """Tests for non-blocking startup and liveness / readiness"""
+
+    @pytest.mark.asyncio
+    async def test_serves_before_validation_finishes(self):
+        """Liveness is up at once; readiness flips when the checks finish"""
+        release = asyncio.Event()
+
+        async def slow_validation():
+            await release.wait()
+            return {"all_ready": True, "missing": []}
+
+        transport = ASGITransport(app=app)
+        with patch("app.main.validate_materials_on_startup", slow_validation), \
+                patch("app.services.preset_catalog.get_preset_catalog", return_value=LoadedCatalog()):
+            async with app.router.lifespan_context(app):
+                async with AsyncClient(transport=transport, base_url="http://test") as ac:
+                    assert (await ac.get("/health/live")).status_code == 200
+                    assert (await ac.get("/health/ready")).status_code == 503
+                    health = (await ac.get("/health")).json()
+                    assert health["mode"] == "preset-only"
+                    assert health["ready"] is False
+
+                    release.set()
+                    await wait_for_startup_checks()
+
+                    ready = await ac.get("/health/ready")
+                    assert ready.status_code == 200
+                    assert ready.json()["materials_ready"] is True
+                    assert ready.json()["errors"] == {}
+                    assert (await ac.get("/health")).json()["ready"] is True
+
+    async def readiness_after(self, validation_result, catalog):
+        async def validation():
+            return validation_result
+
+        transport = ASGITransport(app=app)
+        with patch("app.main.validate_materials_on_startup", validation), \
+                patch("app.services.preset_catalog.get_preset_catalog", return_value=catalog):
+            async with app.router.lifespan_context(app):
+                await wait_for_startup_checks()
+                async with AsyncClient(transport=transport, base_url="http://test") as ac:
+                    return await ac.get("/health/ready")
+
+    @pytest.mark.asyncio
+    async def test_failed_catalog_load_is_degraded(self):
+        """One failed check: not ready, with the error in the body"""
+        ready = await self.readiness_after({"all_ready": True, "missing": []}, StubCatalog())
+
+        assert ready.status_code == 503
+        assert ready.json()["status"] == "degraded"
+        assert set(ready.json()["errors"]) == {"preset_catalog"}
+
+    @pytest.mark.asyncio
+    async def test_all_checks_failing_is_failed(self):
+        """Validation and catalog preload both failing is reported as failed"""
+        validation_result = {"all_ready": False, "error": "connection refused", "missing": ["validation_failed"]}
+        ready = await self.readiness_after(validation_result, StubCatalog())
+
+        assert ready.status_code == 503
+        assert ready.json()["status"] == "failed"
+        assert ready.json()["errors"]["materials"] == "connection refused"
+        assert "preset_catalog" in ready.json()["errors"]
+
+    @pytest.mark.asyncio
+    async def test_missing_materials_stay_ready(self):
+        """Missing materials are a warning, not a failed check"""
+        ready = await self.readiness_after({"all_ready": False, "missing": ["video: 0 materials"]}, LoadedCatalog())
+
+        assert ready.status_code == 200
+        assert ready.json()["materials_ready"] is False
+
+
+class TestColdStart:
+    """Regression tests for worker import cost"""
+
+    def test_lazy_import_defers_execution(self):
+        """A lazily bound module runs on first attribute access"""
+        sys.modules.pop("colorsys", None)
+
+        module = lazy_import("colorsys")
+        assert not is_loaded("colorsys")
+        assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+        assert is_loaded("colorsys")
+        sys.modules.pop("colorsys", None)
+
+    def test_app_import_defers_heavy_modules(self):
+        """Importing the app in a fresh interpreter executes none of the deferred modules"""
+        snippet = (
+            "import json, sys; import app.main; from app.core.lazy import is_loaded; "
+            "print(json.dumps({n: is_loaded(n) for n in json.loads(sys.argv[1])}))"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", snippet, json.dumps(DEFERRED_MODULES)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        )
+        loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        assert set(loaded) == set(DEFERRED_MODULES)
+        assert not any(loaded.values()), loaded
+
+    @pytest.mark.slow
+    def test_time_to_first_request(self):
+        """A fresh worker answers /health/live within target"""
+        results = [measure_first_request()]
+        # Retry once so a single slow run on a busy machine does not fail
+        if results[0]["first_request_s"] > COLD_START_TARGET_SECONDS:
+            results.append(measure_first_request())
+
+        assert results[-1]["status"] == 200
+        assert min(r["first_request_s"] for r in results) <= COLD_START_TARGET_SECONDS
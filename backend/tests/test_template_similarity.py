@@ -0,0 +1,163 @@
+"""
+Unit Tests for MinHash/LSH Template Matching
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+from app.models.prompt_template import PromptGroup
+from app.services import prompt_generator
+from app.services.minhash_index import MinHashLSH, jaccard
+from app.services.prompt_generator import PromptGeneratorService, TemplateSimilarityIndex
+from tests.conftest import FakeSession, row_factory
+
+
+_make_template = row_factory(
+    group=PromptGroup.BACKGROUND_CHANGE,
+    popularity_score=0,
+    quality_score=0.8,
+    is_active=True,
+    is_default=True,
+    created_at=datetime(2025, 1, 1),
+    updated_at=None,
+)
+
+
+def make_template(keywords, popularity=0, **fields):
+    return _make_template(keywords=keywords, popularity_score=popularity, **fields)
+
+
+@pytest.fixture
+def index(install_singleton):
+    return install_singleton(prompt_generator, "_template_similarity_index", TemplateSimilarityIndex())
+
+
+def make_service(db):
+    service = PromptGeneratorService(db)
+
+    async def get_template_by_id(template_id):
+        return db.rows.get(template_id)
+
+    service.get_template_by_id = get_template_by_id
+    return service
+
+
+class TestMinHashLSH:
+    """Tests for the banded MinHash index"""
+
+    def test_candidates_and_exact_recheck(self):
+        """Similar sets are found; the exact Jaccard filters the rest"""
+        lsh = MinHashLSH()
+        lsh.add("shoes", ["white", "sneaker", "studio", "background", "clean"])
+        lsh.add("beach", ["sunset", "beach", "palm", "ocean", "sand"])
+
+        matches = lsh.query({"white", "sneaker", "studio", "background"}, threshold=0.7)
+
+        assert matches == [("shoes", 0.8)]
+        assert lsh.query({"mountain", "snow"}, threshold=0.7) == []
+
+    def test_recall_above_threshold(self):
+        """Pairs above the reliable threshold are essentially always candidates"""
+        rng = random.Random(3)
+        lsh = MinHashLSH()
+        queries = {}
+        for key in range(200):
+            base = {f"w{key}_{i}" for i in range(20)}
+            lsh.add(key, base)
+            # Drop 2 and add 2 words: Jaccard 18 / 22 ~ 0.82
+            query = set(rng.sample(sorted(base), 18)) | {f"x{key}_1", f"x{key}_2"}
+            queries[key] = query
+
+        found = sum(1 for key, query in queries.items() if key in lsh.candidates(query))
+        assert found == len(queries)
+
+    def test_low_threshold_scans_all(self):
+        """Thresholds the banding cannot serve fall back to an exact scan"""
+        lsh = MinHashLSH()
+        lsh.add("a", ["one", "two", "three", "four"])
+
+        query = {"one", "five", "six"}
+        expected = jaccard(query, {"one", "two", "three", "four"})
+
+        assert lsh.query(query, threshold=0.1) == [("a", expected)]
+
+    def test_replace_and_remove(self):
+        """Re-adding replaces the set; removing drops all band entries"""
+        lsh = MinHashLSH()
+        lsh.add("a", ["cat", "dog"])
+        lsh.add("a", ["fish"])
+
+        assert lsh.query({"cat", "dog"}, threshold=0.7) == []
+        assert lsh.remove("a")
+        assert len(lsh) == 0
+        assert lsh.candidates({"fish"}) == set()
+        assert not lsh.add("empty", [])
+
+
+class TestFindSimilarTemplate:
+    """Tests for index-backed template matching"""
+
+    @pytest.mark.asyncio
+    async def test_matches_beyond_first_page(self, index):
+        """Every template of the group is searchable, not only the top 50"""
+        templates = [
+            make_template([f"filler{i}", f"word{i}", "product"], popularity=1000 - i)
+            for i in range(80)
+        ]
+        target = make_template(["red", "shoes", "marble", "table"], popularity=0)
+        db = FakeSession(templates + [target])
+
+        result = await make_service(db).find_similar_template("red shoes marble table", PromptGroup.BACKGROUND_CHANGE)
+
+        assert result is target
+
+    @pytest.mark.asyncio
+    async def test_group_scoped_and_threshold(self, index):
+        """Templates from other groups or below the threshold never match"""
+        other_group = make_template(["red", "shoes"], group=PromptGroup.PRODUCT_SCENE)
+        weak = make_template(["red", "shoes", "on", "a", "wooden", "table"])
+        db = FakeSession([other_group, weak])
+        service = make_service(db)
+
+        assert await service.find_similar_template("red shoes", PromptGroup.BACKGROUND_CHANGE) is None
+        assert await service.find_similar_template("red shoes", PromptGroup.PRODUCT_SCENE) is other_group
+
+    @pytest.mark.asyncio
+    async def test_tie_goes_to_popular_template(self, index):
+        """Equal scores resolve to the more popular template, as before"""
+        quiet = make_template(["red", "shoes"], popularity=1)
+        popular = make_template(["red", "shoes"], popularity=50)
+        db = FakeSession([quiet, popular])
+
+        result = await make_service(db).find_similar_template("red shoes", PromptGroup.BACKGROUND_CHANGE)
+
+        assert result is popular
+
+    @pytest.mark.asyncio
+    async def test_inactive_template_skipped(self, index):
+        """Templates deactivated since the last sync are dropped on lookup"""
+        template = make_template(["red", "shoes"])
+        db = FakeSession([template])
+        service = make_service(db)
+        await index.sync(db)
+
+        template.is_active = False
+
+        assert await service.find_similar_template("red shoes", PromptGroup.BACKGROUND_CHANGE) is None
+        assert template.id not in index
+
+    @pytest.mark.asyncio
+    async def test_created_template_indexed(self, index):
+        """Templates created in this process are searchable without a sync"""
+        db = FakeSession([])
+        await index.sync(db)
+
+        template = make_template(["neon", "city", "night"])
+        db.rows[template.id] = template
+        index.add(template)
+
+        result = await make_service(db).find_similar_template("neon city night", PromptGroup.BACKGROUND_CHANGE)
+
+        assert result is template
+        assert db.queries == 1
@@ -0,0 +1,105 @@
+"""
+Unit Tests for Write-Behind Counters
+"""
+import uuid
+
+import pytest
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.models.demo import ImageDemo
+from app.models.material import Material
+from app.models.prompt_template import PromptTemplate
+from app.services.write_behind import WriteBehindCounters
+
+
+class RecordingSession:
+    """AsyncSession stand-in recording executed statements"""
+
+    def __init__(self, fail=False):
+        self.statements = []
+        self.commits = 0
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.statements.append(str(statement.compile(dialect=asyncpg.dialect())))
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestWriteBehindCounters:
+    """Tests for buffered counter increments"""
+
+    def setup_method(self):
+        self.session = RecordingSession()
+        self.counters = WriteBehindCounters(session_factory=lambda: self.session, flush_interval=3600)
+
+    def teardown_method(self):
+        if self.counters._flush_task is not None:
+            self.counters._flush_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_increments_are_aggregated_per_row(self):
+        """Test that repeated increments collapse into one delta per row"""
+        material_id = uuid.uuid4()
+        for _ in range(3):
+            self.counters.incr(Material, str(material_id), use_count=1)
+
+        assert self.counters.pending(Material, material_id) == {"use_count": 3}
+        assert self.session.statements == []
+
+    @pytest.mark.asyncio
+    async def test_flush_issues_one_update_per_table(self):
+        """Test that a flush writes each table with a single UPDATE ... FROM (VALUES ...)"""
+        for _ in range(5):
+            self.counters.incr(Material, uuid.uuid4(), use_count=1)
+        self.counters.incr(ImageDemo, uuid.uuid4(), popularity_score=2)
+        self.counters.incr(
+            PromptTemplate, uuid.uuid4(), touch=("last_used_at",), usage_count=1, popularity_score=1
+        )
+
+        assert await self.counters.flush() == 7
+
+        assert len(self.session.statements) == 3
+        assert self.session.commits == 1
+        assert all("FROM (VALUES" in statement for statement in self.session.statements)
+        template_update = next(s for s in self.session.statements if "prompt_templates" in s)
+        assert "last_used_at=coalesce(v.last_used_at, prompt_templates.last_used_at)" in template_update
+        assert self.counters.pending(Material, uuid.uuid4()) == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_increments(self):
+        """Test that increments survive a failed flush and merge with new ones"""
+        material_id = uuid.uuid4()
+        self.counters.incr(Material, material_id, use_count=2)
+        self.session.fail = True
+
+        assert await self.counters.flush() == 0
+
+        self.counters.incr(Material, material_id, use_count=1)
+        assert self.counters.pending(Material, material_id) == {"use_count": 3}
+
+    @pytest.mark.asyncio
+    async def test_increments_dropped_after_max_retries(self, caplog):
+        """Test that repeatedly failing increments are dropped and logged, not retried forever"""
+        material_id = uuid.uuid4()
+        self.counters.max_retries = 2
+        self.counters.incr(Material, material_id, use_count=4)
+        self.session.fail = True
+
+        for _ in range(2):
+            await self.counters.flush()
+            assert self.counters.pending(Material, material_id) == {"use_count": 4}
+
+        await self.counters.flush()
+        assert self.counters.pending(Material, material_id) == {}
+        assert "Dropped write-behind counters for 1 materials rows" in caplog.text
+        assert "'use_count': 4" in caplog.text